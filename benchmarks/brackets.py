@@ -0,0 +1,40 @@
+# Benchmarks for expressions with many brackets and factorials, such as `(x + 1)! + ((x + 2)!)! + ...`
+# Run from the root of the repository: `python benchmarks/brackets.py`
+import timeit
+
+from cake.parsing.lexer import tokenize, match_brackets
+from cake.parsing.parser import parse
+
+SIZES = (50, 100, 200, 400, 800)
+REPEAT = 5
+
+
+def generate(factorials: int) -> str:
+    parts = list()
+
+    for n in range(factorials):
+        if n % 2:
+            parts.append(f"((x + {n})!)!")
+        else:
+            parts.append(f"(x + {n})!")
+    return " + ".join(parts)
+
+
+def best(function, number: int = 1) -> float:
+    return min(timeit.repeat(function, number=number, repeat=REPEAT)) / number
+
+
+if __name__ == '__main__':
+    print(f"{'factorials':>10} {'chars':>7} {'brackets (ms)':>14} {'parse (ms)':>11} {'us/factorial':>13}")
+
+    for size in SIZES:
+        source = generate(size)
+        tokens = tokenize(source)
+
+        matching = best(lambda: match_brackets(tokens))
+        parsing = best(lambda: parse(source))
+
+        print(
+            f"{size:>10} {len(source):>7} {matching * 1000:>14.3f} {parsing * 1000:>11.3f} "
+            f"{parsing / size * 1e6:>13.2f}"
+        )
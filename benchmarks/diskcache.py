@@ -0,0 +1,42 @@
+# Benchmarks for loading compiled expressions from `DISK_CACHE`, instead of parsing and compiling them
+# Run from the root of the repository: `python benchmarks/diskcache.py`
+import tempfile
+import timeit
+
+from cake import Expression
+from cake.parsing import PARSE_CACHE, DISK_CACHE
+
+SOURCES = (
+    "x ** 2 + 3x",
+    "sin(x) ** 2 + 2 * pi * sin(x) + cos(y) / sqrt(x + y)",
+    " + ".join(f"{n} * x ** {n}" for n in range(1, 41)),
+)
+REPEAT = 5
+NUMBER = 20
+
+
+def best(function) -> float:
+    return min(timeit.repeat(function, number=NUMBER, repeat=REPEAT)) / NUMBER
+
+
+def cold_start(source: str):
+    # Like a new process, nothing is cached in memory
+    PARSE_CACHE.clear()
+    return Expression(source).compile().evaluate({"x": 2, "y": 3})
+
+
+if __name__ == '__main__':
+    print(f"{'chars':>6} {'compile (ms)':>13} {'disk (ms)':>10} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for source in SOURCES:
+            DISK_CACHE.directory = None
+            compiling = best(lambda: cold_start(source))
+
+            DISK_CACHE.directory = directory
+            cold_start(source)
+            loading = best(lambda: cold_start(source))
+
+            print(f"{len(source):>6} {compiling * 1000:>13.3f} {loading * 1000:>10.3f} {compiling / loading:>7.1f}x")
+
+        DISK_CACHE.directory = None
@@ -0,0 +1,56 @@
+# Benchmarks for the tree walking evaluator, compared with evaluating generated code and the `execCode` path
+# Run from the root of the repository: `python benchmarks/evaluator.py`
+import timeit
+
+from cake import Expression
+
+SOURCES = (
+    "x ** 2 + 3x + sin(y)",
+    "sin(x) * cos(y) + sqrt(x * y) / (x + y) - tan(x) ** 2",
+    "sqrt(x) (+|-) y (+|-) 1",
+)
+VALUES = {"x": 4, "y": 30}
+NUMBER = 200
+REPEAT = 5
+
+
+def best(function, number: int = NUMBER) -> float:
+    return min(timeit.repeat(function, number=number, repeat=REPEAT)) / number
+
+
+if __name__ == '__main__':
+    for source in SOURCES:
+        legacy = Expression(source)
+
+        code = Expression(source)
+        code.compile()
+
+        tree = Expression(source)
+        tree.evaluator = "tree"
+        tree.compile()
+
+        assert tree.substitute(**VALUES) == code.substitute(**VALUES)
+
+        print(source)
+        if "(+|-)" not in source:
+            # Expressions using `(+|-)` are always compiled
+            exec_time = best(lambda: legacy.substitute(**VALUES), 20)
+            print(f"execCode: {exec_time * 1e6:.1f} us")
+        else:
+            exec_time = None
+
+        code_time = best(lambda: code.substitute(**VALUES))
+        tree_time = best(lambda: tree.substitute(**VALUES))
+        print(f"generated code: {code_time * 1e6:.1f} us")
+        print(f"tree: {tree_time * 1e6:.1f} us ({code_time / tree_time:.2f}x generated code)", end="")
+        print(f", {exec_time / tree_time:.1f}x execCode" if exec_time else "")
+
+        # The first evaluation includes generating code, which the tree evaluator doesn't need
+        first_code = best(lambda: Expression(source).substitute(**VALUES), 20)
+
+        def first_tree():
+            expr = Expression(source)
+            expr.evaluator = "tree"
+            expr.substitute(**VALUES)
+
+        print(f"first evaluation: {first_code * 1e6:.1f} us -> {best(first_tree, 20) * 1e6:.1f} us with the tree evaluator\n")
@@ -0,0 +1,44 @@
+# Benchmarks for gradients from `Expression.grad`, compared with central finite differences
+# Run from the root of the repository: `python benchmarks/grad.py`
+import timeit
+
+from cake import Expression
+
+SOURCE = "x * y ** 2 + sqrt(y) * z + sin(z) * cos(y) + (y + z) ** 3 / x"
+VALUES = (2.0, 4.0, 5.0)
+STEP = 1e-6
+NUMBER = 2000
+REPEAT = 5
+
+
+def best(function) -> float:
+    return min(timeit.repeat(function, number=NUMBER, repeat=REPEAT)) / NUMBER
+
+
+def finite_differences(function, values: tuple) -> tuple:
+    partials = list()
+
+    for index in range(len(values)):
+        above = list(values)
+        below = list(values)
+        above[index] += STEP
+        below[index] -= STEP
+        partials.append((function(*above) - function(*below)) / (2 * STEP))
+    return function(*values), tuple(partials)
+
+
+if __name__ == '__main__':
+    expr = Expression(SOURCE)
+    function = expr.lambdify()
+    gradient = expr.grad()
+
+    value, exact = gradient(*VALUES)
+    _, estimated = finite_differences(function, VALUES)
+    error = max(abs(a - b) for a, b in zip(exact, estimated))
+
+    before = best(lambda: finite_differences(function, VALUES))
+    after = best(lambda: gradient(*VALUES))
+
+    print(SOURCE)
+    print(f"gradient: {exact}, largest difference from finite differences: {error:.2e}")
+    print(f"finite differences: {before * 1e6:.1f} us, grad: {after * 1e6:.1f} us ({before / after:.2f}x)")
@@ -0,0 +1,51 @@
+# Benchmarks for building an expression piece by piece with `Expression.append`
+# Run from the root of the repository: `python benchmarks/incremental.py`
+import timeit
+
+from cake import Expression
+from cake.parsing import PARSE_CACHE, incremental
+
+TERMS = (10, 50, 100, 200)
+REPEAT = 5
+
+
+def build(terms: int) -> Expression:
+    expr = Expression("x")
+
+    for n in range(terms):
+        expr.append(f" + {n} * x ** 2")
+        expr._parsed()
+    return expr
+
+
+def rebuild(terms: int) -> Expression:
+    # What every edit used to cost, parsing the whole expression again
+    source = "x"
+    expr = Expression(source)
+
+    for n in range(terms):
+        source += f" + {n} * x ** 2"
+        expr = Expression(source)
+    return expr
+
+
+def best(function) -> float:
+    return min(timeit.repeat(function, number=1, repeat=REPEAT))
+
+
+if __name__ == '__main__':
+    print(f"{'terms':>6} {'incremental (ms)':>17} {'full (ms)':>10} {'speedup':>8}")
+
+    # Measure parsing every time, instead of cache lookups
+    PARSE_CACHE.maxsize = 0
+
+    for terms in TERMS:
+        assert str(build(terms)._parsed().tree) == str(rebuild(terms)._parsed().tree)
+
+        incremental.STATS.clear()
+        grafting = best(lambda: build(terms))
+        assert incremental.STATS["parsed"] == 0, "An edit wasn't grafted"
+
+        parsing = best(lambda: rebuild(terms))
+
+        print(f"{terms:>6} {grafting * 1000:>17.2f} {parsing * 1000:>10.2f} {parsing / grafting:>7.1f}x")
@@ -0,0 +1,49 @@
+# Benchmarks for parsing and evaluating deeply nested functions, such as `sin(x + cos(x + tan(...)))`
+# Run from the root of the repository: `python benchmarks/nested.py`
+import timeit
+
+from cake import Expression
+from cake.parsing import PARSE_CACHE
+from cake.parsing.parser import parse
+
+DEPTHS = (4, 8, 16, 32, 64, 128, 256, 512)
+FUNCTIONS = ("sin", "cos", "tan", "sqrt")
+REPEAT = 5
+
+
+def generate(depth: int) -> str:
+    # Every level adds a term, so the length of the expression grows with its depth
+    source = "x"
+
+    for level in range(depth):
+        source = f"{FUNCTIONS[level % len(FUNCTIONS)]}(x + {source})"
+    return source
+
+
+def best(function, number: int = 1) -> float:
+    return min(timeit.repeat(function, number=number, repeat=REPEAT)) / number
+
+
+if __name__ == '__main__':
+    print(
+        f"{'depth':>6} {'chars':>7} {'parse (ms)':>11} {'_sub (ms)':>10} {'code (ms)':>10} {'us/level':>9} "
+        f"{'substitute (ms)':>16}"
+    )
+
+    # Measure parsing every time, instead of cache lookups
+    PARSE_CACHE.maxsize = 0
+
+    for depth in DEPTHS:
+        source = generate(depth)
+        expr = Expression(source)
+
+        parsing = best(lambda: parse(source))
+        sub = best(expr._sub)
+        code = best(lambda: expr._glSubCode(False, x=1))
+        # Past python's nesting limits the expression is compiled and walked instead
+        substitute = best(lambda: Expression(source).substitute(x=1))
+
+        print(
+            f"{depth:>6} {len(source):>7} {parsing * 1000:>11.3f} {sub * 1000:>10.3f} "
+            f"{code * 1000:>10.3f} {code / depth * 1e6:>9.2f} {substitute * 1000:>16.3f}"
+        )
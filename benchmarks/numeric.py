@@ -0,0 +1,46 @@
+# Benchmarks for numeric mode, which evaluates on plain numbers instead of creating cake's objects for every intermediate value
+# Run from the root of the repository: `python benchmarks/numeric.py`
+import timeit
+
+from cake import Expression
+
+SOURCES = (
+    "x ** 2 + 3x + sin(y)",
+    "sin(x) * cos(y) + sqrt(x * y) / (x + y) - tan(x) ** 2",
+    # Compiled polynomials are already evaluated on plain numbers, so this should be about the same
+    "x ** 7 + 3 * x ** 5 - 2x + y",
+    "sqrt(x) (+|-) y (+|-) 1",
+)
+VALUES = {"x": 4, "y": 30}
+NUMBER = 2000
+REPEAT = 5
+
+
+def best(function, number: int = NUMBER) -> float:
+    return min(timeit.repeat(function, number=number, repeat=REPEAT)) / number
+
+
+if __name__ == '__main__':
+    for source in SOURCES:
+        expr = Expression(source)
+        expr.compile()
+
+        numeric = Expression(source)
+        numeric.numeric = True
+        numeric.compile()
+
+        # Warm the generated code for both modes
+        expr.substitute(**VALUES)
+        numeric.substitute(**VALUES)
+
+        objects = best(lambda: expr.substitute(**VALUES))
+        plain = best(lambda: numeric.substitute(**VALUES))
+
+        print(source)
+        print(f"cake objects: {objects * 1e6:.1f} us")
+        print(f"numeric: {plain * 1e6:.1f} us ({objects / plain:.1f}x faster)")
+
+        rows = [(1 + x % 80, 30) for x in range(1000)]
+        objects = best(lambda: list(expr.substitute_many(rows)), 5)
+        plain = best(lambda: list(numeric.substitute_many(rows)), 5)
+        print(f"substitute_many, 1000 rows: {objects * 1e3:.1f} ms -> {plain * 1e3:.1f} ms ({objects / plain:.1f}x faster)\n")
@@ -0,0 +1,37 @@
+# Benchmarks for constant folding and common subexpression elimination
+# Run from the root of the repository: `python benchmarks/optimize.py`
+import timeit
+
+from cake.parsing import CompiledExpression
+from cake.parsing.parser import parse
+
+EXPRESSIONS = (
+    "2 * pi * x + e ** 2 * y + sqrt(2) * 3",
+    "sin(x) ** 2 + cos(x) ** 2 + sin(x) * cos(x)",
+    "sqrt(x y) + sqrt(x y) * sin(sqrt(x y)) + (x + y) ** 2 / (x + y)",
+)
+NUMBER = 200
+REPEAT = 5
+
+
+def best(function) -> float:
+    return min(timeit.repeat(function, number=NUMBER, repeat=REPEAT)) / NUMBER
+
+
+if __name__ == '__main__':
+    mapping = {"x": 30, "y": 60}
+
+    for source in EXPRESSIONS:
+        tree = parse(source)
+
+        plain = CompiledExpression(tree, optimize=False)
+        optimized = CompiledExpression(tree)
+
+        assert plain.evaluate(mapping) == optimized.evaluate(mapping)
+
+        before = best(lambda: plain.evaluate(mapping))
+        after = best(lambda: optimized.evaluate(mapping))
+
+        print(source)
+        print(optimized.dump())
+        print(f"# {before * 1e6:.1f} us -> {after * 1e6:.1f} us ({before / after:.2f}x)\n")
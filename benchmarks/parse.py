@@ -0,0 +1,61 @@
+# Benchmarks for parsing long, machine generated expressions
+# Run from the root of the repository: `python benchmarks/parse.py`
+import random
+import timeit
+
+from cake import Expression
+from cake.parsing import PARSE_CACHE
+from cake.parsing.lexer import tokenize
+from cake.parsing.parser import parse
+
+SIZES = (50, 100, 200, 400, 800, 1600)
+REPEAT = 5
+
+
+def generate(terms: int, seed: int = 0) -> str:
+    # Mixes coefficients, powers, functions and plain products
+    rng = random.Random(seed)
+    parts = list()
+
+    for _ in range(terms):
+        kind = rng.randrange(4)
+
+        if kind == 0:
+            parts.append(f"{rng.randint(1, 99)}x")
+        elif kind == 1:
+            parts.append(f"(y ** {rng.randint(2, 5)})")
+        elif kind == 2:
+            parts.append(f"sqrt({rng.randint(1, 99)})")
+        else:
+            parts.append(f"{rng.randint(1, 99)} * z")
+    return " + ".join(parts)
+
+
+def best(function, number: int = 1) -> float:
+    return min(timeit.repeat(function, number=number, repeat=REPEAT)) / number
+
+
+if __name__ == '__main__':
+    print(
+        f"{'terms':>6} {'chars':>7} {'tokenize (ms)':>14} {'parse (ms)':>11} "
+        f"{'_sub (ms)':>10} {'cached _sub (ms)':>17} {'us/term':>8}"
+    )
+
+    for size in SIZES:
+        source = generate(size)
+        expr = Expression(source)
+
+        lexing = best(lambda: tokenize(source))
+        parsing = best(lambda: parse(source))
+
+        maxsize = PARSE_CACHE.maxsize
+        PARSE_CACHE.maxsize = 0
+        sub = best(expr._sub)
+
+        PARSE_CACHE.maxsize = maxsize
+        cached = best(expr._sub)
+
+        print(
+            f"{size:>6} {len(source):>7} {lexing * 1000:>14.3f} {parsing * 1000:>11.3f} "
+            f"{sub * 1000:>10.3f} {cached * 1000:>17.3f} {parsing / size * 1e6:>8.2f}"
+        )
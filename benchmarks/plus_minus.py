@@ -0,0 +1,46 @@
+# Benchmarks for expressions using the `(+|-)` operator
+# Run from the root of the repository: `python benchmarks/plus_minus.py`
+import timeit
+
+from cake import Expression
+from cake.parsing import CompiledExpression
+from cake.parsing.parser import parse
+
+OPERATORS = (1, 2, 4, 6, 8)
+REPEAT = 3
+
+SHARED = "sin(x) * cos(y) + sqrt(x y) * tan(x) + (x + y) ** 2"
+# Doesn't depend on any sign, so the engine only evaluates it once
+
+
+def generate(operators: int) -> str:
+    return f"{SHARED}" + "".join(f" (+|-) {n + 1}x" for n in range(operators))
+
+
+def best(function, number: int = 1) -> float:
+    return min(timeit.repeat(function, number=number, repeat=REPEAT)) / number
+
+
+if __name__ == '__main__':
+    print(f"{'(+|-)':>6} {'results':>8} {'exec (ms)':>10} {'cold (ms)':>10} {'warm (ms)':>10} {'first (ms)':>11}")
+
+    for operators in OPERATORS:
+        source = generate(operators)
+        tree = parse(source)
+
+        # The legacy path splices the signs into generated code and runs each combination
+        legacy = best(lambda: Expression(source).substitute(False, ("math *",), x=30, y=60))
+
+        # Generating code for every combination, then evaluating it
+        cold = best(lambda: CompiledExpression(tree).evaluate({"x": 30, "y": 60}))
+
+        compiled = CompiledExpression(tree)
+        compiled.evaluate({"x": 30, "y": 60})
+        warm = best(lambda: compiled.evaluate({"x": 30, "y": 60}), number=10)
+
+        first = best(lambda: next(CompiledExpression(tree).branches({"x": 30, "y": 60})))
+
+        print(
+            f"{operators:>6} {2 ** operators:>8} {legacy * 1000:>10.2f} {cold * 1000:>10.2f} "
+            f"{warm * 1000:>10.2f} {first * 1000:>11.2f}"
+        )
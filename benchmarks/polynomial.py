@@ -0,0 +1,54 @@
+# Benchmarks for polynomials evaluated using horner's scheme, compared with `substitute` before polynomials were detected
+# Run from the root of the repository: `python benchmarks/polynomial.py`
+import timeit
+
+from cake import Expression
+
+SOURCES = (
+    "x ** 7 + 3 * x ** 5 - 2 * x ** 2 + x - 9",
+    "x ** 3 * y + 2 * x ** 2 * y ** 2 - 5 * x * y + y ** 3 - 1",
+)
+VALUES = {"x": 1.5, "y": 2.5}
+NUMBER = 500
+REPEAT = 5
+
+
+def best(function, number: int = NUMBER) -> float:
+    return min(timeit.repeat(function, number=number, repeat=REPEAT)) / number
+
+
+if __name__ == '__main__':
+    for source in SOURCES:
+        legacy = Expression(source)
+        general = Expression(source)
+        horner = Expression(source)
+        # Without optimizations, polynomials aren't detected
+        unoptimized = general.compile(optimize=False)
+        compiled = horner.compile()
+
+        values = {name: VALUES[name] for name in compiled.variables}
+        assert abs(unoptimized.lambdify()(*values.values()) - float(horner.substitute(**values))) < 1e-9
+
+        print(source)
+        print(f"horner form: {compiled.polynomial.horner()}")
+
+        first = best(lambda: legacy.substitute(**values), 50)
+        second = best(lambda: general.substitute(**values))
+        third = best(lambda: horner.substitute(**values))
+        print(f"substitute, not compiled: {first * 1e6:.1f} us")
+        print(f"substitute, compiled: {second * 1e6:.1f} us")
+        print(f"substitute, horner: {third * 1e6:.1f} us ({second / third:.2f}x faster than compiled, {first / third:.2f}x than not compiled)")
+
+        try:
+            import numpy
+        except ImportError:
+            print()
+            continue
+
+        arrays = {name: numpy.linspace(-2, 2, 10 ** 5) for name in values}
+        function = unoptimized.lambdify(backend="numpy")
+        polynomial = compiled.polynomial
+
+        before = best(lambda: function(*arrays.values()), 20)
+        after = best(lambda: polynomial(*arrays.values()), 20)
+        print(f"10 ** 5 element arrays: {before * 1e3:.2f} ms -> {after * 1e3:.2f} ms ({before / after:.2f}x)\n")
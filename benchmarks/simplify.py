@@ -0,0 +1,32 @@
+# Benchmarks for evaluating expressions before and after `Expression.simplify`
+# Run from the root of the repository: `python benchmarks/simplify.py`
+import timeit
+
+from cake import Expression
+from cake.parsing.simplify import simplify
+
+SOURCE = "((x * 1 + 0) * x + 2 * x ** 2) * 1 + (y * x + 2 * x * y) / 1 - (x ** 2) ** 3 / x + 0 * y + x * x * x"
+VALUES = {"x": 2, "y": 3}
+NUMBER = 200
+REPEAT = 5
+
+
+def best(function) -> float:
+    return min(timeit.repeat(function, number=NUMBER, repeat=REPEAT)) / NUMBER
+
+
+if __name__ == '__main__':
+    expr = Expression(SOURCE)
+    simplified = expr.simplify()
+    simplified.compile()
+
+    print(simplify(expr.compile().tree).dump())
+
+    before = best(lambda: expr.substitute(**VALUES))
+    after = best(lambda: simplified.substitute(**VALUES))
+    print(f"substitute: {before * 1e6:.1f} us -> {after * 1e6:.1f} us ({before / after:.2f}x)")
+
+    function, reduced = expr.lambdify(), simplified.lambdify()
+    before = best(lambda: function(2.0, 3.0))
+    after = best(lambda: reduced(2.0, 3.0))
+    print(f"lambdify: {before * 1e6:.2f} us -> {after * 1e6:.2f} us ({before / after:.2f}x)")
@@ -0,0 +1,36 @@
+# Benchmarks for solving the same expression for many sets of values, using `Expression.solve`
+# Run from the root of the repository: `python benchmarks/solve.py`
+import timeit
+
+from cake import Expression
+
+SOURCE = "a * x ** 3 + b * x - c"
+ROWS = 10000
+REPEAT = 3
+
+
+def best(function) -> float:
+    return min(timeit.repeat(function, number=1, repeat=REPEAT)) / ROWS
+
+
+if __name__ == '__main__':
+    expr = Expression(SOURCE)
+    rows = [{"a": 1.0, "b": 2.0, "c": float(c)} for c in range(ROWS)]
+
+    assert abs(expr.solve(**rows[3]).value - 1.0) < 1e-12
+
+    single = best(lambda: [expr.solve(**row) for row in rows])
+    many = best(lambda: list(expr.solve_many(rows)))
+
+    print(SOURCE)
+    print(f"solve: {single * 1e6:.1f} us per row ({1 / single:,.0f} per second)")
+    print(f"solve_many: {many * 1e6:.1f} us per row ({1 / many:,.0f} per second)")
+
+    try:
+        import numpy
+    except ImportError:
+        print("arrays: skipped, numpy is not installed")
+    else:
+        c = numpy.arange(ROWS, dtype=float)
+        array = best(lambda: expr.solve(a=1.0, b=2.0, c=c))
+        print(f"arrays: {array * 1e6:.2f} us per row ({1 / array:,.0f} per second)")
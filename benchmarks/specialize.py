@@ -0,0 +1,28 @@
+# Benchmarks for sweeping one unknown, with the others fixed using `Expression.specialize`
+# Run from the root of the repository: `python benchmarks/specialize.py`
+import timeit
+
+from cake import Expression
+
+SOURCE = "x * y ** 2 + sqrt(y) * z + sin(z) * cos(y) + (y + z) ** 3 / x"
+NUMBER = 500
+REPEAT = 5
+
+
+def best(function) -> float:
+    return min(timeit.repeat(function, number=NUMBER, repeat=REPEAT)) / NUMBER
+
+
+if __name__ == '__main__':
+    expr = Expression(SOURCE)
+    expr.compile()
+
+    fixed = expr.specialize(y=4, z=5)
+    assert fixed.substitute(x=2) == expr.substitute(x=2, y=4, z=5)
+
+    before = best(lambda: expr.substitute(x=2, y=4, z=5))
+    after = best(lambda: fixed.substitute(x=2))
+
+    print(SOURCE)
+    print(f"specialized: {fixed}")
+    print(f"compiled: {before * 1e6:.1f} us, specialized: {after * 1e6:.1f} us ({before / after:.2f}x)")
@@ -0,0 +1,57 @@
+# Benchmarks for evaluating a file with one expression per line, compared with reading it and passing the text to `Expression`
+# Run from the root of the repository: `python benchmarks/stream.py`
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from cake import Expression
+from cake.parsing import iter_results
+
+LINES = 10000
+VALUES = {"x": 2, "y": 30}
+
+
+def measure(function) -> tuple:
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+
+    # Tracing slows everything down, so memory is measured separately
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def eager(path: str) -> None:
+    with open(path) as fp:
+        for expr in Expression(fp.read().strip()):
+            expr.substitute(**VALUES)
+
+
+def streamed(path: str, workers=None) -> None:
+    with open(path, "rb") as fp:
+        for _ in iter_results(fp, workers=workers, **VALUES):
+            pass
+
+
+if __name__ == '__main__':
+    random.seed(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "formulas.txt")
+
+        with open(path, "w") as fp:
+            for n in range(LINES):
+                fp.write(f"{random.randint(1, 9)} * x ** 2 + {random.randint(1, 99)} * x - sin(y) + {n}\n")
+
+        for name, function in (
+            ("Expression(fp.read())", lambda: eager(path)),
+            ("iter_results", lambda: streamed(path)),
+            ("iter_results, 4 workers", lambda: streamed(path, workers=4)),
+        ):
+            elapsed, peak = measure(function)
+            print(f"{name}: {elapsed * 1e6 / LINES:.1f} us per line, peak memory {peak / 1024:.0f} KiB")
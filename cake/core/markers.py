@@ -13,13 +13,11 @@
 
 
 def getPlusMinusCombos(slots: int = 1) -> list:
+    # One sign for each slot, so there are 2 ** slots combinations
     if not slots:
         return []
 
-    if slots == 1:
-        return ['+', '-']
-    prodString = "+-" * slots
-    return list({''.join(combo) for combo in itertools.product(prodString, repeat=len(prodString))})
+    return [''.join(combo) for combo in itertools.product("+-", repeat=slots)]
 
 
 class Marker(object):
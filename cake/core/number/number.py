@@ -128,7 +128,7 @@ def __add__(self, O):
 
     def __sub__(self, O):
         """ Subtract the number with O """
-        return evaluate(self.value, -O, return_class=cake.convert_type, func='sub')
+        return evaluate(self.value, O, return_class=cake.convert_type, func='sub')
 
     def __mul__(self, O):
         """ Mutliply the number with O """
@@ -220,40 +220,40 @@ def __ror__(self, O):
     # __i... dunders are called by `x += Number`
 
     def __iadd__(self, O):
-        return O + self
+        return self + O
 
     def __isub__(self, O):
-        return O - self
+        return self - O
 
     def __imul__(self, O):
-        return O * self
+        return self * O
 
     def __itruediv__(self, O):
-        return O / self
+        return self / O
 
     def __ifloordiv__(self, O):
-        return O // self
+        return self // O
 
     def __imod__(self, O):
-        return O % self
+        return self % O
     
     def __ipow__(self, O):
-        return O ** self
+        return self ** O
 
     def __ilshift__(self, O):
-        return O << self
+        return self << O
 
     def __irshift__(self, O):
-        return O >> self
+        return self >> O
 
     def __iand__(self, O):
-        return O & self
+        return self & O
 
     def __ixor__(self, O):
-        return O ^ self
+        return self ^ O
 
     def __ior__(self, O):
-        return O | self
+        return self | O
 
     # #########
     #
@@ -23,6 +23,16 @@ def evaluate(N, O, *, return_class = None, func: str = 'add'):
     func: :class:`str`
         The name of the operation, check out the ``operator`` module
     """
+    if isinstance(func, str) and isinstance(O, (cake.Unknown, cake.Equation)):
+        # Unknowns also have a `value`, their letter, so they're handed to their own reflected operator first
+        reflected = getattr(O, f'__r{func.rstrip("_")}__', None)
+
+        if reflected is not None:
+            result = reflected(N)
+
+            if result is not NotImplemented:
+                return result
+
     if hasattr(O, 'value'):
         O = O.value
     if hasattr(O, 'get_value'):
@@ -48,6 +58,6 @@ def evaluate(N, O, *, return_class = None, func: str = 'add'):
         return cake.Expression(f'({O.expression}) + {N}')
 
     try:
-        return func(O, N) if not return_class else return_class(func(O, N))
+        return func(N, O) if not return_class else return_class(func(N, O))
     except Exception as e:
         raise cake.InvalidObject(f'Cannot add type {N.__class__.__name__} with type {O.__class__.__name__}') from e
@@ -42,6 +42,10 @@ def __init__(
             float(value), check_value_attr, float, Irrational, *args, **kwargs
         )
 
+    def __getnewargs__(self) -> tuple:
+        # Without this, unpickling calls `__new__` with no value and returns an `Integer`
+        return (self._value,)
+
     def __repr__(self) -> str:
         """
         Return the integer set when initialising the class
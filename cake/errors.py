@@ -12,3 +12,7 @@ class EquationParseError(Exception):
 
 class SubstitutionError(Exception):
     """Raised when an error occurs during substitution"""
+
+
+class SolveError(Exception):
+    """Raised when no solution could be found for an expression"""
@@ -76,9 +76,16 @@ def __init__(self, x, *, type: str = "") -> None:
         super().__init__(x, "erf", math.erf, type=type)
 
 
+def _factorial(x):
+    # Cake's numbers hold floats, which `math.factorial` stopped accepting in python 3.10
+    if isinstance(x, float) and x.is_integer():
+        x = int(x)
+    return math.factorial(x)
+
+
 class Factorial(MaskFunctionTemp):
     def __init__(self, x, *, type: str = "") -> None:
-        super().__init__(x, "factorial", math.factorial, type=type)
+        super().__init__(x, "factorial", _factorial, type=type)
 
 
 class Floor(MaskFunctionTemp):
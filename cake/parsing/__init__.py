@@ -1,2 +1,8 @@
 from .equation import Equation
 from .expression import Expression
+from .compiled import CompiledExpression
+from .cache import ParseCache, PARSE_CACHE
+from .intern import InternTable, INTERN_TABLE
+from .diskcache import DiskCache, DISK_CACHE
+from .stream import iter_expressions, iter_results
+from .profiling import Profiler, PROFILER, profile
@@ -1,6 +1,8 @@
 # Parsing Helpers
 import ast
 import typing
+
+from .profiling import PROFILER as _PROFILER
 from typing import (
     Any, List, Tuple, Union, Dict
 )
@@ -54,6 +56,7 @@ def getEvalBody(code: Union[List[str], str], *imports) -> Tuple[str, List[str]]:
     return code, _ModImports
 
 
+@_PROFILER.timed("exec")
 def execCode(code: str, *, local: dict = {}) -> typing.Any:
     evalBody, imports = getEvalBody(code)
 
@@ -0,0 +1,244 @@
+"""
+Backends used when converting an expression into a plain python function.
+
+Each backend provides the primitive functions (``sin``, ``sqrt``, ...) which the functions in
+``pABC.KEYWORDS`` are written in terms of, so the same generated code can run on floats or any other type.
+"""
+import cmath
+import math
+import sys
+import typing
+
+from cake import errors
+from . import pABC
+
+__all__ = ("Backend", "MpmathBackend", "BACKENDS", "FUNCTIONS", "get_backend", "mpmath_backend", "is_array")
+
+FUNCTIONS: typing.Mapping[typing.Callable, str] = {
+    pABC.KEYWORDS["sqrt"]: "sqrt({0})",
+    pABC.KEYWORDS["sin"]: "sin(radians({0}))",
+    pABC.KEYWORDS["cos"]: "cos(radians({0}))",
+    pABC.KEYWORDS["tan"]: "tan(radians({0}))",
+    pABC.KEYWORDS["sec"]: "(1 / cos(radians({0})))",
+    pABC.KEYWORDS["cosec"]: "(1 / sin(radians({0})))",
+    pABC.KEYWORDS["cot"]: "(1 / tan(radians({0})))",
+    pABC.SYMBOL_KW["!"]: "gamma({0} + 1)",
+}
+# Cake's trig functions take their input in degrees, so the generated code converts them to radians
+
+PRIMITIVES = ("sqrt", "sin", "cos", "tan", "radians", "gamma")
+
+DEFAULT_PRECISION = 53
+# The number of bits used by the mpmath backend, the same as a float
+
+
+class Backend(object):
+    """
+    A set of primitive functions used by generated code
+
+    Parameters
+    ----------
+    name: :class:`str`
+        The name of the backend, used when selecting it
+    namespace: :class:`dict`
+        A mapping of every name in ``PRIMITIVES`` to its implementation
+    """
+
+    __slots__ = ("name", "namespace")
+
+    def __init__(self, name: str, namespace: typing.Mapping[str, typing.Any]) -> None:
+        self.name = name
+        self.namespace = dict(namespace)
+
+    def literal(self, value: typing.Any, store: typing.Callable[[typing.Any, str], str]) -> str:
+        """
+        Returns the code for a literal
+
+        Parameters
+        ----------
+        value: :class:`~cake.Number`
+            The value of the literal
+        store: :class:`~typing.Callable`
+            Stores an object in the generated codes globals, returning its name
+        """
+        return repr(getattr(value, "value", value))
+
+    def call(self, function: typing.Callable) -> typing.Tuple[str, str]:
+        """
+        Returns the code which goes before and after the argument,
+        when calling a function from ``pABC.KEYWORDS`` or ``pABC.SYMBOL_KW``
+        """
+        try:
+            template = FUNCTIONS[function]
+        except KeyError:
+            raise errors.SubstitutionError(
+                f"{function.__qualname__} is not supported by the {self.name} backend"
+            ) from None
+
+        before, after = template.split("{0}")
+        return before, after
+
+    def __repr__(self) -> str:
+        return f"Backend(name={self.name})"
+
+
+class MpmathBackend(Backend):
+    """
+    A backend which evaluates using mpmath's arbitrary precision numbers, created using :func:`mpmath_backend`.
+    Float literals are converted from their text, so ``0.1`` is exactly a tenth to the working precision instead of the closest float.
+    Like the ``cmath`` backend, ``sqrt`` of a negative real value raises ``ValueError`` the same as :meth:`cake.Expression.substitute`,
+    only complex values give a complex result.
+
+    Parameters
+    ----------
+    context: :class:`mpmath.MPContext`
+        The mpmath context to evaluate with, its precision is fixed when the backend is created
+    """
+
+    __slots__ = ("context",)
+
+    def __init__(self, context: typing.Any) -> None:
+        super().__init__(f"mpmath-{context.prec}", {name: getattr(context, name) for name in PRIMITIVES})
+        self.namespace["sqrt"] = _real_sqrt(context)
+        self.context = context
+
+    def convert(self, value: typing.Any) -> typing.Any:
+        """ Converts a number, or a string such as ``"0.1"``, to an mpmath number at this backend's precision """
+        value = getattr(value, "value", value)
+
+        if isinstance(value, float):
+            return self.context.convert(repr(value))
+        return self.context.convert(value)
+
+    def literal(self, value: typing.Any, store: typing.Callable[[typing.Any, str], str]) -> str:
+        value = getattr(value, "value", value)
+
+        if isinstance(value, int):
+            return repr(value)
+
+        if value == math.pi:
+            return store(self.context.pi, "c")
+        if value == math.e:
+            return store(self.context.e, "c")
+
+        return store(self.convert(value), "c")
+
+
+def mpmath_backend(precision: int = DEFAULT_PRECISION) -> MpmathBackend:
+    """
+    Returns an mpmath backend which works to ``precision`` bits, creating it the first time each precision is used.
+    Functions from :meth:`~cake.parsing.compiled.CompiledExpression.lambdify` are cached by the backends name,
+    so each precision only generates code once.
+
+    Parameters
+    ----------
+    precision: :class:`int`
+        The number of bits in the mantissa, ``53`` is the same as a float and ``200`` is about 60 decimal digits
+    """
+    name = f"mpmath-{precision}"
+
+    if name not in BACKENDS:
+        import mpmath
+
+        if precision < 1:
+            raise ValueError(f"The precision must be at least 1 bit, not {precision}")
+
+        context = mpmath.MPContext()
+        context.prec = precision
+        BACKENDS[name] = MpmathBackend(context)
+
+    return BACKENDS[name]
+
+
+def _numpy_backend() -> Backend:
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("The numpy backend requires numpy to be installed") from e
+
+    namespace = {name: getattr(numpy, name) for name in PRIMITIVES if name != "gamma"}
+    # Numpy has no gamma ufunc
+    namespace["gamma"] = numpy.vectorize(math.gamma, otypes=[float])
+
+    return Backend("numpy", namespace)
+
+
+def _complex_aware(real: typing.Callable, complex_: typing.Callable) -> typing.Callable:
+    # Uses cmath's version of a function for complex values, math's raises a `TypeError` for them
+    def function(value):
+        if isinstance(value, complex):
+            return complex_(value)
+        return real(value)
+
+    function.__name__ = real.__name__
+    return function
+
+
+def _real_sqrt(context: typing.Any) -> typing.Callable:
+    # mpmath returns a complex number for the square root of a negative, math raises instead
+    def sqrt(value):
+        if not isinstance(value, context.mpc) and value < 0:
+            raise ValueError("math domain error")
+        return context.sqrt(value)
+
+    return sqrt
+
+
+def _cmath_backend() -> Backend:
+    namespace = {name: getattr(math, name) for name in PRIMITIVES}
+    namespace.update(
+        (name, _complex_aware(getattr(math, name), getattr(cmath, name)))
+        for name in ("sqrt", "sin", "cos", "tan")
+    )
+    # `radians` only multiplies, so it already works on complex values
+
+    return Backend("cmath", namespace)
+
+
+BACKENDS: typing.Dict[str, Backend] = {
+    "math": Backend("math", {name: getattr(math, name) for name in PRIMITIVES}),
+    "cmath": _cmath_backend(),
+}
+# The `cmath` backend works on ints, floats and complex numbers, real values are passed to math so they behave the same
+
+LAZY_BACKENDS: typing.Dict[str, typing.Callable[[], Backend]] = {
+    "numpy": _numpy_backend,
+    "mpmath": mpmath_backend,
+}
+# Backends which depend on optional libraries, these are created the first time they are used
+
+
+def get_backend(backend: typing.Union[str, Backend]) -> Backend:
+    """
+    Returns a backend from its name
+
+    Parameters
+    ----------
+    backend: :class:`~typing.Union[str, Backend]`
+        The name of the backend, if a ``Backend`` is provided it is returned as it is.
+        ``"mpmath-200"`` is the mpmath backend with a precision of 200 bits, see :func:`mpmath_backend`
+    """
+    if isinstance(backend, Backend):
+        return backend
+
+    if backend not in BACKENDS and backend in LAZY_BACKENDS:
+        BACKENDS[backend] = LAZY_BACKENDS[backend]()
+
+    if backend not in BACKENDS and backend.startswith("mpmath-") and backend[7:].isdigit():
+        return mpmath_backend(int(backend[7:]))
+
+    try:
+        return BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            "Unknown backend {}, Choose from:\n{}".format(
+                backend, ", ".join({**LAZY_BACKENDS, **BACKENDS})
+            )
+        ) from None
+
+
+def is_array(value: typing.Any) -> bool:
+    """ Check if a value is a numpy array, without importing numpy """
+    numpy = sys.modules.get("numpy")
+
+    return numpy is not None and isinstance(value, numpy.ndarray)
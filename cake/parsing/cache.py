@@ -0,0 +1,197 @@
+"""
+A process wide cache of parsed expressions.
+
+Expressions are usually built from the same strings over and over, so the tokens and tree
+for each string are kept in a bounded least recently used cache instead of being parsed every time.
+"""
+import collections
+import threading
+import typing
+
+from .lexer import Token, tokenize
+from .parser import Parser
+from .tree import Node
+from .intern import INTERN_TABLE
+from .diskcache import DISK_CACHE
+from .profiling import PROFILER
+
+__all__ = ("CacheInfo", "ParsedExpression", "ParseCache", "PARSE_CACHE", "normalize")
+
+
+class CacheInfo(typing.NamedTuple):
+    """
+    Statistics for a :class:`ParseCache`, similar to :func:`functools.lru_cache`'s ``cache_info``
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class ParsedExpression(typing.NamedTuple):
+    """
+    A cached expression
+
+    Parameters
+    ----------
+    tokens: :class:`~typing.List[~cake.parsing.lexer.Token]`
+        The tokens of the expression
+    tree: :class:`~typing.Optional[~cake.parsing.tree.Node]`
+        The parsed tree, ``None`` if the expression is empty
+    """
+
+    tokens: typing.List[Token]
+    tree: typing.Optional[Node]
+
+
+def normalize(expression: str) -> str:
+    """ Lowercases an expression and collapses any whitespace, so equivalent strings share a cache entry """
+    return " ".join(expression.lower().split())
+
+
+class ParseCache(object):
+    """
+    A thread safe least recently used cache, mapping normalized expressions to their tokens and tree.
+
+    .. code-block:: py
+
+        >>> from cake.parsing import PARSE_CACHE
+        >>> PARSE_CACHE.parse("x ** 2 + 3x")
+        ParsedExpression(tokens=[...], tree=BinaryOp(x ** 2 + 3 * x))
+        >>> PARSE_CACHE.info()
+        CacheInfo(hits=0, misses=1, evictions=0, maxsize=1024, currsize=1)
+
+    Parameters
+    ----------
+    maxsize: :class:`int`
+        The most expressions to keep, once full the least recently used expression is evicted.
+        ``0`` disables the cache.
+    """
+
+    __slots__ = ("_entries", "_lock", "_maxsize", "hits", "misses", "evictions")
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self._entries: typing.OrderedDict[str, ParsedExpression] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._maxsize = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.maxsize = maxsize
+
+    @property
+    def maxsize(self) -> int:
+        """ The most expressions the cache holds, lowering it evicts the least recently used expressions """
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, value: int) -> None:
+        if value < 0:
+            raise ValueError("maxsize cannot be negative")
+
+        with self._lock:
+            self._maxsize = value
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def parse(self, expression: str) -> ParsedExpression:
+        """
+        Returns the tokens and tree for an expression, parsing it if it isn't cached.
+        If :data:`~cake.parsing.diskcache.DISK_CACHE` is enabled, it's checked before parsing and parsed expressions are added to it.
+        Expressions which fail to parse raise :class:`~cake.errors.SubstitutionError` and aren't cached.
+
+        Parameters
+        ----------
+        expression: :class:`str`
+            The expression to parse
+        """
+        key = normalize(expression)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+
+        stored = DISK_CACHE.load_parsed(key)
+
+        if stored is not None:
+            return self.add(key, ParsedExpression(*stored))
+
+        # Parsed outside of the lock, so other threads aren't blocked by long expressions
+        with PROFILER.phase("tokenize"):
+            tokens = tokenize(key)
+
+        if len(tokens) == 1:
+            # Only the `END` token
+            entry = ParsedExpression(tokens, None)
+        else:
+            with PROFILER.phase("parse"):
+                entry = ParsedExpression(tokens, Parser(tokens).parse())
+
+        DISK_CACHE.store_parsed(key, *entry)
+        return self.add(key, entry)
+
+    def add(self, expression: str, entry: ParsedExpression) -> ParsedExpression:
+        """
+        Store an expression which was parsed elsewhere, such as by :mod:`cake.parsing.incremental`.
+        The tree is interned using :data:`~cake.parsing.intern.INTERN_TABLE`,
+        and the stored entry is returned so it can be used even if the cache is disabled.
+
+        Parameters
+        ----------
+        expression: :class:`str`
+            The expression which was parsed
+        entry: :class:`ParsedExpression`
+            Its tokens and tree
+        """
+        key = normalize(expression)
+
+        if entry.tree is not None:
+            entry = ParsedExpression(entry.tokens, INTERN_TABLE.intern(entry.tree))
+
+        with self._lock:
+            if self._maxsize:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                self._evict()
+
+        return entry
+
+    def info(self) -> CacheInfo:
+        """ Returns the hits, misses and evictions of the cache """
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.evictions, self._maxsize, len(self._entries)
+            )
+
+    def clear(self) -> None:
+        """ Removes every expression from the cache and resets the counters """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __contains__(self, expression: str) -> bool:
+        return normalize(expression) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"ParseCache(maxsize={self._maxsize}, currsize={len(self._entries)})"
+
+
+PARSE_CACHE = ParseCache()
+# Used by every `Expression`, resize it with `PARSE_CACHE.maxsize = ...`
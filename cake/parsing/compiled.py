@@ -0,0 +1,750 @@
+"""
+Compiled expressions, created using :meth:`cake.Expression.compile`.
+"""
+import cmath
+import itertools
+import marshal
+import math
+import typing
+
+from cake import errors
+from cake.helpers import convert_type
+from ..core.unknown.unknown import Unknown
+
+from . import pABC
+from .backends import Backend, get_backend
+from .derivative import derivative
+from .gradient import generate_gradient
+from .roots import Solver
+from .optimize import OptimizedTree, optimize as optimize_tree, fold_constants
+from .polynomial import Polynomial, as_polynomial
+from .evaluator import check_evaluator, evaluate_tree
+from .profiling import PROFILER
+from ..core.number import Number
+
+from .tree import (
+    Node,
+    Literal,
+    Variable,
+    UnaryOp,
+    BinaryOp,
+    PlusMinus,
+    Call,
+    Temporary,
+    flatten,
+    transform,
+    variables,
+    plus_minus_count,
+)
+
+__all__ = ("CompiledExpression", "NUMERIC_TYPES", "generate_source", "sign_independent")
+
+NUMERIC_TYPES = (int, float, complex)
+# The types of values which :meth:`CompiledExpression.evaluate_numeric` evaluates without cake's objects
+
+
+def generate_source(
+    tree: Node,
+    namespace: dict,
+    signs: typing.Sequence[str] = tuple(),
+    backend: typing.Optional[Backend] = None,
+    shared: typing.Optional[typing.Mapping[int, str]] = None,
+) -> str:
+    """
+    Generate a python expression from a tree.
+    Literals and functions are stored in ``namespace`` instead of being written out as text,
+    so they are only created once.
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The tree to generate code for
+    namespace: :class:`dict`
+        The globals the generated code will be evaluated with
+    signs: :class:`~typing.Sequence[str]`
+        The sign to use for each ``(+|-)`` operator, in order of appearance
+    backend: :class:`~cake.parsing.backends.Backend`
+        Generate code which uses the backends functions instead of cake's objects
+    shared: :class:`~typing.Mapping[int, str]`
+        Maps the ``id`` of nodes which have already been evaluated to the name their value is stored under
+    """
+    signs = iter(signs)
+    shared = shared or dict()
+
+    def store(obj: typing.Any, prefix: str) -> str:
+        name = f"_{prefix}{len(namespace)}"
+        namespace[name] = obj
+        return name
+
+    def expand(node: Node) -> list:
+        if id(node) in shared:
+            return [shared[id(node)]]
+
+        if isinstance(node, Literal):
+            if backend is None:
+                return [store(node.value, "c")]
+
+            literal = backend.literal(node.value, store)
+            if literal.startswith("-"):
+                literal = f"({literal})"
+            return [literal]
+
+        if isinstance(node, Call):
+            if backend is None:
+                return [f"{store(node.function, 'f')}(", node.argument, ")()"]
+
+            before, after = backend.call(node.function)
+            return [f"{before}(", node.argument, f"){after}"]
+
+        if isinstance(node, (Variable, UnaryOp, BinaryOp, PlusMinus, Temporary)):
+            return node.layout()
+
+        raise TypeError(f"Cannot generate code for {node!r}")
+
+    parts = list()
+
+    for part in flatten(tree, expand):
+        # Parts are produced in order of appearance, so signs are used in the same order
+        if "(+|-)" in part:
+            part = part.replace("(+|-)", next(signs))
+        parts.append(part)
+
+    return "".join(parts)
+
+
+def sign_independent(tree: Node) -> typing.List[Node]:
+    """
+    Returns the largest subtrees which don't contain a ``(+|-)`` operator, and are worth evaluating once
+    instead of once for each combination of signs. Plain literals and unknowns are left out.
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The tree to search
+    """
+    nodes = list(tree.walk())
+    dependent = set()
+
+    # Children come after their parents in `walk`, so this visits them first
+    for node in reversed(nodes):
+        if isinstance(node, PlusMinus) or any(id(child) in dependent for child in node.children):
+            dependent.add(id(node))
+
+    independent = list()
+
+    for node in nodes:
+        if id(node) not in dependent:
+            continue
+
+        for child in node.children:
+            if id(child) not in dependent and not isinstance(child, (Literal, Variable, Temporary)):
+                independent.append(child)
+    return independent
+
+
+def _has_factorial(tree: Node) -> bool:
+    factorial = pABC.SYMBOL_KW["!"]
+    return any(isinstance(node, Call) and node.function is factorial for node in tree.walk())
+
+
+class CompiledExpression(object):
+    """
+    An expression which has been parsed into a tree once, and can be evaluated repeatedly.
+    Code is generated from the tree the first time it is needed and then reused.
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The parsed expression
+    parses: :class:`int`
+        How many times the expression was tokenized to build the tree
+    optimize: :class:`bool`
+        Fold constants and hoist repeated subexpressions before generating code, see :meth:`dump`.
+        Polynomials are also detected, see :attr:`polynomial`. Defaults to ``True``.
+    """
+
+    __slots__ = (
+        "tree",
+        "optimized",
+        "polynomial",
+        "variables",
+        "plus_minus",
+        "parses",
+        "_code",
+        "_shared",
+        "_functions",
+        "_solvers",
+        "_nested",
+        "_factorial",
+    )
+
+    def __init__(self, tree: Node, *, parses: int = 1, optimize: bool = True) -> None:
+        self.tree = tree
+        self.optimized: typing.Optional[OptimizedTree] = optimize_tree(tree) if optimize else None
+        self.polynomial: typing.Optional[Polynomial] = as_polynomial(tree) if optimize else None
+        # Evaluated using horner's scheme on raw numbers, when every unknown has a real value
+        self.variables = variables(tree)
+        self.plus_minus = plus_minus_count(tree)
+        self.parses = parses
+
+        self._code = dict()
+        self._shared = None
+        self._functions = dict()
+        self._solvers = dict()
+        self._nested: typing.Optional[bool] = None
+        # Whether python can't compile code for the expression, found out the first time it's evaluated
+        self._factorial = _has_factorial(tree)
+        # Backends compute `x!` using gamma, which cake's `Factorial` doesn't, see `evaluate_numeric`
+
+    @property
+    def body(self) -> Node:
+        """ The tree code is generated from, this is the optimized tree unless optimizations are disabled """
+        if self.optimized is not None:
+            return self.optimized.tree
+        return self.tree
+
+    @property
+    def temporaries(self) -> typing.List[typing.Tuple[str, Node]]:
+        """ The repeated subexpressions which are evaluated before :attr:`body` """
+        if self.optimized is not None:
+            return self.optimized.temporaries
+        return list()
+
+    @staticmethod
+    def _prelude(
+        temporaries: typing.List[typing.Tuple[str, Node]],
+        namespace: dict,
+        backend: typing.Optional[Backend] = None,
+    ) -> str:
+        # Assigns every temporary, as items of a tuple
+        return "".join(
+            f"({name} := {generate_source(tree, namespace, backend=backend)}), "
+            for name, tree in temporaries
+        )
+
+    def dump(self) -> str:
+        """
+        Returns the optimized form of the expression as text, showing what was folded and hoisted.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> print(Expression("sin(x) ** 2 + 2 * pi * sin(x)").compile().dump())
+            # folded 1 constant operation(s), hoisted 1 repeated subexpression(s)
+            # 11 nodes -> 9 nodes
+            _t0 = sin(x)
+            _t0 ** 2 + 6.283185307179586 * _t0
+        """
+        if self.optimized is None:
+            return f"# not optimized\n{self.tree}"
+        return self.optimized.dump()
+
+    def shared(self) -> tuple:
+        """
+        Returns a tuple of ``(code, globals, names)`` for the temporaries and subexpressions which don't depend
+        on the signs of any ``(+|-)`` operators. Evaluating the code stores their values in its locals,
+        subexpressions are stored under ``names``.
+        """
+        if self._shared is not None:
+            return self._shared
+
+        with PROFILER.phase("codegen"):
+            namespace = {"__builtins__": {}}
+            nodes = sign_independent(self.body)
+
+            names = {id(node): f"_s{index}" for index, node in enumerate(nodes)}
+            source = self._prelude(self.temporaries, namespace) + "".join(
+                f"({names[id(node)]} := {generate_source(node, namespace)}), " for node in nodes
+            )
+
+            self._shared = (compile(f"({source})", "<cake>", "eval"), namespace, names)
+        return self._shared
+
+    def code(self, signs: typing.Tuple[str, ...] = tuple()) -> tuple:
+        """
+        Returns a tuple of ``(code, globals)`` for the provided signs, compiling it if needed.
+        When signs are provided, the code expects the values from :meth:`shared` in its locals.
+        """
+        try:
+            return self._code[signs]
+        except KeyError:
+            pass
+
+        names = self.shared()[2] if signs else None
+        namespace = {"__builtins__": {}}
+
+        with PROFILER.phase("codegen"):
+            if signs:
+                source = generate_source(self.body, namespace, signs, shared=names)
+            else:
+                source = generate_source(self.body, namespace)
+
+                if self.temporaries:
+                    source = f"({self._prelude(self.temporaries, namespace)}{source})[-1]"
+
+            compiled = (compile(source, "<cake>", "eval"), namespace)
+
+        self._code[signs] = compiled
+        return compiled
+
+    def nested(self) -> bool:
+        """
+        Returns ``True`` if the expression is nested too deeply for python to compile code for it,
+        such as ``sin(sin(sin(...)))`` hundreds of levels deep. These expressions are evaluated using
+        :func:`~cake.parsing.evaluator.evaluate_tree` instead, which gives the same results.
+        """
+        if self._nested is None:
+            try:
+                if self.plus_minus:
+                    self.shared()
+                    self.code(("+",) * self.plus_minus)
+                else:
+                    self.code()
+            except (SyntaxError, RecursionError, MemoryError):
+                # Python limits how deeply brackets and expressions can be nested
+                self._nested = True
+            else:
+                self._nested = False
+
+        return self._nested
+
+    def warm(self) -> None:
+        """ Generate code for every combination of signs now, instead of when each one is first needed """
+        if not self.plus_minus:
+            self.code()
+            return
+
+        self.shared()
+
+        for signs in itertools.product("+-", repeat=self.plus_minus):
+            self.code(signs)
+
+    def map_arguments(
+        self,
+        args: typing.Sequence,
+        kwargs: typing.Mapping[str, typing.Any],
+        default_args: typing.Sequence = tuple(),
+        default_kwargs: typing.Optional[typing.Mapping[str, typing.Any]] = None,
+    ) -> dict:
+        """
+        Maps arguments and keyworded arguments onto the unknowns.
+        Arguments are assigned to the unknowns in order of appearance, any missing ones are taken from the defaults.
+        """
+        args = list(args) + list(default_args[len(args) :])
+        kwargs = {**(default_kwargs or {}), **kwargs}
+
+        mapping = dict(zip(self.variables, args))
+        mapping.update(
+            (key, value) for key, value in kwargs.items() if key in self.variables
+        )
+        return mapping
+
+    def bind(self, mapping: typing.Mapping[str, typing.Any]) -> dict:
+        """ Converts a mapping of values into the locals used when evaluating """
+        bound = dict()
+
+        for name in self.variables:
+            if mapping.get(name) is not None:
+                bound[name] = convert_type(mapping[name])
+            else:
+                bound[name] = Unknown(name)
+        return bound
+
+    @PROFILER.timed("evaluate")
+    def evaluate(self, mapping: typing.Mapping[str, typing.Any], evaluator: str = "code") -> typing.Any:
+        """
+        Evaluate the expression with the provided values.
+        If the expression uses the ``(+|-)`` operator, a tuple with a result for each combination of signs is returned.
+        Polynomials are evaluated using horner's scheme on raw numbers, when every unknown has a real value.
+
+        Parameters
+        ----------
+        mapping: :class:`~typing.Mapping[str, typing.Any]`
+            Values for the unknowns, any unknowns which are missing are left as unknowns
+        evaluator: :class:`str`
+            ``"code"`` evaluates generated code, ``"tree"`` walks the tree without generating or running any code,
+            see :func:`~cake.parsing.evaluator.evaluate_tree`. Defaults to ``"code"``.
+            Expressions which are too deeply nested to generate code for are always walked, see :meth:`nested`
+        """
+        if check_evaluator(evaluator) == "tree":
+            return self._evaluate_tree(mapping)
+
+        if self.polynomial is not None:
+            values = [getattr(mapping.get(name), "value", mapping.get(name)) for name in self.variables]
+
+            if all(type(value) in (int, float) for value in values):
+                try:
+                    result = self._arithmetic(self.polynomial(*values))
+                except OverflowError:
+                    result = None
+
+                # Cake can't represent infinite values, these are left to the code below
+                if isinstance(result, int) or (result is not None and math.isfinite(result)):
+                    return convert_type(result)
+
+        if self.nested():
+            return self._evaluate_tree(mapping)
+
+        if not self.plus_minus:
+            code, namespace = self.code()
+            return eval(code, namespace, self.bind(mapping))
+
+        return tuple(result for _, result in self.branches(mapping))
+
+    @PROFILER.timed("numeric")
+    def evaluate_numeric(self, mapping: typing.Mapping[str, typing.Any]) -> typing.Any:
+        """
+        Evaluate the expression on plain ints, floats and complex numbers, only converting the result into cake's objects.
+        Intermediate values skip :func:`~cake.convert_type`, so this is several times faster than :meth:`evaluate`.
+
+        Arithmetic uses python's operators, the same as :meth:`lambdify` with the ``"cmath"`` backend,
+        and polynomials are evaluated using horner's scheme, so results are the same as :meth:`evaluate`'s.
+        If any unknown is missing or isn't one of :data:`NUMERIC_TYPES`, the arithmetic fails or isn't finite,
+        or the expression contains a factorial (backends use gamma, which accepts values cake's ``Factorial`` rejects),
+        the expression is evaluated by :meth:`evaluate` instead.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> expr = Expression("sqrt(x) (+|-) y").compile()
+            >>> expr.evaluate_numeric({"x": -4 + 0j, "y": 1})
+            (Complex((1+2j)), Complex((-1+2j)))
+
+        Parameters
+        ----------
+        mapping: :class:`~typing.Mapping[str, typing.Any]`
+            Values for the unknowns, cake's numbers are converted to their raw values
+        """
+        values = [getattr(mapping.get(name), "value", mapping.get(name)) for name in self.variables]
+
+        if not (self._nested or self._factorial) and all(type(value) in NUMERIC_TYPES for value in values):
+            try:
+                function = self.polynomial if self.polynomial is not None else self.lambdify(backend="cmath")
+            except (SyntaxError, RecursionError, MemoryError):
+                # Too deeply nested to generate code for, see `nested`
+                self._nested = True
+                return self.evaluate(mapping)
+
+            # Cake can't represent infinite values, errors are also left to `evaluate` so they're raised the same way
+            try:
+                result = function(*values)
+                result = tuple(map(self._arithmetic, result)) if self.plus_minus else self._arithmetic(result)
+            except (ArithmeticError, ValueError):
+                return self.evaluate(mapping)
+
+            if not self.plus_minus:
+                if type(result) is int or cmath.isfinite(result):
+                    return convert_type(result)
+            elif all(type(value) is int or cmath.isfinite(value) for value in result):
+                return tuple(convert_type(value) for value in result)
+
+        return self.evaluate(mapping)
+
+    def _arithmetic(self, result: typing.Any) -> typing.Any:
+        # Cake's numbers hold floats, so arithmetic on them never gives an int, only a lone unknown keeps its value
+        if type(result) is int and not isinstance(self.tree, Variable):
+            return float(result)
+        return result
+
+    def _evaluate_tree(self, mapping: typing.Mapping[str, typing.Any]) -> typing.Any:
+        if not self.plus_minus:
+            return evaluate_tree(self.body, self._walk_temporaries(self.bind(mapping)))
+        return tuple(result for _, result in self.branches(mapping, "tree"))
+
+    def _walk_temporaries(self, bound: dict) -> dict:
+        # Adds the value of every temporary, for `evaluate_tree`
+        for name, tree in self.temporaries:
+            bound[name] = evaluate_tree(tree, bound)
+        return bound
+
+    def branches(
+        self, mapping: typing.Mapping[str, typing.Any], evaluator: str = "code"
+    ) -> typing.Iterator[typing.Tuple[str, typing.Any]]:
+        """
+        Lazily evaluate every combination of signs for the ``(+|-)`` operators.
+        Yields ``(signs, result)``, where ``signs`` has a ``"+"`` or ``"-"`` for each operator in order of appearance.
+
+        Parts of the expression which don't depend on a sign are only evaluated once,
+        and code for each combination is only generated when it's first reached.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> expr = Expression("sqrt(x) (+|-) 1").compile()
+            >>> [signs for signs, _ in expr.branches({"x": 4})]
+            ['+', '-']
+
+        Parameters
+        ----------
+        mapping: :class:`~typing.Mapping[str, typing.Any]`
+            Values for the unknowns, any unknowns which are missing are left as unknowns
+        evaluator: :class:`str`
+            How to evaluate the expression, see :meth:`evaluate`
+        """
+        bound = self.bind(mapping)
+
+        if check_evaluator(evaluator) == "tree" or self.nested():
+            bound = self._walk_temporaries(bound)
+            known = {id(node): evaluate_tree(node, bound) for node in sign_independent(self.body)}
+
+            for signs in itertools.product("+-", repeat=self.plus_minus):
+                yield "".join(signs), evaluate_tree(self.body, bound, signs, known)
+            return
+
+        if not self.plus_minus:
+            code, namespace = self.code()
+            yield "", eval(code, namespace, bound)
+            return
+
+        code, namespace, _ = self.shared()
+        eval(code, namespace, bound)
+
+        for signs in itertools.product("+-", repeat=self.plus_minus):
+            code, namespace = self.code(signs)
+            yield "".join(signs), eval(code, namespace, bound)
+
+    def specialize(self, mapping: typing.Mapping[str, typing.Any]) -> "CompiledExpression":
+        """
+        Returns a new compiled expression with some of the unknowns replaced by fixed values.
+        Any parts of the expression which only depend on the fixed values are folded into constants,
+        so evaluating the new expression only pays for the parts which use the remaining unknowns.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> expr = Expression("x * y + sqrt(y) * z").compile()
+            >>> expr.specialize({"y": 4, "z": 5})
+            CompiledExpression(x * 4 + 10)
+
+        Parameters
+        ----------
+        mapping: :class:`~typing.Mapping[str, typing.Any]`
+            Values for the unknowns to fix, ``None`` values and unknowns which aren't used are ignored
+        """
+        values = dict()
+
+        for name, value in mapping.items():
+            if name not in self.variables or value is None:
+                continue
+
+            values[name] = convert_type(value)
+
+            if not isinstance(values[name], Number):
+                raise errors.SubstitutionError(f"Cannot specialize {name} with {value!r}, it isn't a number")
+
+        def bind(node: Node, children: tuple) -> Node:
+            if isinstance(node, Variable) and node.name in values:
+                return Literal(values[node.name])
+            return node.with_children(children)
+
+        tree, _ = fold_constants(transform(self.tree, bind))
+        return CompiledExpression(tree, parses=self.parses, optimize=self.optimized is not None)
+
+    def lambdify(self, *argnames: str, backend: typing.Union[str, Backend] = "math") -> typing.Callable:
+        """
+        Convert the expression into a plain python function, which works on raw numbers instead of cake's objects.
+        Functions are cached, so calling this again with the same arguments returns the same function.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> f = Expression("x ** 2 + 3x").compile().lambdify("x")
+            >>> f(2.0)
+            10.0
+
+        Parameters
+        ----------
+        *argnames: :class:`str`
+            The names of the functions arguments, defaults to the unknowns in order of appearance
+        backend: :class:`~typing.Union[str, ~cake.parsing.backends.Backend]`
+            The backend which provides the functions used by the expression, defaults to ``"math"``
+        """
+        backend = get_backend(backend)
+        argnames = argnames or self.variables
+        key = (argnames, backend.name)
+
+        try:
+            return self._functions[key]
+        except KeyError:
+            pass
+
+        missing = [name for name in self.variables if name not in argnames]
+        if missing:
+            raise errors.MissingValue(
+                "No argument was provided for {}".format(", ".join(missing))
+            )
+
+        namespace = {"__builtins__": {}, **backend.namespace}
+
+        # Constants aren't folded, as folding uses cake's objects instead of the backends
+        if self.optimized is not None:
+            optimized = optimize_tree(self.tree, fold=False)
+            tree, temporaries = optimized.tree, optimized.temporaries
+        else:
+            tree, temporaries = self.tree, list()
+
+        if not self.plus_minus:
+            body = generate_source(tree, namespace, backend=backend)
+        else:
+            body = ", ".join(
+                generate_source(tree, namespace, signs, backend)
+                for signs in itertools.product("+-", repeat=self.plus_minus)
+            )
+            body = f"({body},)"
+
+        if temporaries:
+            body = f"({self._prelude(temporaries, namespace, backend)}{body})[-1]"
+
+        source = f"lambda {', '.join(argnames)}: {body}"
+        function = eval(compile(source, "<cake>", "eval"), namespace)
+
+        self._functions[key] = function
+        return function
+
+    def grad(self, *names: str) -> typing.Callable:
+        """
+        Returns a function which computes the value of the expression and its partial derivatives in a single pass,
+        see :func:`~cake.parsing.gradient.generate_gradient`. The function takes every unknown as an argument, in order of appearance,
+        and returns a tuple of ``(value, partials)``. Functions are cached like :meth:`lambdify`.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> f = Expression("x ** 2 * y + 3y").compile().grad()
+            >>> f(2.0, 5.0)
+            (35.0, (20.0, 7.0))
+
+        When the expression uses the ``(+|-)`` operator, a tuple of these is returned, one for each combination of signs.
+
+        Parameters
+        ----------
+        *names: :class:`str`
+            The unknowns to differentiate with respect to, defaults to every unknown
+        """
+        names = names or self.variables
+        key = (names, "grad")
+
+        try:
+            return self._functions[key]
+        except KeyError:
+            pass
+
+        unknown = [name for name in names if name not in self.variables]
+        if unknown:
+            raise errors.MissingValue(
+                "{} {} not in the expression".format(", ".join(unknown), "is" if len(unknown) == 1 else "are")
+            )
+
+        # Constants aren't folded, for the same reason as `lambdify`
+        if self.optimized is not None:
+            optimized = optimize_tree(self.tree, fold=False)
+            tree, temporaries = optimized.tree, optimized.temporaries
+        else:
+            tree, temporaries = self.tree, list()
+
+        function = generate_gradient(tree, self.variables, names, temporaries, self.plus_minus)
+
+        self._functions[key] = function
+        return function
+
+    def solver(self, variable: str) -> Solver:
+        """
+        Returns a :class:`~cake.parsing.roots.Solver` which finds the roots of the expression for an unknown.
+        The expression is differentiated once, and the solver is cached, see :meth:`cake.Expression.solve`.
+
+        Parameters
+        ----------
+        variable: :class:`str`
+            The unknown to solve for
+        """
+        try:
+            return self._solvers[variable]
+        except KeyError:
+            pass
+
+        if variable not in self.variables:
+            raise errors.SolveError(f"{variable} is not an unknown in {self.tree}")
+
+        if self.plus_minus:
+            raise errors.SolveError("Cannot solve an expression using the (+|-) operator, solve each branch instead")
+
+        try:
+            slope = CompiledExpression(derivative(self.tree, variable), optimize=self.optimized is not None)
+        except errors.SubstitutionError:
+            # Solved without a derivative
+            slope = None
+
+        solver = Solver(self, slope, variable)
+        self._solvers[variable] = solver
+        return solver
+
+    def export(self) -> dict:
+        """
+        Returns everything needed to rebuild this object from its tree, including any code which has been generated, see :meth:`restore`.
+        Code objects are stored as bytes using :mod:`marshal`, which can only be loaded by the same version of python.
+        """
+        state = {
+            "optimized": self.optimized,
+            "parses": self.parses,
+            "code": {
+                signs: (marshal.dumps(code), namespace)
+                for signs, (code, namespace) in self._code.items()
+            },
+            "shared": None,
+        }
+
+        if self._shared is not None:
+            code, namespace, _ = self._shared
+            state["shared"] = (marshal.dumps(code), namespace)
+
+        return state
+
+    @classmethod
+    def restore(cls, tree: Node, state: dict) -> "CompiledExpression":
+        """
+        Rebuild a compiled expression from :meth:`export`, without optimizing the tree or generating code again
+
+        Parameters
+        ----------
+        tree: :class:`~cake.parsing.tree.Node`
+            The tree the expression was compiled from
+        state: :class:`dict`
+            The result of :meth:`export`
+        """
+        self = cls.__new__(cls)
+
+        self.tree = tree
+        self.optimized = state["optimized"]
+        self.polynomial = as_polynomial(tree) if self.optimized is not None else None
+        self.variables = variables(self.tree)
+        self.plus_minus = plus_minus_count(self.tree)
+        self.parses = state["parses"]
+
+        self._code = {
+            signs: (marshal.loads(code), namespace)
+            for signs, (code, namespace) in state["code"].items()
+        }
+        self._shared = None
+        self._functions = dict()
+        self._solvers = dict()
+        self._nested = None
+        self._factorial = _has_factorial(tree)
+
+        if state["shared"] is not None:
+            code, namespace = state["shared"]
+
+            # Shared subexpressions are looked up by `id`, so their names are assigned again for the loaded tree
+            names = {id(node): f"_s{index}" for index, node in enumerate(sign_independent(self.body))}
+            self._shared = (marshal.loads(code), namespace, names)
+
+        return self
+
+    def __getstate__(self) -> dict:
+        # Generated code and functions can't be pickled, they are regenerated when needed
+        return {"tree": self.tree, "parses": self.parses, "optimize": self.optimized is not None}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["tree"], parses=state["parses"], optimize=state["optimize"])
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.tree})"
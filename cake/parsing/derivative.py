@@ -0,0 +1,268 @@
+"""
+Differentiating parse trees, used by :meth:`cake.Expression.solve` to find roots using newton's method.
+
+The derivative is built as a new tree, which can be compiled and evaluated like any other tree.
+Literals are combined as they are built, and terms which are ``0`` or ``1`` are left out,
+so differentiating ``3 * x ** 2 + y`` with respect to ``x`` gives ``3 * (2 * x)`` rather than a tree full of zeros.
+"""
+import math
+import typing
+
+from cake import errors
+from cake.helpers import convert_type
+from . import pABC
+from .tree import Node, Literal, Variable, UnaryOp, BinaryOp, PlusMinus, Call, transform
+
+__all__ = ("derivative",)
+
+DEGREES = math.pi / 180
+# Cake's trig functions take degrees, so every trig derivative is scaled by `d/dx radians(x)`
+
+
+def _number(node: Node) -> typing.Optional[float]:
+    # The value of a real literal, or `None` for anything else
+    if isinstance(node, Literal):
+        value = getattr(node.value, "value", node.value)
+
+        if isinstance(value, (int, float)):
+            return value
+    return None
+
+
+def _literal(value: float) -> Literal:
+    return Literal(convert_type(value))
+
+
+def _coefficient(node: Node) -> typing.Tuple[typing.Optional[float], Node]:
+    # Splits `2 * x` into `2` and `x`
+    if isinstance(node, BinaryOp) and node.op == "*":
+        value = _number(node.left)
+
+        if value is not None:
+            return value, node.right
+    return None, node
+
+
+def _neg(node: Node) -> Node:
+    value = _number(node)
+
+    if value is not None:
+        return _literal(-value)
+    if isinstance(node, UnaryOp) and node.op == "-":
+        return node.operand
+
+    coefficient, rest = _coefficient(node)
+
+    if coefficient is not None:
+        return _mul(_literal(-coefficient), rest)
+    return UnaryOp("-", node)
+
+
+def _add(left: Node, right: Node) -> Node:
+    a, b = _number(left), _number(right)
+
+    if a is not None and b is not None:
+        return _literal(a + b)
+    if a == 0:
+        return right
+    if b == 0:
+        return left
+    if isinstance(right, UnaryOp) and right.op == "-":
+        return BinaryOp("-", left, right.operand)
+    return BinaryOp("+", left, right)
+
+
+def _sub(left: Node, right: Node) -> Node:
+    a, b = _number(left), _number(right)
+
+    if a is not None and b is not None:
+        return _literal(a - b)
+    if a == 0:
+        return _neg(right)
+    if b == 0:
+        return left
+    return BinaryOp("-", left, right)
+
+
+def _mul(left: Node, right: Node) -> Node:
+    a, b = _number(left), _number(right)
+
+    if a is not None and b is not None:
+        return _literal(a * b)
+    if a == 0 or b == 0:
+        return _literal(0)
+    if a == 1:
+        return right
+    if b == 1:
+        return left
+    if a == -1:
+        return _neg(right)
+    if b == -1:
+        return _neg(left)
+
+    if b is not None:
+        # Literals go first, so `x * 2` is written as `2 * x`
+        left, right, a = right, left, b
+
+    if a is not None:
+        coefficient, rest = _coefficient(right)
+
+        if coefficient is not None:
+            return _mul(_literal(a * coefficient), rest)
+        if isinstance(right, UnaryOp) and right.op == "-":
+            return _mul(_literal(-a), right.operand)
+    return BinaryOp("*", left, right)
+
+
+def _div(left: Node, right: Node) -> Node:
+    a, b = _number(left), _number(right)
+
+    if a == 0:
+        return _literal(0)
+    if b == 1:
+        return left
+    if a is not None and b:
+        return _literal(a / b)
+
+    if b:
+        coefficient, rest = _coefficient(left)
+
+        if coefficient is not None:
+            return _mul(_literal(coefficient / b), rest)
+    return BinaryOp("/", left, right)
+
+
+def _pow(base: Node, exponent: Node) -> Node:
+    b = _number(exponent)
+
+    if b == 0:
+        return _literal(1)
+    if b == 1:
+        return base
+    return BinaryOp("**", base, exponent)
+
+
+def _call(name: str, argument: Node) -> Call:
+    return Call(pABC.KEYWORDS[name], argument)
+
+
+def _power(node: BinaryOp, du: Node, dv: Node) -> Node:
+    u, v = node.left, node.right
+
+    if _number(dv) == 0:
+        # d/dx u ** c = c * u ** (c - 1) * du
+        return _mul(_mul(v, _pow(u, _sub(v, _literal(1)))), du)
+
+    base = _number(u)
+
+    if _number(du) == 0 and base is not None and base > 0:
+        # d/dx c ** v = c ** v * ln(c) * dv
+        return _mul(_mul(node, _literal(math.log(base))), dv)
+
+    raise errors.SubstitutionError(f"Cannot differentiate {node}, only constant bases or exponents are supported")
+
+
+def _call_rule(node: Call, du: Node) -> Node:
+    u = node.argument
+    function = node.function
+    keywords = pABC.KEYWORDS
+
+    if function is keywords["sqrt"]:
+        return _div(du, _mul(_literal(2), node))
+
+    if function is keywords["sin"]:
+        inner = _call("cos", u)
+    elif function is keywords["cos"]:
+        inner = _neg(_call("sin", u))
+    elif function is keywords["tan"]:
+        inner = _pow(_call("sec", u), _literal(2))
+    elif function is keywords["cot"]:
+        inner = _neg(_pow(_call("cosec", u), _literal(2)))
+    elif function is keywords["sec"]:
+        inner = _mul(node, _call("tan", u))
+    elif function is keywords["cosec"]:
+        inner = _neg(_mul(node, _call("cot", u)))
+    else:
+        raise errors.SubstitutionError(f"Cannot differentiate {node}")
+
+    return _mul(_mul(_literal(DEGREES), inner), du)
+
+
+def _rule(node: Node, derivatives: typing.List[Node], name: str) -> Node:
+    # The derivative of a node, from the derivatives of its children
+    if isinstance(node, Literal):
+        return _literal(0)
+
+    if isinstance(node, Variable):
+        return _literal(1) if node.name == name else _literal(0)
+
+    if all(_number(d) == 0 for d in derivatives):
+        # Doesn't depend on `name`
+        return _literal(0)
+
+    if isinstance(node, UnaryOp):
+        (du,) = derivatives
+        return _neg(du) if node.op == "-" else du
+
+    if isinstance(node, Call):
+        return _call_rule(node, derivatives[0])
+
+    if isinstance(node, BinaryOp):
+        du, dv = derivatives
+        u, v = node.left, node.right
+        op = node.op
+
+        if op == "+":
+            return _add(du, dv)
+        if op == "-":
+            return _sub(du, dv)
+        if op == "*":
+            return _add(_mul(du, v), _mul(u, dv))
+        if op == "/":
+            if _number(dv) == 0:
+                return _div(du, v)
+            return _div(_sub(_mul(du, v), _mul(u, dv)), _pow(v, _literal(2)))
+        if op == "**":
+            return _power(node, du, dv)
+        if op == "//":
+            # A step function, which is flat everywhere it's defined
+            return _literal(0)
+        if op == "%":
+            # u % v = u - v * (u // v)
+            return _sub(du, _mul(BinaryOp("//", u, v), dv))
+
+    if isinstance(node, PlusMinus):
+        raise errors.SubstitutionError("Cannot differentiate an expression using the (+|-) operator")
+
+    raise errors.SubstitutionError(f"Cannot differentiate {node}")
+
+
+def derivative(tree: Node, name: str) -> Node:
+    """
+    Returns the tree for the derivative of ``tree`` with respect to an unknown.
+
+    .. code-block:: py
+
+        >>> from cake.parsing.parser import parse
+        >>> from cake.parsing.derivative import derivative
+        >>> print(derivative(parse("x ** 3 + 2x * y"), "x"))
+        3 * x ** 2 + 2 * y
+
+    Raises :class:`~cake.errors.SubstitutionError` for parts which can't be differentiated,
+    such as factorials, bitwise operators, the ``(+|-)`` operator, or powers where both sides depend on the unknown.
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The tree to differentiate
+    name: :class:`str`
+        The unknown to differentiate with respect to
+    """
+    derivatives = dict()
+
+    def differentiate(node: Node, children: tuple) -> Node:
+        derivatives[id(node)] = _rule(node, [derivatives[id(child)] for child in node.children], name)
+        return node
+
+    transform(tree, differentiate)
+    return derivatives[id(tree)]
@@ -0,0 +1,280 @@
+"""
+An opt-in cache of parsed and compiled expressions on disk, similar to ``__pycache__``.
+
+Each expression is stored in its own file, named after a hash of the expression once normalized by :func:`~cake.parsing.cache.normalize`,
+so a new process can load the tree and generated code instead of parsing and compiling the expression again.
+Files written by a different version of cake or python are ignored and replaced.
+
+.. warning::
+
+    Files are loaded using :mod:`pickle`, only point the cache at a directory which you trust.
+"""
+import hashlib
+import importlib.util
+import os
+import pickle
+import tempfile
+import threading
+import typing
+
+import cake
+
+from .compiled import CompiledExpression
+from .lexer import Token
+from .tree import Node
+
+__all__ = ("DiskCacheInfo", "DiskCache", "DISK_CACHE")
+
+SUFFIX = ".cake"
+
+WARM_BRANCHES = 16
+# Code for every combination of signs is generated before storing an expression with at most this many,
+# larger expressions keep generating each combination when it's first needed
+
+WRITE_ERRORS = (OSError, pickle.PicklingError, RecursionError, TypeError, AttributeError)
+# Failing to store an expression is counted instead of raised, the cache never stops an expression being used
+
+
+class DiskCacheInfo(typing.NamedTuple):
+    """
+    Statistics for a :class:`DiskCache`
+    """
+
+    hits: int
+    misses: int
+    writes: int
+    failures: int
+    # Writes which failed, such as when the directory was deleted, and directories which couldn't be created
+    directory: typing.Optional[str]
+
+
+class DiskCache(object):
+    """
+    Stores parsed trees and compiled code in a directory, keyed by a hash of each expression.
+
+    .. code-block:: py
+
+        >>> from cake import Expression
+        >>> from cake.parsing import DISK_CACHE
+        >>> DISK_CACHE.directory = ".cake_cache"
+        >>> Expression("x ** 2 + 3x").compile()
+        CompiledExpression(x ** 2 + 3 * x)
+
+    Running the same code in a new process loads the compiled expression from ``.cake_cache``.
+
+    Parameters
+    ----------
+    directory: :class:`~typing.Optional[str]`
+        Where to store expressions, it's created if it doesn't exist.
+        If it can't be created the cache is disabled instead, and counted in :attr:`DiskCacheInfo.failures`.
+        ``None`` disables the cache, which is the default unless the ``CAKE_CACHE_DIR`` environment variable is set.
+    """
+
+    __slots__ = ("_directory", "_lock", "hits", "misses", "writes", "failures")
+
+    def __init__(self, directory: typing.Optional[str] = None) -> None:
+        self._directory = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.failures = 0
+
+        self.directory = directory
+
+    @property
+    def directory(self) -> typing.Optional[str]:
+        """ The directory expressions are stored in, ``None`` if the cache is disabled """
+        return self._directory
+
+    @directory.setter
+    def directory(self, value: typing.Optional[typing.Union[str, os.PathLike]]) -> None:
+        if value is not None:
+            value = os.fspath(value)
+
+            try:
+                os.makedirs(value, exist_ok=True)
+            except OSError:
+                # Such as a file with the same name, `CAKE_CACHE_DIR` is set while importing cake so this can't raise
+                value = None
+
+                with self._lock:
+                    self.failures += 1
+
+        self._directory = value
+
+    @property
+    def enabled(self) -> bool:
+        """ Whether a directory has been set """
+        return self._directory is not None
+
+    @staticmethod
+    def version() -> tuple:
+        # Files written by any other version are stale
+        return cake.__version__, importlib.util.MAGIC_NUMBER
+
+    def path(self, key: str, kind: str = "parsed") -> str:
+        """
+        Returns the file part of an expression is stored in
+
+        Parameters
+        ----------
+        key: :class:`str`
+            The normalized expression
+        kind: :class:`str`
+            ``"parsed"`` for the tokens and tree, ``"optimized"`` or ``"unoptimized"`` for the compiled forms
+        """
+        if self._directory is None:
+            raise ValueError("The disk cache is disabled, set a directory first")
+
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self._directory, f"{digest[:32]}.{kind}{SUFFIX}")
+
+    def _read(self, key: str, kind: str) -> typing.Optional[typing.Any]:
+        try:
+            with open(self.path(key, kind), "rb") as file:
+                version, expression, value = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, TypeError, ValueError, RecursionError):
+            # Missing, or written by something else
+            return None
+
+        if version != self.version() or expression != key:
+            return None
+        return value
+
+    def _write(self, key: str, kind: str, value: typing.Any) -> None:
+        # Replaces the whole file, so readers never see half of it
+        temporary = None
+
+        try:
+            descriptor, temporary = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+
+            with os.fdopen(descriptor, "wb") as file:
+                pickle.dump((self.version(), key, value), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.path(key, kind))
+        except BaseException as e:
+            if temporary is not None:
+                try:
+                    os.unlink(temporary)
+                except OSError:
+                    pass
+
+            if not isinstance(e, WRITE_ERRORS):
+                raise
+
+            with self._lock:
+                self.failures += 1
+            return
+
+        with self._lock:
+            self.writes += 1
+
+    def _count(self, found: bool) -> None:
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def load_parsed(self, key: str) -> typing.Optional[typing.Tuple[typing.List[Token], typing.Optional[Node]]]:
+        """
+        Returns the stored tokens and tree for an expression, or ``None`` if they aren't stored
+
+        Parameters
+        ----------
+        key: :class:`str`
+            The normalized expression
+        """
+        if self._directory is None:
+            return None
+
+        entry = self._read(key, "parsed")
+
+        self._count(entry is not None)
+        return entry
+
+    def store_parsed(self, key: str, tokens: typing.List[Token], tree: typing.Optional[Node]) -> None:
+        """
+        Stores the tokens and tree of an expression
+
+        Parameters
+        ----------
+        key: :class:`str`
+            The normalized expression
+        tokens: :class:`~typing.List[~cake.parsing.lexer.Token]`
+            Its tokens
+        tree: :class:`~typing.Optional[~cake.parsing.tree.Node]`
+            Its tree
+        """
+        if self._directory is not None:
+            self._write(key, "parsed", (tokens, tree))
+
+    def load_compiled(self, key: str, tree: Node, optimize: bool = True) -> typing.Optional[CompiledExpression]:
+        """
+        Returns the stored compiled form of an expression, or ``None`` if it isn't stored
+
+        Parameters
+        ----------
+        key: :class:`str`
+            The normalized expression
+        tree: :class:`~cake.parsing.tree.Node`
+            The parsed expression, which isn't stored with the compiled form
+        optimize: :class:`bool`
+            Whether to load the optimized or unoptimized form
+        """
+        if self._directory is None:
+            return None
+
+        state = self._read(key, "optimized" if optimize else "unoptimized")
+        compiled = None
+
+        if state is not None:
+            compiled = CompiledExpression.restore(tree, state)
+
+        self._count(compiled is not None)
+        return compiled
+
+    def store_compiled(self, key: str, compiled: CompiledExpression) -> None:
+        """
+        Stores a compiled expression, generating its code first so it doesn't need to be generated after loading it.
+        Expressions with more than :data:`WARM_BRANCHES` combinations of signs only store the code shared by every combination
+        and the first one, as generating all ``2 ** n`` of them would cost far more than compiling does.
+
+        Parameters
+        ----------
+        key: :class:`str`
+            The normalized expression
+        compiled: :class:`~cake.parsing.compiled.CompiledExpression`
+            Its compiled form
+        """
+        if self._directory is None:
+            return
+
+        # Generates the code for the first combination of signs, or for the whole expression
+        if not compiled.nested() and 2 ** compiled.plus_minus <= WARM_BRANCHES:
+            compiled.warm()
+
+        self._write(key, "unoptimized" if compiled.optimized is None else "optimized", compiled.export())
+
+    def info(self) -> DiskCacheInfo:
+        """ Returns how many expressions were loaded, not found, written and failed to be written """
+        with self._lock:
+            return DiskCacheInfo(self.hits, self.misses, self.writes, self.failures, self._directory)
+
+    def clear(self) -> None:
+        """ Deletes every stored expression and resets the counters """
+        with self._lock:
+            if self._directory is not None:
+                for name in os.listdir(self._directory):
+                    if name.endswith(SUFFIX):
+                        os.unlink(os.path.join(self._directory, name))
+
+            self.hits = self.misses = self.writes = self.failures = 0
+
+    def __repr__(self) -> str:
+        return f"DiskCache(directory={self._directory!r})"
+
+
+DISK_CACHE = DiskCache(os.environ.get("CAKE_CACHE_DIR") or None)
+# Used by `PARSE_CACHE` and `Expression.compile`, enable it with `DISK_CACHE.directory = ...`
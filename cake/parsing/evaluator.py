@@ -0,0 +1,122 @@
+"""
+Evaluating parsed trees by walking them, used when an expression's :attr:`~cake.Expression.evaluator` is ``"tree"``.
+
+Every operator and function is looked up in a fixed table, so no code is generated, compiled or executed.
+Expressions from untrusted sources can't run anything except cake's arithmetic and the functions in ``pABC``.
+Results are the same as the generated code, as both apply the same operators to cake's objects.
+"""
+import typing
+
+from cake import errors
+from . import pABC
+from .optimize import BINARY_OPERATORS, UNARY_OPERATORS
+from .tree import Node, Literal, Variable, UnaryOp, BinaryOp, PlusMinus, Call, Temporary
+
+__all__ = ("EVALUATORS", "FUNCTIONS", "check_evaluator", "evaluate_tree")
+
+EVALUATORS = ("code", "tree")
+# `code` evaluates generated python code, `tree` walks the tree
+
+FUNCTIONS: typing.FrozenSet[typing.Callable] = frozenset(
+    (*pABC.KEYWORDS.values(), *pABC.SYMBOL_KW.values())
+)
+# The only functions which can be called
+
+
+def check_evaluator(evaluator: str) -> str:
+    """ Raises a ``ValueError`` if ``evaluator`` isn't one of :data:`EVALUATORS` """
+    if evaluator not in EVALUATORS:
+        raise ValueError(
+            "Unknown evaluator {}, Choose from:\n{}".format(evaluator, ", ".join(EVALUATORS))
+        )
+    return evaluator
+
+
+def evaluate_tree(
+    tree: Node,
+    values: typing.Mapping[str, typing.Any],
+    signs: typing.Iterable[str] = tuple(),
+    known: typing.Optional[typing.Mapping[int, typing.Any]] = None,
+) -> typing.Any:
+    """
+    Evaluate a tree without generating code, walking it from the bottom up without recursing.
+
+    .. code-block:: py
+
+        >>> from cake import Integer
+        >>> from cake.parsing.parser import parse
+        >>> from cake.parsing.evaluator import evaluate_tree
+        >>> evaluate_tree(parse("2 * x (+|-) 1"), {"x": Integer(3)}, "+")
+        Real(7.0)
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The tree to evaluate
+    values: :class:`~typing.Mapping[str, typing.Any]`
+        The value of every unknown and temporary in the tree, as cake's objects
+    signs: :class:`~typing.Iterable[str]`
+        The sign to use for each ``(+|-)`` operator, in order of appearance
+    known: :class:`~typing.Mapping[int, typing.Any]`
+        Values of subtrees which have already been evaluated, by the ``id`` of their node.
+        Only subtrees without a ``(+|-)`` operator can be reused, as they have the same value wherever they appear.
+    """
+    signs = iter(signs)
+    known = known or dict()
+    results = list()
+    pending = list()
+    # Signs of `(+|-)` operators waiting for their right operand
+    stack = [(tree, 0)]
+
+    # Children are visited in order of appearance, so signs are used in the same order as the generated code
+    while stack:
+        node, state = stack.pop()
+
+        if state == 0 and id(node) in known:
+            results.append(known[id(node)])
+            continue
+
+        if isinstance(node, Literal):
+            results.append(node.value)
+            continue
+
+        if isinstance(node, (Variable, Temporary)):
+            results.append(values[node.name])
+            continue
+
+        if isinstance(node, PlusMinus):
+            if state == 0:
+                stack.append((node, 2))
+                stack.append((node.right, 0))
+                stack.append((node, 1))
+
+                if node.left is not None:
+                    stack.append((node.left, 0))
+            elif state == 1:
+                pending.append(next(signs))
+            else:
+                sign = pending.pop()
+                right = results.pop()
+
+                if node.left is None:
+                    results.append(UNARY_OPERATORS[sign](right))
+                else:
+                    results.append(BINARY_OPERATORS[sign](results.pop(), right))
+            continue
+
+        if state == 0:
+            stack.append((node, 1))
+            stack.extend((child, 0) for child in reversed(node.children))
+            continue
+
+        if isinstance(node, UnaryOp) and node.op in UNARY_OPERATORS:
+            results.append(UNARY_OPERATORS[node.op](results.pop()))
+        elif isinstance(node, BinaryOp) and node.op in BINARY_OPERATORS:
+            right = results.pop()
+            results.append(BINARY_OPERATORS[node.op](results.pop(), right))
+        elif isinstance(node, Call) and node.function in FUNCTIONS:
+            results.append(node.function(results.pop())())
+        else:
+            raise errors.SubstitutionError(f"Cannot evaluate {node!r}")
+
+    return results.pop()
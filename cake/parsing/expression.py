@@ -1,4 +1,4 @@
-import re
+import itertools
 import typing
 import string
 
@@ -13,49 +13,34 @@
 from ..core.number import Number
 
 from .equation import Equation
+from .compiled import CompiledExpression
+from .backends import is_array, mpmath_backend
+from . import parallel, roots
+from .roots import Solver
+from .tree import to_markers, plus_minus_count, variables
+from .derivative import derivative
+from .evaluator import check_evaluator
+from .profiling import PROFILER
+from .simplify import simplify
+from .lexer import NAME
+from .cache import PARSE_CACHE, ParsedExpression, normalize
+from .diskcache import DISK_CACHE
+from . import incremental
 from ._ast import *
 from cake.helpers import convert_type
 from cake.functions import basic
 
-# Imports for tokenizing
-from tokenize import (
-    tokenize,
-    # IGNORE MARKERS
-    ENDMARKER,
-    NEWLINE,
-    ENCODING,
-    # MARKERS TO SEARCH
-    OP,
-    NAME,
-    NUMBER,
-    ERRORTOKEN,
-)
-from io import BytesIO
-
 ASCII_CHARS = list(string.ascii_lowercase)
 # Use lowercases so `X` is equal to `x`
 BLACKLISTED = list(pABC.KEYWORDS.keys()) + list(pABC.CONSTANTS.keys())
 # Keywords that cant be assigned to an unknown
-VALID_SYMBOLS = {"!", "(", ")"}
-# Used for parsing functions
-IGNORE = (ENDMARKER, NEWLINE, ENCODING)
-# Ignore any tokens from the tokenizer
-
-################
-#
-# Regex patterns
-#
-################
-
-FIND_UNKNOWNS = re.compile("[a-zA-Z]+", re.IGNORECASE)
-# Looks for any letters, this is useful when mapping values to a specific unknown
-
-INVALID_OPS = re.compile("[a-zA-Z]+[0-9]+", re.IGNORECASE)
-# Looks for any incorrect patterns such as `sqrt4`
 
 # Main Object
 subExecGlobals = {'math': __import__('math'), 'cake': __import__('cake')}
 
+LEGACY_PARSES = 2
+# The number of times `substitute` parses an expression which hasn't been compiled
+
 
 class Expression(object):
     """
@@ -135,15 +120,41 @@ def __init__(
         self.args = default_args
         self.kwargs = default_kwargs
 
+        self.__parsed = None
         self.__mappings = self._sort_values(*default_args, **default_kwargs)
 
+        self.__compiled = None
+        self.__skipped_parses = 0
+        self.__evaluator = "code"
+        self.__numeric = False
+
+    def _parsed(self) -> ParsedExpression:
+        # The tokens and tree of the expression, kept up to date by `append`, `prepend` and `wrap_all`
+        if self.__parsed is None:
+            self.__parsed = PARSE_CACHE.parse(self.__expression)
+        return self.__parsed
+
+    def _edited(self, expression: str, parsed: typing.Optional[ParsedExpression]) -> None:
+        self.__expression = expression
+        self.__parsed = parsed
+        self.__compiled = None
+
+        # `terms` are worked out from the old expression
+        self.__dict__.pop("lru_cache", None)
+
     def _sort_values(self, *args, **kwargs) -> dict:
-        unknowns = FIND_UNKNOWNS.findall(self.__expression)
-        for value in unknowns.copy():
-            # Copy stops the change size during iteration error
+        try:
+            tokens = self._parsed().tokens
+        except errors.SubstitutionError:
+            # Invalid expressions are reported once they are parsed
+            tokens = list()
 
-            if value in BLACKLISTED:
-                unknowns.remove(value)
+        unknowns = list()
+
+        for token in tokens:
+            if token.kind == NAME and token.value not in BLACKLISTED:
+                # `xy` is parsed as `x * y`
+                unknowns.extend(token.value)
 
         as_dict = {i: None for i in unknowns}
         keys = list(as_dict.keys())
@@ -151,15 +162,8 @@ def _sort_values(self, *args, **kwargs) -> dict:
         if not keys:
             return {}
 
-        current_key = keys[0]
-        current_index = 0
-
-        for arg in args:
-            if (current_index + 1) > len(keys):
-                break
-
+        for current_key, arg in zip(keys, args):
             as_dict[current_key] = arg
-            current_index += 1
 
         for key, value in kwargs.items():
             if key in as_dict:
@@ -169,6 +173,7 @@ def _sort_values(self, *args, **kwargs) -> dict:
 
         return as_dict
 
+    @PROFILER.timed("_sub")
     def _sub(
         self,
         update_mappings: bool = False,
@@ -196,368 +201,345 @@ def _sub(
         else:
             unknown_mapping = self.update_variables(False, *args, **kwargs)
 
-        invalid = INVALID_OPS.findall(self.expression)
-        if invalid:
-            found_first = invalid[0]
-            index = 0
+        tokens, tree = self._parsed()
 
-            while True:
-                if index == len(found_first):
-                    break
+        if tree is None:
+            presence = list()
+        else:
+            presence = to_markers(tree, unknown_mapping)
+
+        if return_tokens:
+            return presence, tokens
+        return presence
+
+    @PROFILER.timed("_glSubCode")
+    def _glSubCode(self, update_mapping: bool = False, *args, **kwargs):
+        """
+        Convert your expression into modern pythonic code, using the `Cake` library.
+        If you want the answer directly, its best to use the `.substitute` method.
+
+        Parameters
+        ----------
+        update_mapping: :class:`bool`
+            Update the inner unknown mappings with any new args or kwargs
+        *args: :class:`~typing.Any`
+            Arguments to supply in your expression
+        **kwargs: :class:`~typing.Any`
+            Keyworded arguments to supply into your expression.
+        """
+
+        if "dirty" in kwargs:
+            dirty = True
+            vars = kwargs.pop('vars')
+            presence = kwargs.pop('dirty')
+        else:
+            vars = list()
+            dirty = False
+            presence = self._sub(update_mapping, *args, **kwargs)
+
+        VARS = dict.fromkeys(vars)
+        # Keeps the order of the unknowns, without duplicates
+        code = list()
+        pm = 0
 
-                if found_first[index].isdigit():
+        # Function arguments are handled with a stack instead of a new `Expression`,
+        # so deeply nested functions are only walked once
+        stack = [(iter(presence), "")]
+
+        while stack:
+            markers, closing = stack[-1]
+
+            for posfix in markers:
+                if isinstance(posfix, Unknown):
+                    VARS[f"{posfix.value} = Unknown('{posfix.value}')"] = None
+                    code.append(f' ( {posfix.value} ) ')
+
+                elif isinstance(posfix, FunctionMarker):
+                    func, dirtyTokens = posfix.value
+
+                    code.append(f" ( {func.__qualname__} ( ")
+                    stack.append((iter(dirtyTokens), " ) ) ( )"))
                     break
-                index += 1
 
-            possible_correct = found_first[:index]
-            possible_correct += " "
-            possible_correct += found_first[index:]
+                elif isinstance(posfix, cake.Number):
+                    code.append(f' ( {posfix.__class__.__name__} ( {posfix.value} ) )')
 
-            raise errors.SubstitutionError(
-                f'String `{found_first}`, followed by integer. Perhaps you ment "{possible_correct}"'
-            )
+                elif isinstance(posfix, PlusOrMinus):
+                    code.append('(+|-)')     # This gets sorted out later
+                    pm += 1
 
-        as_file = BytesIO(self.expression.encode(encoding="ASCII", errors="ignore"))
+                elif isinstance(posfix, (Symbol, Operator)):
+                    posfix.validate
 
-        as_file.seek(0)
+                    code.append(f' {posfix.value} ')
+            else:
+                code.append(closing)
+                stack.pop()
 
-        tokens = list(tokenize(as_file.readline))
+        code = "".join(code)
+        VARS = list(VARS)
 
-        if not tokens:
-            return []
+        if not dirty:
+            return "{}\n{}".format('\n'.join(VARS), code), pm
+        return VARS, code, pm
 
-        if tokens[0].type == ENCODING:
-            tokens.pop(0)
+    @PROFILER.timed("convertToCode")
+    def convertToCode(self, update_mapping: bool = False, imports: tuple = tuple(), *args, **kwargs):
+        """
+        Convert your expression into executable code!
 
-        presence = list()
+        .. warning::
+            Any imports provided, can overwrite imports from the cake library!
 
-        OPEN_BRACKETS = 0
-        ACTUAL_INDEX = 0
-        TOKEN_INDEX = 0
+        .. code-block:: py
 
-        SKIP = 0
+            >>> from cake import Expression
+            >>> imports = ("math *",)
+            # Imports * from math
+            # "math tan" only imports tan
+            # "math (tan, sin)" only imports tan, sin
+            >>> expr = "x + sqrt(y)"
+            >>> Expr = Expression(expr)
+            >>> Expr.convertToCode(imports=imports)
+            ...
 
-        while True:
-            if TOKEN_INDEX > (len(tokens) - 1):
-                break
+        Parameters
+        ----------
+        update_mapping: :class:`bool`
+            Update the inner unknown mappings with any new args or kwargs
+        imports: :class:`tuple`
+            A tuple with import statements to be used when generating your code.
+        """
+        beginning = GEN_AUTO_CODE_MARKING(*imports)
+        code, _ = self._glSubCode(update_mapping, *args, **kwargs)
 
-            if SKIP:
-                SKIP -= 1
-                TOKEN_INDEX += 1
-                continue
+        return f'{beginning}{code}'
 
-            token = tokens[TOKEN_INDEX]
+    @PROFILER.timed("compile")
+    def compile(self, optimize: bool = True) -> CompiledExpression:
+        """
+        Parse your expression into a tree and store it on the object.
+        Once compiled, :meth:`substitute` evaluates the stored tree instead of tokenizing the expression again.
 
-            string = (token.string).lower()
-            type_ = token.type
+        .. code-block:: py
 
-            if type_ in IGNORE:
-                pass
+            >>> from cake import Expression
+            >>> expr = Expression("x ** 2 + 3x")
+            >>> expr.compile()
+            CompiledExpression(x ** 2 + 3 * x)
+            >>> expr.substitute(x=2)
+            Integer(10.0)
+            >>> expr.skipped_parses
+            2
 
-            elif type_ == OP:
-                if string == "(":
-                    POS_TOKENS = tokens[TOKEN_INDEX:]
+        If the expression is modified, using methods such as :meth:`append`, it will need to be compiled again.
+        When :data:`~cake.parsing.diskcache.DISK_CACHE` is enabled, compiled expressions are stored in it and loaded from it.
 
-                    is_plus = POS_TOKENS[0:5]
-                    to_mapping = "".join([i.string for i in is_plus])
+        Parameters
+        ----------
+        optimize: :class:`bool`
+            Fold constants and hoist repeated subexpressions before generating code, defaults to ``True``.
+            Use :meth:`CompiledExpression.dump` to see the optimized expression.
+        """
+        compiled = self.__compiled
 
-                    if to_mapping in ["(+|-)", "(-|+)"]:
-                        SKIP += 4
-                        presence.append(PlusOrMinus())
-                    else:
-                        try:
-                            comp = Complex(raw=to_mapping)
-                            presence.append(comp)
+        if compiled is not None and (compiled.optimized is not None) == optimize:
+            return compiled
 
-                            SKIP += 4
-                        except ValueError:
-                            presence.append(Symbol("("))
-                            OPEN_BRACKETS += 1
+        tree = self._parsed().tree
 
-                elif string == ")":
-                    if OPEN_BRACKETS < 1:
-                        INCORRECT_BRACK_INDEX = token.start[1]
+        if tree is None:
+            raise errors.SubstitutionError("Cannot parse an empty expression")
 
-                        raise errors.SubstitutionError(
-                            f"Unexpected `)` at index {INCORRECT_BRACK_INDEX}"
-                        )
+        key = normalize(self.__expression)
+        compiled = DISK_CACHE.load_compiled(key, tree, optimize)
 
-                    presence.append(Symbol(")"))
-                    OPEN_BRACKETS -= 1
+        if compiled is None:
+            compiled = CompiledExpression(tree, optimize=optimize)
+            DISK_CACHE.store_compiled(key, compiled)
 
-                else:
-                    string_ = abc.MAP_OPERATORS.get(string, string)
-                    # Get the operator or just return the same string
-
-                    try:
-                        op = Operator(string_)
-
-                        presence.append(op)
-                    except ValueError as e:
-                        raise errors.SubstitutionError(
-                            f"Unknown Operator: {string}"
-                        ) from e
-
-            elif type_ in [NAME, ERRORTOKEN]:
-                # Keep hunting for letters
-                TK_INDEX = (TOKEN_INDEX + 1)
-                TOKENS = list()
-
-                while True:
-                    if TK_INDEX > len(tokens):
-                        break
-                    tk = tokens[TK_INDEX]
-                    if tk.type == NAME:
-                        TOKENS.append(tk)
-                        SKIP += 1
-                    else:
-                        break
-
-                    TK_INDEX += 1
-
-                if TOKENS:
-                    string = ' '.join(map(lambda _: _.string, TOKENS))
-
-                constant = pABC.CONSTANTS.get(string)
-                function = pABC.KEYWORDS.get(string)
-                symbol_func = pABC.SYMBOL_KW.get(string)
-                map_op = abc.MAP_OPERATORS.get(string)
-
-                # Check for lettering
-
-                if len([i for i in (constant, function, symbol_func, map_op) if i is not None]) > 1:
-                    raise errors.SubstitutionError(
-                        f"{string} is defined as multiple keywords"
-                    )
+        self.__compiled = compiled
+        return self.__compiled
 
-                elif constant:
-                    presence.append(Irrational(constant))
+    def lambdify(self, *argnames: str, backend: str = "math") -> typing.Callable:
+        """
+        Convert your expression into a plain python function which works on floats.
+        The expression is compiled if it hasn't been already, and the function is cached.
 
-                elif function:
-                    POS_TOKENS = tokens[(TOKEN_INDEX + 1) :]
-                    # Start from next posfix, else the `function` NAME gets caught
+        .. code-block:: py
 
-                    if not POS_TOKENS:
-                        raise errors.SubstitutionError(
-                            f"{string} Called with no parameters"
-                        )
+            >>> from cake import Expression
+            >>> f = Expression("x ** 2 + 3x + sin(y)").lambdify("x", "y")
+            >>> f(2.0, 30.0)
+            10.5
 
-                    if POS_TOKENS[0].string == "(":
-                        WRAPPED_IN_BRACKETS = True
-                    else:
-                        WRAPPED_IN_BRACKETS = False
+        .. note::
 
-                    if not WRAPPED_IN_BRACKETS:
-                        _, COL = POS_TOKENS[0].start
+            Just like :meth:`substitute`, trigonometric functions take their input in degrees.
 
-                        EQ = self.expression[COL:]
-                        EVALUATE = EQ.split(" ")[0]
+        Parameters
+        ----------
+        *argnames: :class:`str`
+            The names of the functions arguments, defaults to the unknowns in order of appearance
+        backend: :class:`str`
+            The backend which provides the functions used by the expression, defaults to ``"math"``
+        """
+        return self.compile().lambdify(*argnames, backend=backend)
 
-                        TREE, TOKENS = Expression(EVALUATE)._sub(
-                            return_tokens=True, **self._sort_values(*args, **kwargs)
-                        )
+    def grad(self, *names: str) -> typing.Callable:
+        """
+        Returns a function which computes the value of your expression and its partial derivatives together,
+        using forward mode automatic differentiation.
+        This is exact, and cheaper than finite differences which evaluate the expression again for every unknown.
 
-                    else:
-                        FUNQ_EQ = ""
-                        BRACKS = 0
-
-                        for POSFIX in POS_TOKENS:
-
-                            if POSFIX.string == "(":
-                                BRACKS += 1
-                                FUNQ_EQ += " ( "
-                            elif POSFIX.string == ")":
-                                if BRACKS < 1:
-                                    OPEN_BRACKETS -= 1
-                                    presence.append(Symbol(")"))
-                                    break
-                                BRACKS -= 1
-                                FUNQ_EQ += " ) "
-
-                            else:
-                                FUNQ_EQ += f" {POSFIX.string} "
-
-                        if BRACKS > 1:
-                            raise errors.SubstitutionError(
-                                f"{BRACKS} Unclosed brackets whilst evaluating {function.__qualname__}"
-                            )
-
-                        TREE, TOKENS = Expression(FUNQ_EQ)._sub(
-                            return_tokens=True, **self._sort_values(*args, **kwargs)
-                        )
+        .. code-block:: py
 
-                    if not TREE:
-                        raise errors.SubstitutionError(
-                            f"{string} Called with no parameters"
-                        )
+            >>> from cake import Expression
+            >>> f = Expression("x ** 2 * y + sin(x)").grad("x", "y")
+            >>> value, (dx, dy) = f(3.0, 2.0)
 
-                    func = FunctionMarker(function, TREE)
-                    SKIP += len(TOKENS)
-                    presence.append(func)
+        The function takes every unknown as an argument in order of appearance, just like :meth:`lambdify`.
 
-                elif symbol_func:
-                    LAST_POSFIX = presence[-1]
-                    func_name = symbol_func.__qualname__.title()
+        .. note::
 
-                    if isinstance(LAST_POSFIX, Operator):
-                        raise errors.SubstitutionError(
-                            f"{func_name} called on an operator ({LAST_POSFIX.value}), at index {token.start[1]}."
-                        )
+            Trigonometric functions take their input in degrees, so their derivatives are with respect to degrees.
 
-                    if isinstance(LAST_POSFIX, Symbol):
-                        if LAST_POSFIX.value != ")":
-                            raise errors.SubstitutionError(
-                                f"{func_name} called on an open bracket, at index {token.start[1]}"
-                            )
+        Parameters
+        ----------
+        *names: :class:`str`
+            The unknowns to differentiate with respect to, defaults to every unknown
+        """
+        return self.compile().grad(*names)
 
-                        OPEN_BRACKS = 0
-                        POS_INDEX = 0
-                        POS_TOKENS = tokens[:TOKEN_INDEX][::-1]
-                        # Searching Backwards
-                        # Factorial will be at the beginning
+    def specialize(self, *args, **kwargs) -> "Expression":
+        """
+        Fix the values of some unknowns, returning a new compiled expression with the remaining unknowns.
+        Parts of the expression which only use the fixed values are evaluated once, instead of on every :meth:`substitute`.
 
-                        for POS_TOKEN in POS_TOKENS:
+        .. code-block:: py
 
-                            string = POS_TOKEN.string
+            >>> from cake import Expression
+            >>> expr = Expression("x * y + sqrt(y) * z")
+            >>> fixed = expr.specialize(y=4, z=5)
+            >>> fixed
+            x * 4 + 10
+            >>> fixed.substitute(x=2)
+            Integer(18.0)
 
-                            if string == ")":
-                                OPEN_BRACKS += 1
-                            elif string == "(":
-                                OPEN_BRACKS -= 1
+        Default values of the remaining unknowns are kept.
 
-                                if OPEN_BRACKS < 1:
-                                    break
+        Parameters
+        ----------
+        *args: :class:`~typing.Any`
+            Values for the unknowns, in order of appearance
+        **kwargs: :class:`~typing.Any`
+            Values for specific unknowns
+        """
+        compiled = self.compile()
+        specialized = compiled.specialize(compiled.map_arguments(args, kwargs))
+
+        defaults = compiled.map_arguments(tuple(), {}, self.args, self.kwargs)
+
+        expr = Expression(str(specialized.tree))
+        expr.update_variables(
+            **{
+                name: value
+                for name, value in defaults.items()
+                if name in specialized.variables and value is not None
+            }
+        )
+        expr.__compiled = specialized
 
-                            POS_INDEX += 1
+        return expr
 
-                        if OPEN_BRACKS:
-                            raise errors.SubstitutionError(
-                                f'{OPEN_BRACKS} Unclosed brackets whilst evalutating "{symbol_func.__qualname__}"'
-                            )
+    def diff(self, name: str) -> "Expression":
+        """
+        Differentiate your expression with respect to an unknown, returning a new expression for the derivative.
+        Constants are combined and terms which are ``0`` or ``1`` are left out, so the result is ready to be compiled and reused.
 
-                        POS_TOKENS = POS_TOKENS[::-1]
-                        PS_IND = (len(POS_TOKENS) - 1) - POS_INDEX
+        .. code-block:: py
 
-                        # Flip them back around
+            >>> from cake import Expression
+            >>> expr = Expression("x ** 3 + 2x * y")
+            >>> expr.diff("x")
+            3 * x ** 2 + 2 * y
+            >>> expr.diff("y")
+            2 * x
 
-                        as_eq = [i.string for i in POS_TOKENS[PS_IND:]]
+        Default values of the unknowns which are left are kept.
 
-                        del presence[
-                            ((TOKEN_INDEX - POS_INDEX) - 1) : (TOKEN_INDEX + 1)
-                        ]
+        .. note::
 
-                        TREE = Expression(" ".join(as_eq))._sub(
-                            **self._sort_values(*args, **kwargs)
-                        )
+            Trigonometric functions take their input in degrees, so their derivatives are scaled by ``pi / 180``.
 
-                        func = FunctionMarker(symbol_func, TREE)
-                        presence.append(func)
+        Parameters
+        ----------
+        name: :class:`str`
+            The unknown to differentiate with respect to
+        """
+        compiled = self.compile()
+        return self._from_tree(compiled, derivative(compiled.tree, name.lower()))
 
-                    else:
-                        new_pre = [Symbol("("), LAST_POSFIX, Symbol(")")]
+    def simplify(self) -> "Expression":
+        """
+        Returns a new expression rewritten into a canonical sum of products, which costs less to evaluate.
+        Like terms are collected, powers of the same factor are merged, and operations such as ``* 1`` and ``+ 0`` are removed.
 
-                        func = FunctionMarker(symbol_func, new_pre)
+        .. code-block:: py
 
-                        presence[-1] = func
+            >>> from cake import Expression
+            >>> Expression("(x * 1 + 0) * x + 2 * x ** 2 - x / 1").simplify()
+            3 * x ** 2 - x
+            >>> Expression("x * y + 2 * y * x - (x ** 2) ** 3 / x").simplify()
+            -x ** 5 + 3 * x * y
 
-                elif map_op:
-                    presence.append(Operator(map_op))
+        Products of sums such as ``(x + 1) * (x - 1)`` are kept factored, since expanding them makes the expression longer.
+        To see how many nodes were removed, use :func:`cake.parsing.simplify.simplify` on the compiled tree.
 
-                else:
-                    if string in unknown_mapping:
-                        presence.append(convert_type(unknown_mapping[string]))
-
-                    elif not (string in ASCII_CHARS):
-                        # xy -> (x * y)
-                        cd = '('
-                        for st in string:
-                            if st in unknown_mapping:
-                                cd += str(unknown_mapping[st])
-                            else:
-                                if st not in ASCII_CHARS:
-                                    raise errors.SubstitutionError(
-                                        f"Unknown Token ({string}) at index {token.start[1]}"
-                                    )
-                                cd += st
-                            cd += ' * '
-                        cd = cd[:-3] + ')'
-                        # Remove the ` * ` at the end
-
-                        presence.extend(Expression(cd, *self.args, **self.kwargs)._sub(
-                            update_mappings,
-                            *args, **kwargs))
-                    else:
-                        presence.append(Unknown(string))
-
-            elif type_ == NUMBER:
-                POS_TOKENS = tokens[TOKEN_INDEX:]
-                CURRENT_NUMBER = convert_type(string)
-
-                if not POS_TOKENS:
-                    presence.append(CURRENT_NUMBER)
-                else:
-                    NEXT = POS_TOKENS[1]
-
-                    if NEXT.type == NAME:
-                        constant = pABC.CONSTANTS.get(NEXT.string)
-                        function = pABC.KEYWORDS.get(NEXT.string)
-
-                        value = unknown_mapping.get(NEXT.string)
-                        unk = Unknown(NEXT.string)
-
-                        if value:
-                            value = convert_type(value)
-                        else:
-                            value = unk
-                        
-                        if constant:
-                            value = Irrational(constant)
-
-                        if not function:
-                            SKIP += 1
-
-                            presence.extend(
-                                [
-                                    Symbol("("),
-                                    CURRENT_NUMBER,
-                                    Operator("*"),
-                                    value,
-                                    Symbol(")"),
-                                ]
-                            )
-
-                        else:
-                            possible_correct = f"{string} * {NEXT.string}"
-
-                            raise errors.SubstitutionError(
-                                f'Invalid use of function "{function.__qualname__}" at index {NEXT.start[1]}. Perhaps you ment "{possible_correct}"'
-                            )
-
-                    else:
-                        presence.append(CURRENT_NUMBER)
+        .. code-block:: py
 
-            else:
+            >>> from cake.parsing.simplify import simplify
+            >>> print(simplify(Expression("x * 1 + 0").compile().tree).dump())
+            # 5 nodes -> 1 nodes
+            x
 
-                # Stops `' '` from raising an error
-                if string.strip() or string == ' ':
-                    raise errors.SubstitutionError(
-                        f"Unknown Token ({string}) at index {token.start[1]}"
-                    )
+        Default values of the unknowns which are left are kept.
+        """
+        compiled = self.compile()
+        return self._from_tree(compiled, simplify(compiled.tree).tree)
+
+    def _from_tree(self, compiled: CompiledExpression, tree: typing.Any) -> "Expression":
+        # A new expression for a tree derived from this one, keeping the defaults of its unknowns
+        defaults = compiled.map_arguments(tuple(), {}, self.args, self.kwargs)
+        remaining = variables(tree)
+
+        expr = Expression(str(tree))
+        expr.update_variables(
+            **{
+                unknown: value
+                for unknown, value in defaults.items()
+                if unknown in remaining and value is not None
+            }
+        )
 
-            ACTUAL_INDEX += len(string)
-            TOKEN_INDEX += 1
+        return expr
 
-        if OPEN_BRACKETS > 1:
-            raise errors.SubstitutionError(f"{OPEN_BRACKETS} Unclosed brackets")
+    def _bind(self, compiled: CompiledExpression, update_mapping: bool, args: tuple, kwargs: dict) -> dict:
+        # Maps args and kwargs onto the unknowns of a compiled expression
+        default_args = self.args
+        default_kwargs = self.kwargs
 
-        if return_tokens:
-            return presence, tokens
-        return presence
+        if update_mapping:
+            self.update_variables(*args, **kwargs)
 
-    def _glSubCode(self, update_mapping: bool = False, *args, **kwargs):
+        return compiled.map_arguments(args, kwargs, default_args, default_kwargs)
+
+    def substitute(self, update_mapping: bool = False, imports: tuple = tuple(), *args, **kwargs):
         """
-        Convert your expression into modern pythonic code, using the `Cake` library.
-        If you want the answer directly, its best to use the `.substitute` method.
+        Sub values into your equation, and evaluates the expr.
+        
+        If your using the `(+|-)` op, it will return the result as a tuple. Else just the value.
+        The length of the tuple varies in length, for every plus/minus op just multiply your value by `* 2` 
 
         Parameters
         ----------
@@ -567,106 +549,94 @@ def _glSubCode(self, update_mapping: bool = False, *args, **kwargs):
             Arguments to supply in your expression
         **kwargs: :class:`~typing.Any`
             Keyworded arguments to supply into your expression.
-        """
 
-        if "dirty" in kwargs:
-            dirty = True
-            vars = kwargs.pop('vars')
-        else:
-            vars = list()
-            dirty = False
+        .. note::
 
-        presence = kwargs.pop('dirty', self._sub(update_mapping, *args, **kwargs))
-        code = str()
-        VARS = vars
-        pm = 0
+            If any of the values are numpy arrays, the expression is compiled and evaluated over the whole array at once.
+            The result is an array instead of a cake object.
 
-        for posfix in presence:
-            if isinstance(posfix, Unknown):
-                if posfix.value not in VARS:
-                    VARS.append(f"{posfix.value} = Unknown('{posfix.value}')")
-                code += f' ( {posfix.value} ) '
+            .. code-block:: py
 
-            elif isinstance(posfix, FunctionMarker):
-                func, dirtyTokens = posfix.value
-                evaluated = Expression(...)._glSubCode(*args, **{**kwargs, 'dirty': dirtyTokens, 'vars': VARS})
+                >>> import numpy
+                >>> from cake import Expression
+                >>> Expression("x ** 2 + 3x + sin(y)").substitute(x=numpy.arange(3), y=90)
+                array([ 1.,  5., 11.])
 
-                newVars, evaluated, _ = evaluated
-                VARS.extend(newVars)
-                VARS = list(set(VARS))
+        .. note::
 
-                code += f" ( {func.__qualname__} ( {evaluated} ) ) ( )"
+            Expressions using the `(+|-)` op are compiled, see :meth:`branches`.
 
-            elif isinstance(posfix, cake.Number):
-                code += f' ( {posfix.__class__.__name__} ( {posfix.value} ) )'
+        .. note::
 
-            elif isinstance(posfix, PlusOrMinus):
-                code += '(+|-)'     # This gets sorted out later
-                pm += 1
+            Passing ``precision`` evaluates the compiled expression using mpmath, working to that many bits.
+            The result is an mpmath number instead of a cake object, and values can be given as strings to avoid rounding them to floats.
+            Code is generated once for each precision and reused. Domain errors, such as ``sqrt`` of a negative, are raised the same way.
 
-            elif isinstance(posfix, (Symbol, Operator)):
-                posfix.validate
+            .. code-block:: py
 
-                code += f' {posfix.value} '
+                >>> from cake import Expression
+                >>> Expression("x / 3 + 0.1").substitute(x=1, precision=200)
+                mpf('0.43333333333333333333333333333333333333333333333333333333333337')
 
-        if not dirty:
-            return "{}\n{}".format('\n'.join(VARS), code), pm
-        return VARS, code, pm
+        .. note::
 
-    def convertToCode(self, update_mapping: bool = False, imports: tuple = tuple(), *args, **kwargs):
+            Passing ``numeric=True`` evaluates the compiled expression on plain ints, floats and complex numbers,
+            only converting the result into a cake object, see :attr:`numeric`.
         """
-        Convert your expression into executable code!
+        precision = kwargs.pop("precision", None)
+        numeric = kwargs.pop("numeric", self.__numeric)
+        # Unknowns are a single letter, so these can't clash with one
 
-        .. warning::
-            Any imports provided, can overwrite imports from the cake library!
+        if precision is not None:
+            return self._substitute_precise(update_mapping, args, kwargs, precision)
 
-        .. code-block:: py
+        if any(is_array(value) for value in (*args, *kwargs.values())):
+            return self._substitute_array(update_mapping, args, kwargs)
 
-            >>> from cake import Expression
-            >>> imports = ("math *",)
-            # Imports * from math
-            # "math tan" only imports tan
-            # "math (tan, sin)" only imports tan, sin
-            >>> expr = "x + sqrt(y)"
-            >>> Expr = Expression(expr)
-            >>> Expr.convertToCode(imports=imports)
-            ...
+        compiled = self.__compiled
 
-        Parameters
-        ----------
-        update_mapping: :class:`bool`
-            Update the inner unknown mappings with any new args or kwargs
-        imports: :class:`tuple`
-            A tuple with import statements to be used when generating your code.
-        """
-        beginning = GEN_AUTO_CODE_MARKING(*imports)
-        code, _ = self._glSubCode(update_mapping, *args, **kwargs)
+        if self.__evaluator == "tree":
+            if imports:
+                raise errors.SubstitutionError("Imports can only be used when evaluating generated code")
+            if numeric:
+                raise errors.SubstitutionError("Numeric mode evaluates generated code, it can't be used with the tree evaluator")
+            compiled = self.compile()
 
-        return f'{beginning}{code}'
+        if numeric and not imports:
+            compiled = self.compile()
 
-    def substitute(self, update_mapping: bool = False, imports: tuple = tuple(), *args, **kwargs):
-        """
-        Sub values into your equation, and evaluates the expr.
-        
-        If your using the `(+|-)` op, it will return the result as a tuple. Else just the value.
-        The length of the tuple varies in length, for every plus/minus op just multiply your value by `* 2` 
+        if compiled is None and not imports:
+            tree = self._parsed().tree
 
-        Parameters
-        ----------
-        update_mapping: :class:`bool`
-            Update the inner unknown mappings with any new args or kwargs
-        *args: :class:`~typing.Any`
-            Arguments to supply in your expression
-        **kwargs: :class:`~typing.Any`
-            Keyworded arguments to supply into your expression.
-        """
+            if tree is not None and plus_minus_count(tree):
+                compiled = self.compile()
+
+        if compiled is not None and not imports:
+            mapping = self._bind(compiled, update_mapping, args, kwargs)
+            self.__skipped_parses = LEGACY_PARSES * compiled.parses
+
+            if numeric:
+                return compiled.evaluate_numeric(mapping)
+            return compiled.evaluate(mapping, self.__evaluator)
+
+        self.__skipped_parses = 0
 
         _, pmCount = self._glSubCode(update_mapping, *args, **kwargs)
         code = self.convertToCode(update_mapping, imports, *args, **kwargs)
         combos = cake.getPlusMinusCombos(pmCount)
 
         if not combos:
-            return execCode(code)
+            try:
+                return execCode(code)
+            except (SyntaxError, RecursionError, MemoryError):
+                # Python can't compile code nested this deeply, such as hundreds of nested functions.
+                # The compiled expression generates flatter code, or walks its tree, see `CompiledExpression.nested`
+                if imports:
+                    raise
+                compiled = self.compile()
+
+            mapping = self._bind(compiled, False, args, kwargs)
+            return compiled.evaluate(mapping, self.__evaluator)
         toBeEvaluated = list()
 
         for combo in combos:
@@ -687,18 +657,314 @@ def substitute(self, update_mapping: bool = False, imports: tuple = tuple(), *ar
             results.append(execCode(rCode))
         return tuple(results)
 
-    def solve(self, *args, **kwargs):
+    def branches(self, update_mapping: bool = False, *args, **kwargs) -> typing.Iterator[typing.Tuple[str, typing.Any]]:
+        """
+        Lazily substitute values into an expression using the `(+|-)` op, yielding a result for each combination of signs.
+        Only the ``2 ** n`` combinations for ``n`` operators are evaluated, and parts of the expression
+        which don't depend on a sign are only evaluated once.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> expr = Expression("sqrt(x) (+|-) y (+|-) 1")
+            >>> results = dict(expr.branches(x=4, y=2))
+            >>> results.keys()
+            dict_keys(['++', '+-', '-+', '--'])
+
+        Parameters
+        ----------
+        update_mapping: :class:`bool`
+            Update the inner unknown mappings with any new args or kwargs
+        *args: :class:`~typing.Any`
+            Arguments to supply in your expression
+        **kwargs: :class:`~typing.Any`
+            Keyworded arguments to supply into your expression.
+        """
+        compiled = self.compile()
+        mapping = self._bind(compiled, update_mapping, args, kwargs)
+
+        self.__skipped_parses = LEGACY_PARSES * compiled.parses
+        yield from compiled.branches(mapping, self.__evaluator)
+
+    def substitute_many(self, rows: typing.Iterable[typing.Union[typing.Mapping[str, typing.Any], typing.Sequence]]) -> typing.Iterator:
+        """
+        Substitute every row of values into your expression, yielding the results one at a time.
+        The expression is only parsed once, so this works well with large or endless iterables such as a csv reader.
+
+        .. code-block:: py
+
+            >>> import csv
+            >>> from cake import Expression
+            >>> expr = Expression("x ** 2 + y")
+            >>> with open("values.csv") as f:
+            ...     for result in expr.substitute_many(csv.DictReader(f)):
+            ...         print(result)
+
+        Parameters
+        ----------
+        rows: :class:`~typing.Iterable[typing.Union[typing.Mapping, typing.Sequence]]`
+            An iterable of mappings, which are used like keyworded arguments, or sequences, which are used like arguments.
+            Any values which aren't provided use the expressions default arguments.
+        """
+        compiled = self.compile()
+        skipped = LEGACY_PARSES * compiled.parses
+
+        self.__skipped_parses = 0
+
+        for row in rows:
+            if isinstance(row, typing.Mapping):
+                mapping = self._bind(compiled, False, tuple(), row)
+            else:
+                mapping = self._bind(compiled, False, tuple(row), {})
+
+            self.__skipped_parses += skipped
+
+            if self.__numeric:
+                yield compiled.evaluate_numeric(mapping)
+            else:
+                yield compiled.evaluate(mapping, self.__evaluator)
+
+    def substitute_parallel(
+        self,
+        rows: typing.Iterable[typing.Union[typing.Mapping[str, typing.Any], typing.Sequence]],
+        workers: typing.Optional[int] = None,
+        chunksize: int = 1000,
+    ) -> typing.Iterator:
+        """
+        Works the same way as :meth:`substitute_many`, except the rows are evaluated across multiple processes.
+        The compiled expression is sent to each process once, and results are yielded in the same order as the rows.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> expr = Expression("x ** 2 + y")
+            >>> results = list(expr.substitute_parallel(((x, 1) for x in range(10 ** 6)), workers=4))
+
+        Parameters
+        ----------
+        rows: :class:`~typing.Iterable[typing.Union[typing.Mapping, typing.Sequence]]`
+            An iterable of mappings or sequences, see :meth:`substitute_many`
+        workers: :class:`int`
+            The number of processes to use, defaults to the number of CPUs
+        chunksize: :class:`int`
+            The number of rows sent to a process at a time
+        """
+        compiled = self.compile()
+
+        return parallel.substitute_parallel(
+            compiled,
+            rows,
+            workers=workers,
+            chunksize=chunksize,
+            default_args=self.args,
+            default_kwargs=self.kwargs,
+        )
+
+    def _substitute_array(self, update_mapping: bool, args: tuple, kwargs: dict):
+        # Evaluates the expression over numpy arrays in a single pass
+        compiled = self.compile()
+        mapping = self._bind(compiled, update_mapping, args, kwargs)
+
+        missing = [name for name in compiled.variables if mapping.get(name) is None]
+        if missing:
+            raise errors.MissingValue(
+                "No value was provided for {}".format(", ".join(missing))
+            )
+
+        values = [getattr(mapping[name], "value", mapping[name]) for name in compiled.variables]
+        self.__skipped_parses = LEGACY_PARSES * compiled.parses
+
+        if compiled.polynomial is not None:
+            return compiled.polynomial(*values)
+        return compiled.lambdify(backend="numpy")(*values)
+
+    def _substitute_precise(self, update_mapping: bool, args: tuple, kwargs: dict, precision: int):
+        # Evaluates the expression using mpmath, with the function for each precision cached on the compiled expression
+        compiled = self.compile()
+        mapping = self._bind(compiled, update_mapping, args, kwargs)
+
+        missing = [name for name in compiled.variables if mapping.get(name) is None]
+        if missing:
+            raise errors.MissingValue(
+                "No value was provided for {}".format(", ".join(missing))
+            )
+
+        backend = mpmath_backend(precision)
+        values = [backend.convert(mapping[name]) for name in compiled.variables]
+        self.__skipped_parses = LEGACY_PARSES * compiled.parses
+
+        return compiled.lambdify(backend=backend)(*values)
+
+    def _solver(self, compiled: CompiledExpression, mapping: dict, variable: typing.Optional[str]) -> Solver:
+        # Picks the unknown to solve for, which is the only one without a value unless `variable` is provided
+        if variable is None:
+            missing = [name for name in compiled.variables if mapping.get(name) is None]
+
+            if not missing:
+                raise errors.SolveError("Every unknown has a value, choose which one to solve for using `variable`")
+            if len(missing) > 1:
+                raise errors.MissingValue(
+                    "No value was provided for {}, only the unknown being solved for can be left out".format(
+                        ", ".join(missing[1:])
+                    )
+                )
+            variable = missing[0]
+
+        return compiled.solver(variable)
+
+    @staticmethod
+    def _solve_values(solver: Solver, mapping: dict) -> list:
+        # The raw values of every unknown except the one being solved for
+        missing = [name for name in solver.parameters if mapping.get(name) is None]
+        if missing:
+            raise errors.MissingValue(
+                "No value was provided for {}".format(", ".join(missing))
+            )
+
+        return [getattr(mapping[name], "value", mapping[name]) for name in solver.parameters]
+
+    def solve(
+        self,
+        *args,
+        variable: typing.Optional[str] = None,
+        x0: typing.Optional[typing.Any] = None,
+        bracket: typing.Optional[typing.Tuple[float, float]] = None,
+        tol: float = roots.TOLERANCE,
+        maxiter: int = roots.MAX_ITERATIONS,
+        **kwargs,
+    ):
         """
-        Equals your expression to ``0`` and solves it mathmatically.
+        Equals your expression to ``0`` and solves it numerically, for the only unknown without a value.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> expr = Expression("x ** 2 - y")
+            >>> expr.solve(y=2)
+            Real(1.4142135623730951)
+            >>> expr.solve(x=3, variable="y")
+            Real(9.0)
+
+        The root is found using newton's method, using the derivative of the expression.
+        If it doesn't converge, brent's method is used on ``bracket``,
+        or on an interval found by searching outwards from ``x0``.
+        The expression is compiled and differentiated once, so solving it repeatedly only costs the iterations.
+
+        .. note::
+
+            If any of the values are numpy arrays, every element is solved for at once and an array of roots is returned,
+            see :meth:`~cake.parsing.roots.Solver.solve_array`.
+
+            .. code-block:: py
+
+                >>> import numpy
+                >>> Expression("x ** 2 - y").solve(y=numpy.array([4, 9, 16]))
+                array([2., 3., 4.])
 
         Parameters
         ----------
         *args:
             Arguments to supply in your expression
+        variable: :class:`str`
+            The unknown to solve for, defaults to the only unknown without a value
+        x0: :class:`float`
+            The initial guess, defaults to the middle of ``bracket``, or ``1``
+        bracket: :class:`~typing.Tuple[float, float]`
+            An interval which the root must be in, the expression must have a different sign at each end
+        tol: :class:`float`
+            How close the root must be, relative to its size
+        maxiter: :class:`int`
+            The maximum number of iterations of each method
         **kwargs:
             Keyworded arguments to supply into your expression.
         """
-        raise NotImplementedError()
+        compiled = self.compile()
+        mapping = self._bind(compiled, False, args, kwargs)
+
+        solver = self._solver(compiled, mapping, variable)
+        values = self._solve_values(solver, mapping)
+
+        if any(is_array(value) for value in (*values, x0)):
+            return solver.solve_array(values, x0, bracket, tol, maxiter)
+        return convert_type(solver.solve(values, x0, bracket, tol, maxiter))
+
+    def solve_many(
+        self,
+        rows: typing.Iterable[typing.Union[typing.Mapping[str, typing.Any], typing.Sequence]],
+        variable: typing.Optional[str] = None,
+        x0: typing.Optional[float] = None,
+        bracket: typing.Optional[typing.Tuple[float, float]] = None,
+        tol: float = roots.TOLERANCE,
+        maxiter: int = roots.MAX_ITERATIONS,
+        chunksize: int = 1000,
+    ) -> typing.Iterator:
+        """
+        Solve your expression for every row of values, yielding the roots one at a time.
+        Rows are gathered into chunks, when numpy is installed each chunk is solved at once using newton's method over arrays.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> expr = Expression("x ** 2 - y")
+            >>> list(expr.solve_many([{"y": 4}, {"y": 9}]))
+            [Real(2.0), Real(3.0)]
+
+        Parameters
+        ----------
+        rows: :class:`~typing.Iterable[typing.Union[typing.Mapping, typing.Sequence]]`
+            An iterable of mappings or sequences, see :meth:`substitute_many`.
+            The unknown being solved for is worked out from the first row, unless ``variable`` is provided.
+        variable, x0, bracket, tol, maxiter:
+            See :meth:`solve`
+        chunksize: :class:`int`
+            The number of rows solved at once
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1")
+
+        compiled = self.compile()
+        rows = iter(rows)
+        solver = None
+
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+
+        while True:
+            mappings = list()
+
+            for row in itertools.islice(rows, chunksize):
+                if isinstance(row, typing.Mapping):
+                    mappings.append(self._bind(compiled, False, tuple(), row))
+                else:
+                    mappings.append(self._bind(compiled, False, tuple(row), {}))
+
+            if not mappings:
+                return
+
+            if solver is None:
+                solver = self._solver(compiled, mappings[0], variable)
+
+            values = [self._solve_values(solver, mapping) for mapping in mappings]
+
+            if numpy is None or not solver.parameters:
+                # Without numpy, or without any other unknowns to build arrays from
+                for row in values:
+                    yield convert_type(solver.solve(row, x0, bracket, tol, maxiter))
+                continue
+
+            columns = [numpy.array(column) for column in zip(*values)]
+
+            for root, mapping in zip(solver.solve_array(columns, x0, bracket, tol, maxiter).tolist(), mappings):
+                if root != root:
+                    # `nan`, so there's no root for this row
+                    raise errors.SolveError(
+                        "No root was found for {}, using {}".format(
+                            solver.variable, {name: mapping[name] for name in solver.parameters}
+                        )
+                    )
+                yield convert_type(root)
 
     def append(self, expr: typing.Union[str, "Expression"]) -> None:
         """
@@ -719,7 +985,9 @@ def append(self, expr: typing.Union[str, "Expression"]) -> None:
         """
         if isinstance(expr, Expression):
             expr = expr.expression
-        self.__expression += expr
+
+        parsed = incremental.append(self.__parsed, self.__expression, expr)
+        self._edited(self.__expression + expr, parsed)
 
     def prepend(self, expr: typing.Union[str, "Expression"]) -> None:
         """
@@ -740,7 +1008,9 @@ def prepend(self, expr: typing.Union[str, "Expression"]) -> None:
         """
         if isinstance(expr, Expression):
             expr = expr.expression
-        self.__expression = expr + self.__expression
+
+        parsed = incremental.prepend(self.__parsed, self.__expression, expr)
+        self._edited(expr + self.__expression, parsed)
 
     def wrap_all(self, operator: str, ending: str, *eq_args, **eq_kwargs) -> None:
         """
@@ -767,10 +1037,10 @@ def wrap_all(self, operator: str, ending: str, *eq_args, **eq_kwargs) -> None:
         """
         op = Operator(operator)
 
-        eq = f"({self.__expression})"
-        eq += f" {op.value} {ending}"
+        ending = f" {op.value} {ending}"
 
-        self.__expression = eq
+        parsed = incremental.wrap(self.__parsed, self.__expression, ending)
+        self._edited(f"({self.__expression}){ending}", parsed)
 
         self.update_variables(*eq_args, **eq_kwargs)
 
@@ -806,6 +1076,7 @@ def update_variables(
             self.kwargs = default_kwargs
 
             self.__mappings = mapping
+            self.__dict__.pop("lru_cache", None)
         else:
             return mapping
 
@@ -827,11 +1098,10 @@ def terms(self) -> list:
                     term = term * -1
                 terms.append(term)
             elif isinstance(term, FunctionMarker):
-                function, inter = term.value
+                variables, evaluated, _ = self._glSubCode(dirty=[term], vars=list())
+                code = "{}\n{}".format('\n'.join(variables), evaluated)
 
-                _, evaluated, _ = Expression(...)._glSubCode(*self.args, **{**self.kwargs, 'dirty': inter, 'vars': list()})
-                cd = f"{function.__qualname__}({evaluated})"
-                terms.append(Expression(cd).substitute())
+                terms.append(execCode(f"{GEN_AUTO_CODE_MARKING()}{code}"))
 
             elif isinstance(term, Operator) and term.value == '-':
                 NEGATE_NEXT = True
@@ -839,6 +1109,70 @@ def terms(self) -> list:
         self.lru_cache = terms
         return terms
 
+    @property
+    def evaluator(self) -> str:
+        """
+        How :meth:`substitute`, :meth:`branches` and :meth:`substitute_many` evaluate the expression.
+
+        - ``"code"``, the default, evaluates python code generated from the expression.
+        - ``"tree"`` walks the parsed tree using a fixed table of operators and functions, see :func:`~cake.parsing.evaluator.evaluate_tree`.
+          Nothing is generated or executed, so it's the safer choice for expressions from untrusted sources.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> expr = Expression("x * 2 + sin(y)")
+            >>> expr.evaluator = "tree"
+            >>> expr.substitute(x=3, y=90)
+            Real(7.0)
+
+        Arrays, ``precision`` and :meth:`substitute_parallel` always use generated code.
+        """
+        return self.__evaluator
+
+    @evaluator.setter
+    def evaluator(self, evaluator: str) -> None:
+        if evaluator == "tree" and self.__numeric:
+            raise ValueError("Numeric mode evaluates generated code, it can't be used with the tree evaluator")
+        self.__evaluator = check_evaluator(evaluator)
+
+    @property
+    def numeric(self) -> bool:
+        """
+        Whether :meth:`substitute` and :meth:`substitute_many` evaluate on plain ints, floats and complex numbers,
+        only converting the result into a cake object. Defaults to ``False``, and can be overridden for a single call
+        using ``substitute(..., numeric=True)``.
+
+        Intermediate values skip :func:`~cake.convert_type`, so it's several times faster, see :meth:`~cake.parsing.CompiledExpression.evaluate_numeric`.
+        Arithmetic uses python's operators, the same as :meth:`~cake.parsing.CompiledExpression.lambdify`,
+        and results are the same as without numeric mode. Expressions containing a factorial are always evaluated with cake's objects.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> expr = Expression("x * 2 + sin(y)")
+            >>> expr.numeric = True
+            >>> expr.substitute(x=3, y=90)
+            Real(7.0)
+        """
+        return self.__numeric
+
+    @numeric.setter
+    def numeric(self, numeric: bool) -> None:
+        if numeric and self.__evaluator == "tree":
+            raise ValueError("Numeric mode evaluates generated code, it can't be used with the tree evaluator")
+        self.__numeric = bool(numeric)
+
+    @property
+    def compiled(self) -> typing.Optional[CompiledExpression]:
+        """Returns the compiled form of the expression, or ``None`` if it hasn't been compiled"""
+        return self.__compiled
+
+    @property
+    def skipped_parses(self) -> int:
+        """Returns how many times the last call to :meth:`substitute` avoided tokenizing the expression"""
+        return self.__skipped_parses
+
     @property
     def mapping(self):
         """Returns a copy of the variable mappings for unknowns"""
@@ -856,10 +1190,40 @@ def __repr__(self) -> str:
 
         return self.expression
 
-    def __eq__(self, other: "Expression") -> "Equation":
+    def _structure(self) -> typing.Hashable:
+        # The parsed tree, or the normalized text for expressions which can't be parsed
+        try:
+            return self._parsed().tree
+        except errors.SubstitutionError:
+            return normalize(self.__expression)
+
+    def __eq__(self, other: "Expression") -> bool:
         """
-        Equality is not used for checking with an `Expression`.
-        This instead creates an ``Equation`` object, which states:
-            Expr1 = Expr2
+        Checks if 2 expressions have the same structure once parsed, so ``Expression("2x+1") == Expression("2 * x + 1")``.
+        Default arguments aren't compared, and expressions which are mathematically equal but written differently,
+        such as ``x + 1`` and ``1 + x``, aren't equal.
+
+        .. code-block:: py
+
+            >>> from cake import Expression
+            >>> Expression("X ** 2 + 3x") == Expression("x**2 + 3 * x")
+            True
+            >>> len({Expression("x + 1"), Expression("x+1"), Expression("1 + x")})
+            2
+
+        .. note::
+
+            The hash changes when an expression is modified, using methods such as :meth:`append`,
+            so expressions shouldn't be modified while they are in a set or used as a key.
         """
-        raise NotImplementedError()
+        if not isinstance(other, Expression):
+            return NotImplemented
+        return self._structure() == other._structure()
+
+    def __ne__(self, other: "Expression") -> bool:
+        if not isinstance(other, Expression):
+            return NotImplemented
+        return not self == other
+
+    def __hash__(self) -> int:
+        return hash(self._structure())
@@ -0,0 +1,288 @@
+"""
+Forward mode automatic differentiation, used by :meth:`cake.Expression.grad`.
+
+Every node of the tree is treated as a dual number, a value along with its partial derivative with respect to each unknown.
+Instead of creating an object for each dual number, their arithmetic is written out as python code when the function is generated,
+so the value and every partial derivative are plain floats which are computed together in a single pass.
+Partial derivatives which are always zero, such as the derivative of ``y`` with respect to ``x``, are left out of the code.
+"""
+import itertools
+import math
+import typing
+
+from cake import errors
+from . import pABC
+from .backends import FUNCTIONS, get_backend
+from .tree import Node, Literal, Variable, UnaryOp, BinaryOp, PlusMinus, Call, Temporary
+
+__all__ = ("generate_gradient", "digamma")
+
+DEGREES = repr(math.pi / 180)
+# Cake's trig functions take degrees, so their derivatives are scaled by `d/dx radians(x)`
+
+SLOPES: typing.Mapping[typing.Callable, str] = {
+    pABC.KEYWORDS["sqrt"]: "0.5 / {v}",
+    pABC.KEYWORDS["sin"]: f"cos(radians({{u}})) * {DEGREES}",
+    pABC.KEYWORDS["cos"]: f"-sin(radians({{u}})) * {DEGREES}",
+    pABC.KEYWORDS["tan"]: f"(1 + {{v}} * {{v}}) * {DEGREES}",
+    pABC.KEYWORDS["sec"]: f"{{v}} * tan(radians({{u}})) * {DEGREES}",
+    pABC.KEYWORDS["cosec"]: f"-{{v}} / tan(radians({{u}})) * {DEGREES}",
+    pABC.KEYWORDS["cot"]: f"-(1 + {{v}} * {{v}}) * {DEGREES}",
+    pABC.SYMBOL_KW["!"]: "{v} * digamma({u} + 1)",
+}
+# The derivative of each function, in terms of its argument `u` and its value `v`
+
+
+def digamma(x: float) -> float:
+    """ The derivative of ``log(gamma(x))``, used for the derivative of factorials """
+    if x <= 0 and x == math.floor(x):
+        raise ValueError("digamma is undefined for non-positive integers")
+
+    if x < 0:
+        # Reflection formula
+        return digamma(1 - x) - math.pi / math.tan(math.pi * x)
+
+    result = 0.0
+
+    while x < 6:
+        result -= 1 / x
+        x += 1
+
+    # Asymptotic series, accurate to double precision once `x >= 6`
+    inverse = 1 / (x * x)
+    return result + math.log(x) - 0.5 / x - inverse * (
+        1 / 12 - inverse * (1 / 120 - inverse * (1 / 252 - inverse * (1 / 240 - inverse / 132)))
+    )
+
+
+Partials = typing.List[typing.Optional[str]]
+# The name holding each partial derivative, `None` when it's always zero
+
+
+class _Generator(object):
+    # Writes out the lines of the generated function
+
+    def __init__(self, namespace: dict, seeds: typing.Mapping[str, Partials]) -> None:
+        self.namespace = namespace
+        self.seeds = seeds
+        self.size = len(next(iter(seeds.values()))) if seeds else 0
+        self.lines = list()
+        self.temporaries = dict()
+        self.count = 0
+
+    def assign(self, code: str) -> str:
+        name = f"_v{self.count}"
+        self.count += 1
+        self.lines.append(f"{name} = {code}")
+        return name
+
+    def zeros(self) -> Partials:
+        return [None] * self.size
+
+    def scale(self, partials: Partials, factor: str) -> Partials:
+        return [None if partial is None else self.assign(f"{partial} * {factor}") for partial in partials]
+
+    def combine(self, first: Partials, second: Partials, op: str = "+") -> Partials:
+        combined = list()
+
+        for a, b in zip(first, second):
+            if b is None:
+                combined.append(a)
+            elif a is None:
+                combined.append(b if op == "+" else self.assign(f"-{b}"))
+            else:
+                combined.append(self.assign(f"{a} {op} {b}"))
+        return combined
+
+    def leaf(self, node: Node) -> typing.Tuple[str, Partials]:
+        if isinstance(node, Literal):
+            literal = get_backend("math").literal(node.value, None)
+
+            if literal.startswith("-"):
+                literal = f"({literal})"
+            return literal, self.zeros()
+
+        if isinstance(node, Variable):
+            return node.name, self.seeds.get(node.name) or self.zeros()
+
+        if isinstance(node, Temporary):
+            return self.temporaries[node.name]
+
+        raise TypeError(f"Cannot generate code for {node!r}")
+
+    def binary(self, op: str, left: tuple, right: tuple) -> typing.Tuple[str, Partials]:
+        (a, da), (b, db) = left, right
+        value = self.assign(f"{a} {op} {b}")
+
+        if op in ("+", "-"):
+            return value, self.combine(da, db, op)
+
+        if op == "*":
+            return value, self.combine(self.scale(da, b), self.scale(db, a))
+
+        if op == "/":
+            if any(db):
+                # (da - value * db) / b
+                return value, self.scale(self.combine(da, self.scale(db, value), "-"), f"(1 / {b})")
+            return value, self.scale(da, f"(1 / {b})")
+
+        if op == "**":
+            partials = self.zeros()
+
+            if any(da):
+                partials = self.scale(da, self.assign(f"{b} * {a} ** ({b} - 1)"))
+            if any(db):
+                partials = self.combine(partials, self.scale(db, self.assign(f"{value} * log({a})")))
+            return value, partials
+
+        if op == "//":
+            # A step function, which is flat everywhere it's defined
+            return value, self.zeros()
+
+        if op == "%":
+            # a % b = a - b * (a // b)
+            if any(db):
+                return value, self.combine(da, self.scale(db, f"({a} // {b})"), "-")
+            return value, da
+
+        raise errors.SubstitutionError(f"Cannot differentiate the {op} operator")
+
+    def call(self, function: typing.Callable, argument: tuple) -> typing.Tuple[str, Partials]:
+        u, du = argument
+
+        try:
+            template, slope = FUNCTIONS[function], SLOPES[function]
+        except KeyError:
+            raise errors.SubstitutionError(f"Cannot differentiate {function.__qualname__}") from None
+
+        value = self.assign(template.format(u))
+
+        if not any(du):
+            return value, du
+        return value, self.scale(du, self.assign(slope.format(u=u, v=value)))
+
+    def generate(self, tree: Node, signs: typing.Iterable[str] = tuple()) -> typing.Tuple[str, Partials]:
+        """ Writes the lines for a tree, returning the names of its value and partial derivatives """
+        signs = iter(signs)
+        results = list()
+        pending = list()
+        # Signs of `(+|-)` operators waiting for their right operand
+        stack = [(tree, 0)]
+
+        # Children are generated in order of appearance, so signs are used in the same order as `generate_source`
+        while stack:
+            node, state = stack.pop()
+
+            if not node.children:
+                results.append(self.leaf(node))
+                continue
+
+            if isinstance(node, PlusMinus):
+                if state == 0:
+                    stack.append((node, 2))
+                    stack.append((node.right, 0))
+                    stack.append((node, 1))
+
+                    if node.left is not None:
+                        stack.append((node.left, 0))
+                elif state == 1:
+                    pending.append(next(signs))
+                else:
+                    sign = pending.pop()
+                    right = results.pop()
+
+                    if node.left is None:
+                        left = ("0.0", self.zeros())
+                    else:
+                        left = results.pop()
+                    results.append(self.binary(sign, left, right))
+                continue
+
+            if state == 0:
+                stack.append((node, 1))
+                stack.extend((child, 0) for child in reversed(node.children))
+                continue
+
+            if isinstance(node, UnaryOp):
+                a, da = results.pop()
+
+                if node.op == "+":
+                    results.append((a, da))
+                elif node.op == "-":
+                    results.append((self.assign(f"-{a}"), self.scale(da, "-1")))
+                else:
+                    raise errors.SubstitutionError(f"Cannot differentiate the {node.op} operator")
+            elif isinstance(node, BinaryOp):
+                right = results.pop()
+                results.append(self.binary(node.op, results.pop(), right))
+            elif isinstance(node, Call):
+                results.append(self.call(node.function, results.pop()))
+            else:
+                raise TypeError(f"Cannot generate code for {node!r}")
+
+        return results.pop()
+
+
+def generate_gradient(
+    tree: Node,
+    argnames: typing.Sequence[str],
+    names: typing.Sequence[str],
+    temporaries: typing.Sequence[typing.Tuple[str, Node]] = tuple(),
+    plus_minus: int = 0,
+) -> typing.Callable:
+    """
+    Returns a function which takes ``argnames`` and returns ``(value, partials)``,
+    the partial derivatives being with respect to each of ``names``.
+    When the tree has ``(+|-)`` operators, a tuple with a result for every combination of signs is returned.
+
+    .. code-block:: py
+
+        >>> from cake.parsing.parser import parse
+        >>> from cake.parsing.gradient import generate_gradient
+        >>> f = generate_gradient(parse("x ** 2 * y"), ("x", "y"), ("x", "y"))
+        >>> f(3.0, 2.0)
+        (18.0, (12.0, 9.0))
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The tree to differentiate, using the math backend's functions
+    argnames: :class:`~typing.Sequence[str]`
+        The names of the functions arguments
+    names: :class:`~typing.Sequence[str]`
+        The unknowns to differentiate with respect to
+    temporaries: :class:`~typing.Sequence[~typing.Tuple[str, ~cake.parsing.tree.Node]]`
+        Repeated subexpressions used by the tree, from :func:`~cake.parsing.optimize.optimize`
+    plus_minus: :class:`int`
+        The number of ``(+|-)`` operators in the tree
+    """
+    namespace = {"__builtins__": {}, **get_backend("math").namespace, "digamma": digamma, "log": math.log}
+    # `log` is used by the derivative of powers with a variable exponent
+    seeds = {
+        name: [("1.0" if index == position else None) for index in range(len(names))]
+        for position, name in enumerate(names)
+    }
+
+    generator = _Generator(namespace, seeds)
+
+    for name, subtree in temporaries:
+        generator.temporaries[name] = generator.generate(subtree)
+
+    def output(result: typing.Tuple[str, Partials]) -> str:
+        value, partials = result
+        return f"({value}, ({''.join(f'{partial or 0.0}, ' for partial in partials)}))"
+
+    if plus_minus:
+        results = [
+            output(generator.generate(tree, signs))
+            for signs in itertools.product("+-", repeat=plus_minus)
+        ]
+        returned = f"({', '.join(results)},)"
+    else:
+        returned = output(generator.generate(tree))
+
+    body = "".join(f"    {line}\n" for line in generator.lines)
+    source = f"def _gradient({', '.join(argnames)}):\n{body}    return {returned}\n"
+
+    exec(compile(source, "<cake>", "exec"), namespace)
+    return namespace["_gradient"]
@@ -0,0 +1,335 @@
+"""
+Incremental parsing, used by :meth:`cake.Expression.append`, :meth:`cake.Expression.prepend` and :meth:`cake.Expression.wrap_all`.
+
+Only the new text is parsed, its tree is then grafted onto the existing tree.
+Grafting is only done when precedence guarantees the result is the same as parsing the whole expression,
+otherwise the whole expression is parsed again.
+"""
+import collections
+import typing
+
+from cake import errors
+from . import pABC
+from .cache import PARSE_CACHE, ParsedExpression, normalize
+from .lexer import (
+    Token,
+    tokenize,
+    match_brackets,
+    NUMBER,
+    IMAGINARY,
+    NAME,
+    OPERATOR,
+    OPEN,
+    CLOSE,
+    PLUS_MINUS,
+    POSTFIX,
+    END,
+)
+from .parser import Parser, IMPLIED_MULTIPLICATION, CALL_PRECEDENCE
+from .tree import (
+    Node,
+    UnaryOp,
+    BinaryOp,
+    PlusMinus,
+    Call,
+    BINARY_PRECEDENCE,
+    UNARY_PRECEDENCE,
+    RIGHT_ASSOCIATIVE,
+)
+
+__all__ = ("STATS", "binding_precedence", "append", "prepend", "wrap")
+
+ATOM = 11
+# Higher than any operator, used for expressions with no operators outside of brackets
+
+OPERAND_ENDS = {NUMBER, IMAGINARY, NAME, CLOSE, POSTFIX}
+# Tokens which end an operand, an operator following one of these is binary
+
+WORD_CHARS = set("abcdefghijklmnopqrstuvwxyz0123456789._")
+SYMBOL_CHARS = set("+-*/^&|<>%")
+# Characters from the same set are lexed together if they touch, e.g. `x` `y` or `*` `*`
+
+POSTFIX_FUNCTIONS = set(pABC.SYMBOL_KW.values())
+# Functions written after their operand, such as `x!`
+
+STATS: typing.Counter[str] = collections.Counter()
+# Counts how often new text was ``grafted`` onto a tree, or the whole expression was ``parsed``
+
+
+def binding_precedence(tokens: typing.List[Token]) -> int:
+    """
+    Returns the lowest precedence of any operator outside of brackets,
+    including unary operators and implied multiplication.
+    Expressions without any operators, such as ``3x`` or ``(x + 1)``, return ``ATOM``.
+
+    .. code-block:: py
+
+        >>> from cake.parsing.lexer import tokenize
+        >>> from cake.parsing.incremental import binding_precedence
+        >>> binding_precedence(tokenize("(x + 1) ** 2"))
+        8
+
+    Parameters
+    ----------
+    tokens: :class:`~typing.List[~cake.parsing.lexer.Token]`
+        Tokens from :func:`~cake.parsing.lexer.tokenize`
+    """
+    brackets = match_brackets(tokens)
+    lowest = ATOM
+    previous = None
+    position = 0
+
+    while tokens[position].kind != END:
+        token = tokens[position]
+        kind = token.kind
+        follows_operand = previous in OPERAND_ENDS
+
+        if kind == OPERATOR:
+            precedence = BINARY_PRECEDENCE[token.value] if follows_operand else UNARY_PRECEDENCE
+        elif kind == PLUS_MINUS:
+            precedence = BINARY_PRECEDENCE["+-"] if follows_operand else UNARY_PRECEDENCE
+        elif kind in IMPLIED_MULTIPLICATION and follows_operand and not (previous == NUMBER and kind == NAME):
+            # `3x` is a single operand, but `x y` and `2(x)` are multiplied
+            precedence = BINARY_PRECEDENCE["*"]
+        else:
+            precedence = ATOM
+
+        lowest = min(lowest, precedence)
+
+        if kind == OPEN:
+            position = brackets[position]
+            kind = CLOSE
+        elif kind == NAME and token.value in pABC.KEYWORDS:
+            # Functions are applied to what follows them, rather than being multiplied by it
+            kind = None
+
+        previous = kind
+        position += 1
+
+    return lowest
+
+
+def _join(left: str, right: str) -> typing.Tuple[str, int, bool]:
+    # Returns `normalize(left + right)`, the index `right` starts at within it,
+    # and whether both sides can be lexed separately
+    left_text = normalize(left)
+    right_text = normalize(right)
+
+    if not left_text or not right_text:
+        return left_text + right_text, len(left_text), False
+
+    if left[-1].isspace() or right[0].isspace():
+        return f"{left_text} {right_text}", len(left_text) + 1, True
+
+    last, first = left_text[-1], right_text[0]
+    safe = not (
+        (last in WORD_CHARS and first in WORD_CHARS)
+        or (last in SYMBOL_CHARS and first in SYMBOL_CHARS)
+        # `2e` followed by `+5` is a single number
+        or (last == "e" and first in "+-")
+    )
+    return left_text + right_text, len(left_text), safe
+
+
+def _shift(tokens: typing.Iterable[Token], offset: int) -> typing.List[Token]:
+    return [Token(token.kind, token.value, token.index + offset) for token in tokens]
+
+
+def _precedence(op: Token) -> typing.Tuple[int, bool]:
+    # The precedence of a binary operator, and whether it's right associative
+    if op.kind == PLUS_MINUS:
+        return BINARY_PRECEDENCE["+-"], False
+    if op.kind == OPERATOR:
+        return BINARY_PRECEDENCE[op.value], op.value in RIGHT_ASSOCIATIVE
+    return -1, False
+
+
+def _absorbs(tree: Node) -> int:
+    """
+    The lowest precedence an operator written after ``tree`` needs to be parsed as part of it, rather than being applied to all of it.
+    Only the right edge of the tree is followed, so this doesn't depend on the size of the tree.
+    Brackets aren't stored in the tree, so this may be lower than needed, which only means the expression is parsed again.
+    """
+    lowest = ATOM
+    node = tree
+
+    while True:
+        if isinstance(node, BinaryOp):
+            minimum = BINARY_PRECEDENCE[node.op] + (node.op not in RIGHT_ASSOCIATIVE)
+            node = node.right
+        elif isinstance(node, PlusMinus):
+            minimum = UNARY_PRECEDENCE if node.left is None else BINARY_PRECEDENCE["+-"] + 1
+            node = node.right
+        elif isinstance(node, UnaryOp):
+            minimum = UNARY_PRECEDENCE
+            node = node.operand
+        elif isinstance(node, Call) and node.function not in POSTFIX_FUNCTIONS:
+            # `sin x` only takes the next operand, but `sin -x ** 2` is `sin(-(x ** 2))`
+            minimum = CALL_PRECEDENCE
+            node = node.argument
+        else:
+            return lowest
+
+        lowest = min(lowest, minimum)
+
+
+def _operand(tokens: typing.List[Token], precedence: int, right_associative: bool, left: bool) -> bool:
+    # Whether every operator in `tokens` binds tighter than the operator on its `left` or right side
+    binding = binding_precedence(tokens)
+    return binding > precedence or (binding == precedence and right_associative != left)
+
+
+def _combine(op: Token, left: Node, right: Node) -> Node:
+    if op.kind == PLUS_MINUS:
+        return PlusMinus(left, right)
+    return BinaryOp(op.value, left, right)
+
+
+def _graft(
+    text: str, op: Token, left: typing.List[Token], right: typing.List[Token], tree: Node, old_is_left: bool
+) -> ParsedExpression:
+    # Joins the tree of the old expression with the new one, either side of `op`
+    if old_is_left:
+        tree = _combine(op, tree, Parser(right).parse())
+    else:
+        tree = _combine(op, Parser(left).parse(), tree)
+
+    STATS["grafted"] += 1
+
+    end = Token(END, "", len(text))
+    return PARSE_CACHE.add(text, ParsedExpression(left[:-1] + [op] + right[:-1] + [end], tree))
+
+
+def _parse(text: str) -> typing.Optional[ParsedExpression]:
+    STATS["parsed"] += 1
+
+    try:
+        return PARSE_CACHE.parse(text)
+    except errors.SubstitutionError:
+        # Invalid expressions are reported once they are used
+        return None
+
+
+def _append(
+    parsed: typing.Optional[ParsedExpression], expression: str, fragment: str, absorbs: typing.Optional[int] = None
+) -> typing.Optional[ParsedExpression]:
+    text, offset, safe = _join(expression, fragment)
+
+    if safe and parsed is not None and parsed.tree is not None:
+        try:
+            tokens = tokenize(text[offset:])
+            op = _shift(tokens[:1], offset)[0]
+            precedence, right_associative = _precedence(op)
+
+            if absorbs is None:
+                absorbs = _absorbs(parsed.tree)
+
+            if (
+                len(tokens) > 2
+                and 0 <= precedence < absorbs
+                and _operand(tokens[1:], precedence, right_associative, False)
+            ):
+                return _graft(text, op, parsed.tokens, _shift(tokens[1:], offset), parsed.tree, True)
+        except errors.SubstitutionError:
+            # Such as unbalanced brackets, which may still be valid as part of the whole expression
+            pass
+
+    return _parse(expression + fragment)
+
+
+def append(
+    parsed: typing.Optional[ParsedExpression], expression: str, fragment: str
+) -> typing.Optional[ParsedExpression]:
+    """
+    Returns the parsed form of ``expression + fragment``, reusing the tree of ``expression`` when the fragment
+    starts with an operator which is applied to the whole expression, such as ``"x + 1" + " - 2"``.
+    ``None`` is returned if the new expression can't be parsed.
+
+    Parameters
+    ----------
+    parsed: :class:`~typing.Optional[~cake.parsing.cache.ParsedExpression]`
+        The parsed form of ``expression``, ``None`` if it isn't known
+    expression: :class:`str`
+        The current expression
+    fragment: :class:`str`
+        The text being added to the end
+    """
+    return _append(parsed, expression, fragment)
+
+
+def prepend(
+    parsed: typing.Optional[ParsedExpression], expression: str, fragment: str
+) -> typing.Optional[ParsedExpression]:
+    """
+    Returns the parsed form of ``fragment + expression``, reusing the tree of ``expression`` when the fragment
+    ends with an operator which is applied to the whole expression, such as ``"2 * " + "(x + 1)"``.
+    ``None`` is returned if the new expression can't be parsed.
+
+    Parameters
+    ----------
+    parsed: :class:`~typing.Optional[~cake.parsing.cache.ParsedExpression]`
+        The parsed form of ``expression``, ``None`` if it isn't known
+    expression: :class:`str`
+        The current expression
+    fragment: :class:`str`
+        The text being added to the start
+    """
+    text, offset, safe = _join(fragment, expression)
+
+    if safe and parsed is not None and parsed.tree is not None:
+        try:
+            tokens = tokenize(text[:offset])
+            op = tokens[-2] if len(tokens) > 2 else tokens[0]
+            precedence, right_associative = _precedence(op)
+
+            left = tokens[:-2] + [Token(END, "", op.index)]
+            right = _shift(parsed.tokens, offset)
+
+            if (
+                len(tokens) > 2
+                and precedence >= 0
+                and _operand(left, precedence, right_associative, True)
+                and _operand(right, precedence, right_associative, False)
+            ):
+                return _graft(text, op, left, right, parsed.tree, False)
+        except errors.SubstitutionError:
+            pass
+
+    return _parse(fragment + expression)
+
+
+def wrap(
+    parsed: typing.Optional[ParsedExpression], expression: str, fragment: str
+) -> typing.Optional[ParsedExpression]:
+    """
+    Returns the parsed form of ``(expression) + fragment``, as used by :meth:`cake.Expression.wrap_all`.
+    The brackets make the old expression a single operand, so only the fragment decides if its tree can be reused.
+
+    Parameters
+    ----------
+    parsed: :class:`~typing.Optional[~cake.parsing.cache.ParsedExpression]`
+        The parsed form of ``expression``, ``None`` if it isn't known
+    expression: :class:`str`
+        The current expression
+    fragment: :class:`str`
+        The text being added after the brackets
+    """
+    wrapped = f"({expression})"
+
+    if parsed is not None and parsed.tree is not None:
+        inner = parsed.tokens[:-1]
+
+        if [token.kind for token in inner] == [NUMBER, OPERATOR, IMAGINARY] and inner[1].value == "+":
+            # `(1 + 2j)` is parsed as a single complex number
+            parsed = None
+        elif normalize(wrapped) != f"({normalize(expression)})":
+            # Whitespace inside the brackets, so the old tokens can't be reused as they are
+            parsed = None
+        else:
+            end = len(normalize(wrapped))
+            parsed = ParsedExpression(
+                [Token(OPEN, "(", 0), *_shift(inner, 1), Token(CLOSE, ")", end - 1), Token(END, "", end)],
+                parsed.tree,
+            )
+
+    return _append(parsed, wrapped, fragment, absorbs=ATOM)
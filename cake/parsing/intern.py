@@ -0,0 +1,128 @@
+"""
+A process wide table of tree nodes, so structurally equal subtrees are stored once (hash consing).
+
+Every tree parsed through :data:`~cake.parsing.cache.PARSE_CACHE` is interned,
+so ``sin(x)`` in two different expressions is the same object, comparing them is an identity check,
+and values cached for a subtree are found no matter which expression it came from.
+"""
+import threading
+import typing
+import weakref
+
+from .tree import Node
+
+__all__ = ("InternInfo", "InternTable", "INTERN_TABLE")
+
+
+class InternInfo(typing.NamedTuple):
+    """
+    Statistics for an :class:`InternTable`
+    """
+
+    hits: int
+    misses: int
+    currsize: int
+
+
+class InternTable(object):
+    """
+    A thread safe table mapping the structure of a node to the one node with that structure.
+    Nodes are only held weakly, so they are removed once no tree uses them.
+
+    .. code-block:: py
+
+        >>> from cake.parsing.intern import INTERN_TABLE
+        >>> from cake.parsing.parser import parse
+        >>> first = INTERN_TABLE.intern(parse("sin(x) + 1"))
+        >>> second = INTERN_TABLE.intern(parse("2 * sin(x)"))
+        >>> first.left is second.right
+        True
+    """
+
+    __slots__ = ("_nodes", "_lock", "_generation", "hits", "misses")
+
+    def __init__(self) -> None:
+        self._nodes: typing.MutableMapping[tuple, Node] = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self._generation = object()
+        # Stored on every node in the table, so interned subtrees are recognised without looking them up
+
+        self.hits = 0
+        self.misses = 0
+
+    def intern(self, tree: Node) -> Node:
+        """
+        Returns an equal tree, where every subtree which is already in the table is replaced by the node in the table.
+        Subtrees which aren't in the table are added to it.
+
+        Subtrees which were interned before aren't visited again, so joining interned trees only costs the new nodes.
+
+        Parameters
+        ----------
+        tree: :class:`~cake.parsing.tree.Node`
+            The tree to intern, it isn't modified
+        """
+        with self._lock:
+            nodes = self._nodes
+            generation = self._generation
+            interned = dict()
+            order = list()
+            stack = [tree]
+
+            # Collect the nodes which need interning, parents before their children
+            while stack:
+                node = stack.pop()
+
+                if getattr(node, "_interned", None) is generation:
+                    interned[id(node)] = node
+                else:
+                    order.append(node)
+                    stack.extend(node.children)
+
+            for node in reversed(order):
+                if id(node) in interned:
+                    # Shared by more than one parent
+                    continue
+
+                children = node.children
+
+                if children:
+                    children = tuple([interned[id(child)] for child in children])
+
+                # Children are interned before their parents, so they can be told apart by identity
+                key = (type(node), node.signature(), tuple(map(id, children)))
+                existing = nodes.get(key)
+
+                if existing is None:
+                    self.misses += 1
+                    existing = node.with_children(children)
+                    existing._interned = generation
+                    nodes[key] = existing
+                else:
+                    self.hits += 1
+
+                interned[id(node)] = existing
+
+            return interned[id(tree)]
+
+    def info(self) -> InternInfo:
+        """ Returns how many nodes were shared, added, and are in the table """
+        with self._lock:
+            return InternInfo(self.hits, self.misses, len(self._nodes))
+
+    def clear(self) -> None:
+        """ Removes every node from the table and resets the counters, trees which were already interned are unaffected """
+        with self._lock:
+            self._nodes.clear()
+            self._generation = object()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __repr__(self) -> str:
+        return f"InternTable(currsize={len(self._nodes)})"
+
+
+INTERN_TABLE = InternTable()
+# Used by `PARSE_CACHE`, so every parsed tree shares its subtrees with every other
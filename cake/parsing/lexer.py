@@ -0,0 +1,272 @@
+"""
+A single pass lexer for cake's expression grammar.
+
+Every character is looked at a constant number of times, so lexing is linear in the length of the expression.
+"""
+import typing
+
+from cake import abc, errors
+
+__all__ = (
+    "Token",
+    "tokenize",
+    "match_brackets",
+    "NUMBER",
+    "IMAGINARY",
+    "NAME",
+    "OPERATOR",
+    "OPEN",
+    "CLOSE",
+    "PLUS_MINUS",
+    "POSTFIX",
+    "END",
+)
+
+# Token kinds
+NUMBER = "NUMBER"
+IMAGINARY = "IMAGINARY"
+NAME = "NAME"
+OPERATOR = "OPERATOR"
+OPEN = "OPEN"
+CLOSE = "CLOSE"
+PLUS_MINUS = "PLUS_MINUS"
+POSTFIX = "POSTFIX"
+END = "END"
+
+OPERATOR_CHARS = {"+", "-", "*", "/", "^", "&", "|", "<", ">", "%"}
+PLUS_MINUS_FORMS = {"+|-)", "-|+)"}
+POSTFIX_CHARS = {"!"}
+WHITESPACE = {" ", "\t", "\n", "\r"}
+LETTERS = set(abc.ASCII_CHARS)
+DIGITS = set("0123456789")
+
+MULTI_WORD_OPERATORS: typing.Mapping[str, typing.List[typing.Tuple[str, ...]]] = dict()
+# Maps the first word of an operator such as "to the power of" to every operator starting with that word
+
+for _name in abc.MAP_OPERATORS:
+    _words = tuple(_name.split(" "))
+
+    if len(_words) > 1:
+        MULTI_WORD_OPERATORS.setdefault(_words[0], []).append(_words)
+
+for _options in MULTI_WORD_OPERATORS.values():
+    # Try the longest operators first
+    _options.sort(key=len, reverse=True)
+
+
+class Token(typing.NamedTuple):
+    """
+    A token produced by the lexer
+
+    Parameters
+    ----------
+    kind: :class:`str`
+        The kind of token, e.g. ``NUMBER`` or ``OPERATOR``
+    value: :class:`str`
+        The text of the token, operators written as words are stored as their symbol
+    index: :class:`int`
+        Where the token starts in the expression
+    """
+
+    kind: str
+    value: str
+    index: int
+
+
+def _operator(op: str, index: int) -> Token:
+    if op not in abc.OPERATORS:
+        raise errors.SubstitutionError(f"Unknown Operator: {op}")
+    return Token(OPERATOR, op, index)
+
+
+def _skip_whitespace(expression: str, index: int) -> int:
+    while index < len(expression) and expression[index] in WHITESPACE:
+        index += 1
+    return index
+
+
+def _read_word(expression: str, index: int) -> int:
+    while index < len(expression) and expression[index] in LETTERS:
+        index += 1
+    return index
+
+
+def _match_words(expression: str, index: int, words: typing.Tuple[str, ...]) -> int:
+    # Returns the index after the words if they follow `index`, else -1
+    for word in words:
+        index = _skip_whitespace(expression, index)
+        end = _read_word(expression, index)
+
+        if expression[index:end] != word:
+            return -1
+        index = end
+    return index
+
+
+def _read_number(expression: str, index: int) -> typing.Tuple[str, int]:
+    start = index
+    length = len(expression)
+
+    while index < length and (expression[index] in DIGITS or expression[index] == "_"):
+        index += 1
+
+    if index < length and expression[index] == ".":
+        index += 1
+        while index < length and expression[index] in DIGITS:
+            index += 1
+
+    # Exponents are only read when digits follow, so `2e` is still `2 * e`
+    if index < length and expression[index] == "e":
+        end = index + 1
+
+        if end < length and expression[end] in "+-":
+            end += 1
+        if end < length and expression[end] in DIGITS:
+            index = end
+            while index < length and expression[index] in DIGITS:
+                index += 1
+
+    if index < length and expression[index] == "j":
+        return IMAGINARY, index + 1
+    return NUMBER, index
+
+
+def tokenize(expression: str) -> typing.List[Token]:
+    """
+    Split an expression into tokens, the last token is always ``END``
+
+    .. code-block:: py
+
+        >>> from cake.parsing.lexer import tokenize
+        >>> tokenize("2x (+|-) 1")
+        [Token(kind='NUMBER', value='2', index=0), Token(kind='NAME', value='x', index=1), ...]
+
+    Parameters
+    ----------
+    expression: :class:`str`
+        The expression to tokenize, it should already be lowercased
+    """
+    tokens = list()
+    index = 0
+    length = len(expression)
+
+    while True:
+        index = _skip_whitespace(expression, index)
+
+        if index >= length:
+            break
+
+        char = expression[index]
+        start = index
+
+        if char in DIGITS or (char == "." and expression[index + 1 : index + 2] in DIGITS):
+            kind, index = _read_number(expression, index)
+
+            if index < length and expression[index] in DIGITS:
+                raise errors.SubstitutionError(f"Invalid number at index {start}")
+
+            tokens.append(Token(kind, expression[start:index], start))
+
+        elif char in LETTERS:
+            index = _read_word(expression, index)
+            word = expression[start:index]
+
+            if index < length and expression[index] in DIGITS:
+                _, end = _read_number(expression, index)
+
+                raise errors.SubstitutionError(
+                    f'String `{word}{expression[index:end]}`, followed by integer. Perhaps you ment "{word} {expression[index:end]}"'
+                )
+
+            for words in MULTI_WORD_OPERATORS.get(word, ()):
+                end = _match_words(expression, index, words[1:])
+
+                if end != -1:
+                    tokens.append(_operator(abc.MAP_OPERATORS[" ".join(words)], start))
+                    index = end
+                    break
+            else:
+                if word in abc.MAP_OPERATORS:
+                    tokens.append(_operator(abc.MAP_OPERATORS[word], start))
+                else:
+                    tokens.append(Token(NAME, word, start))
+
+        elif char == "(":
+            after = _skip_whitespace(expression, index + 1)
+            form = ""
+
+            # Collect up to 4 characters, ignoring whitespace, to check for `(+|-)`
+            while after < length and len(form) < 4:
+                form += expression[after]
+                after = _skip_whitespace(expression, after + 1)
+
+            if form in PLUS_MINUS_FORMS:
+                tokens.append(Token(PLUS_MINUS, "+-", start))
+                index = after
+            else:
+                tokens.append(Token(OPEN, char, start))
+                index += 1
+
+        elif char == ")":
+            tokens.append(Token(CLOSE, char, start))
+            index += 1
+
+        elif char in POSTFIX_CHARS:
+            tokens.append(Token(POSTFIX, char, start))
+            index += 1
+
+        elif char in OPERATOR_CHARS:
+            pair = expression[index : index + 2]
+
+            if pair in abc.OPERATORS:
+                index += 2
+                op = pair
+            else:
+                index += 1
+                op = char
+
+            tokens.append(_operator(op, start))
+
+        else:
+            raise errors.SubstitutionError(f"Unknown Token ({char}) at index {start}")
+
+    tokens.append(Token(END, "", length))
+    return tokens
+
+
+def match_brackets(tokens: typing.List[Token]) -> typing.List[int]:
+    """
+    Pair up every bracket in a single pass.
+    Returns the position of the matching bracket for each token, or ``-1`` for tokens which aren't brackets.
+
+    .. code-block:: py
+
+        >>> from cake.parsing.lexer import tokenize, match_brackets
+        >>> match_brackets(tokenize("(x + 1)!"))
+        [4, -1, -1, -1, 0, -1, -1]
+
+    Parameters
+    ----------
+    tokens: :class:`~typing.List[Token]`
+        Tokens from :func:`tokenize`
+    """
+    matches = [-1] * len(tokens)
+    opened = list()
+
+    for position, token in enumerate(tokens):
+        if token.kind == OPEN:
+            opened.append(position)
+
+        elif token.kind == CLOSE:
+            if not opened:
+                raise errors.SubstitutionError(f"Unexpected `)` at index {token.index}")
+
+            start = opened.pop()
+            matches[start] = position
+            matches[position] = start
+
+    if opened:
+        raise errors.SubstitutionError(
+            f"{len(opened)} Unclosed brackets, opened at index {tokens[opened[-1]].index}"
+        )
+    return matches
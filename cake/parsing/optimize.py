@@ -0,0 +1,293 @@
+"""
+Optimization passes which run over a parsed tree before code is generated for it.
+
+- Constant folding evaluates subtrees which only contain literals, such as ``2 * pi``, once instead of every time.
+- Common subexpression elimination evaluates repeated subtrees, such as ``sin(x)``, once and stores them in temporaries.
+"""
+import operator
+import typing
+
+from ..core.number import Number
+
+from .tree import (
+    Node,
+    Literal,
+    Variable,
+    UnaryOp,
+    BinaryOp,
+    PlusMinus,
+    Call,
+    Temporary,
+    transform,
+)
+
+__all__ = (
+    "OptimizedTree",
+    "fold_constants",
+    "eliminate_common_subexpressions",
+    "optimize",
+    "node_count",
+)
+
+BINARY_OPERATORS: typing.Mapping[str, typing.Callable] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "//": operator.floordiv,
+    "%": operator.mod,
+    "**": operator.pow,
+    "&": operator.and_,
+    "|": operator.or_,
+    "^": operator.xor,
+    "<<": operator.lshift,
+    ">>": operator.rshift,
+}
+UNARY_OPERATORS: typing.Mapping[str, typing.Callable] = {
+    "+": operator.pos,
+    "-": operator.neg,
+}
+# Applied to cake's objects, exactly like the generated code would
+
+
+def node_count(tree: Node) -> int:
+    """ Returns the number of nodes in a tree """
+    return sum(1 for _ in tree.walk())
+
+
+def _signature(node: Node) -> typing.Any:
+    if isinstance(node, PlusMinus):
+        # Every `(+|-)` has its own sign, so they are never equal
+        return id(node)
+    return node.signature()
+
+
+def _structure(tree: Node) -> typing.Dict[int, int]:
+    # Numbers each node so that nodes with the same structure share a number
+    numbers = dict()
+    table = dict()
+
+    # Children come after their parents in `walk`, so this visits them first
+    for node in reversed(list(tree.walk())):
+        key = (
+            type(node),
+            _signature(node),
+            tuple(numbers[id(child)] for child in node.children),
+        )
+        numbers[id(node)] = table.setdefault(key, len(table))
+
+    return numbers
+
+
+def fold_constants(tree: Node) -> typing.Tuple[Node, int]:
+    """
+    Evaluate every subtree which only contains literals, including constants such as ``pi``.
+    Returns the new tree, and how many operations were folded.
+
+    Subtrees which raise an error, such as ``1 / 0``, are left alone so the error is raised when the expression is evaluated.
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The tree to fold
+    """
+    folded = 0
+
+    def fold(node: Node, children: tuple) -> Node:
+        nonlocal folded
+        node = node.with_children(children)
+
+        if isinstance(node, (Literal, PlusMinus)) or not children:
+            return node
+
+        if not all(isinstance(child, Literal) for child in children):
+            return node
+
+        values = [child.value for child in children]
+
+        try:
+            if isinstance(node, BinaryOp):
+                value = BINARY_OPERATORS[node.op](*values)
+            elif isinstance(node, UnaryOp):
+                value = UNARY_OPERATORS[node.op](*values)
+            elif isinstance(node, Call):
+                value = node.function(*values)()
+            else:
+                return node
+        except Exception:
+            return node
+
+        if not isinstance(value, Number):
+            return node
+
+        folded += 1
+        return Literal(value)
+
+    return transform(tree, fold), folded
+
+
+def eliminate_common_subexpressions(
+    tree: Node, prefix: str = "_t"
+) -> typing.Tuple[Node, typing.List[typing.Tuple[str, Node]]]:
+    """
+    Replace subtrees which appear more than once with a :class:`~cake.parsing.tree.Temporary`.
+    Returns the new tree, and a list of ``(name, tree)`` for each temporary.
+    Temporaries may use temporaries which come before them in the list.
+
+    Subtrees containing ``(+|-)`` are left alone, as each one depends on its own sign.
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The tree to search
+    prefix: :class:`str`
+        The prefix of the temporaries names
+    """
+    numbers = _structure(tree)
+    counts = dict()
+    signed = set()
+
+    for node in reversed(list(tree.walk())):
+        counts[numbers[id(node)]] = counts.get(numbers[id(node)], 0) + 1
+
+        if isinstance(node, PlusMinus) or any(id(child) in signed for child in node.children):
+            signed.add(id(node))
+
+    names = dict()
+    definitions = dict()
+
+    def hoist(node: Node, children: tuple) -> Node:
+        number = numbers[id(node)]
+        rebuilt = node.with_children(children)
+
+        if (
+            counts[number] < 2
+            or id(node) in signed
+            or isinstance(node, (Literal, Variable, Temporary))
+        ):
+            return rebuilt
+
+        if number not in names:
+            names[number] = f"{prefix}{len(names)}"
+            definitions[names[number]] = rebuilt
+        return Temporary(names[number])
+
+    tree = transform(tree, hoist)
+
+    # Nested repeats create temporaries which are only used once, e.g. `sin(x)` in `2 * sin(x) + 2 * sin(x)`
+    uses = dict.fromkeys(definitions, 0)
+
+    for root in (tree, *definitions.values()):
+        for node in root.walk():
+            if isinstance(node, Temporary):
+                uses[node.name] += 1
+
+    renamed = {
+        name: f"{prefix}{index}"
+        for index, name in enumerate(name for name in definitions if uses[name] > 1)
+    }
+    inlined = dict()
+
+    def inline(node: Node, children: tuple) -> Node:
+        if isinstance(node, Temporary):
+            if node.name in inlined:
+                return inlined[node.name]
+            return Temporary(renamed[node.name])
+        return node.with_children(children)
+
+    temporaries = list()
+
+    # Definitions only use temporaries created before them
+    for name, definition in definitions.items():
+        definition = transform(definition, inline)
+
+        if name in renamed:
+            temporaries.append((renamed[name], definition))
+        else:
+            inlined[name] = definition
+
+    return transform(tree, inline), temporaries
+
+
+class OptimizedTree(object):
+    """
+    The result of :func:`optimize`
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The optimized tree, which may use temporaries
+    temporaries: :class:`~typing.List[~typing.Tuple[str, ~cake.parsing.tree.Node]]`
+        The name and tree of each temporary, in the order they need to be evaluated
+    folded: :class:`int`
+        How many operations were evaluated by constant folding
+    original_nodes: :class:`int`
+        How many nodes were in the tree before it was optimized
+    """
+
+    __slots__ = ("tree", "temporaries", "folded", "original_nodes")
+
+    def __init__(
+        self,
+        tree: Node,
+        temporaries: typing.List[typing.Tuple[str, Node]],
+        folded: int,
+        original_nodes: int,
+    ) -> None:
+        self.tree = tree
+        self.temporaries = temporaries
+        self.folded = folded
+        self.original_nodes = original_nodes
+
+    @property
+    def nodes(self) -> int:
+        """ The number of nodes left, including the trees of the temporaries """
+        return node_count(self.tree) + sum(node_count(tree) for _, tree in self.temporaries)
+
+    def dump(self) -> str:
+        """
+        Returns the optimized form as text, with a line for each temporary followed by the result.
+
+        .. code-block:: py
+
+            >>> from cake.parsing.optimize import optimize
+            >>> from cake.parsing.parser import parse
+            >>> print(optimize(parse("sin(x) ** 2 + 2 * pi * sin(x)")).dump())
+            # folded 1 constant operation(s), hoisted 1 repeated subexpression(s)
+            # 11 nodes -> 9 nodes
+            _t0 = sin(x)
+            _t0 ** 2 + 6.283185307179586 * _t0
+        """
+        lines = [
+            f"# folded {self.folded} constant operation(s), hoisted {len(self.temporaries)} repeated subexpression(s)",
+            f"# {self.original_nodes} nodes -> {self.nodes} nodes",
+        ]
+        lines.extend(f"{name} = {tree}" for name, tree in self.temporaries)
+        lines.append(str(self.tree))
+
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return f"OptimizedTree(temporaries={len(self.temporaries)}, folded={self.folded})"
+
+
+def optimize(tree: Node, fold: bool = True) -> OptimizedTree:
+    """
+    Fold constants and then hoist repeated subexpressions
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The tree to optimize, it isn't modified
+    fold: :class:`bool`
+        Whether to fold constants, constants are folded using cake's objects.
+        Defaults to ``True``.
+    """
+    original_nodes = node_count(tree)
+    folded = 0
+
+    if fold:
+        tree, folded = fold_constants(tree)
+    optimized, temporaries = eliminate_common_subexpressions(tree)
+
+    return OptimizedTree(optimized, temporaries, folded, original_nodes)
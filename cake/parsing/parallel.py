@@ -0,0 +1,119 @@
+"""
+Evaluating compiled expressions across multiple processes.
+"""
+import collections
+import itertools
+import os
+import typing
+from concurrent.futures import ProcessPoolExecutor
+
+from .compiled import CompiledExpression
+
+__all__ = ("substitute_parallel", "map_chunks")
+
+_WORKER_STATE: typing.Optional[tuple] = None
+# The compiled expression and default values, set once in every worker process
+
+
+def _initialise(compiled: CompiledExpression, default_args: tuple, default_kwargs: dict) -> None:
+    global _WORKER_STATE
+    _WORKER_STATE = (compiled, default_args, default_kwargs)
+
+
+def _evaluate_chunk(rows: list) -> list:
+    compiled, default_args, default_kwargs = _WORKER_STATE
+    results = list()
+
+    for row in rows:
+        if isinstance(row, dict):
+            mapping = compiled.map_arguments(tuple(), row, default_args, default_kwargs)
+        else:
+            mapping = compiled.map_arguments(row, {}, default_args, default_kwargs)
+
+        results.append(compiled.evaluate(mapping))
+    return results
+
+
+def _chunks(rows: typing.Iterable, chunksize: int) -> typing.Iterator[list]:
+    rows = iter(rows)
+
+    while True:
+        chunk = [
+            dict(row) if isinstance(row, typing.Mapping) else tuple(row)
+            for row in itertools.islice(rows, chunksize)
+        ]
+        if not chunk:
+            return
+        yield chunk
+
+
+def substitute_parallel(
+    compiled: CompiledExpression,
+    rows: typing.Iterable,
+    *,
+    workers: typing.Optional[int] = None,
+    chunksize: int = 1000,
+    default_args: typing.Sequence = tuple(),
+    default_kwargs: typing.Optional[typing.Mapping[str, typing.Any]] = None,
+) -> typing.Iterator:
+    """
+    Evaluate a compiled expression for every row, using a pool of processes.
+    Only a few chunks are queued per process at a time, so the rows are consumed lazily.
+
+    Parameters
+    ----------
+    compiled: :class:`~cake.parsing.CompiledExpression`
+        The expression to evaluate, this is sent to each process once
+    rows: :class:`~typing.Iterable`
+        An iterable of mappings or sequences of values
+    workers: :class:`int`
+        The number of processes to use, defaults to the number of CPUs
+    chunksize: :class:`int`
+        The number of rows sent to a process at a time
+    default_args, default_kwargs:
+        Values used for any unknowns which a row doesn't provide
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+
+    initargs = (compiled, tuple(default_args), dict(default_kwargs or {}))
+
+    return map_chunks(_evaluate_chunk, _chunks(rows, chunksize), workers=workers, initializer=_initialise, initargs=initargs)
+
+
+def map_chunks(
+    function: typing.Callable[[list], list],
+    chunks: typing.Iterable[list],
+    *,
+    workers: typing.Optional[int] = None,
+    initializer: typing.Optional[typing.Callable] = None,
+    initargs: tuple = tuple(),
+) -> typing.Iterator:
+    """
+    Call ``function`` on every chunk using a pool of processes, yielding the items of each result in order.
+    Only a few chunks are queued per process at a time, so ``chunks`` is consumed lazily and memory use stays constant.
+
+    Parameters
+    ----------
+    function: :class:`~typing.Callable[[list], list]`
+        A function defined at the top level of a module, so it can be sent to other processes
+    chunks: :class:`~typing.Iterable[list]`
+        The chunks to call ``function`` with
+    workers: :class:`int`
+        The number of processes to use, defaults to the number of CPUs
+    initializer, initargs:
+        Called once in every process before any chunks, see :class:`concurrent.futures.ProcessPoolExecutor`
+    """
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(workers, initializer=initializer, initargs=initargs) as executor:
+        pending = collections.deque()
+
+        for chunk in chunks:
+            pending.append(executor.submit(function, chunk))
+
+            if len(pending) > (workers * 2):
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
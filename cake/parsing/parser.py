@@ -0,0 +1,315 @@
+"""
+A precedence (Pratt) parser which turns the tokens from :mod:`cake.parsing.lexer` into a tree.
+
+The parser never goes back over tokens it has already read, so parsing is linear in the number of tokens,
+and it keeps its own stack instead of recursing, so how deeply an expression is nested isn't limited.
+"""
+import typing
+
+from cake import errors
+from cake.helpers import convert_type
+from . import pABC
+from .lexer import (
+    Token,
+    tokenize,
+    match_brackets,
+    NUMBER,
+    IMAGINARY,
+    NAME,
+    OPERATOR,
+    OPEN,
+    PLUS_MINUS,
+    POSTFIX,
+    END,
+)
+from .tree import (
+    Node,
+    Literal,
+    Variable,
+    UnaryOp,
+    BinaryOp,
+    PlusMinus,
+    Call,
+    BINARY_PRECEDENCE,
+    UNARY_PRECEDENCE,
+    RIGHT_ASSOCIATIVE,
+)
+
+from ..core.types.complex import Complex
+from ..core.types.irrational import Irrational
+
+__all__ = ("Parser", "parse")
+
+CALL_PRECEDENCE = 9
+# Functions without brackets, e.g. `sqrt 4`, only take the next operand
+
+POSTFIX_PRECEDENCE = 10
+# Binds tighter than anything, `x ** 2!` is `x ** (2!)`
+
+IMPLIED_MULTIPLICATION = {NUMBER, IMAGINARY, NAME, OPEN}
+# Tokens which start a new operand, if they directly follow another operand they are multiplied
+
+GROUP = "group"
+# Marks a bracket waiting to be closed, on the parser's stack of pending operators
+
+
+def _number(text: str) -> typing.Any:
+    if "." in text or "e" in text:
+        return convert_type(float(text))
+    return convert_type(int(text))
+
+
+class Parser(object):
+    """
+    Parses a list of tokens into a tree
+
+    Parameters
+    ----------
+    tokens: :class:`~typing.List[~cake.parsing.lexer.Token]`
+        Tokens from :func:`cake.parsing.lexer.tokenize`, ending with an ``END`` token
+    """
+
+    __slots__ = ("tokens", "brackets", "position")
+
+    def __init__(self, tokens: typing.List[Token]) -> None:
+        self.tokens = tokens
+        self.brackets = match_brackets(tokens)
+        # Unbalanced brackets are reported before parsing starts,
+        # and groups can look up where they end without scanning for it
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> Token:
+        position = min(self.position + offset, len(self.tokens) - 1)
+        return self.tokens[position]
+
+    def advance(self) -> Token:
+        token = self.tokens[self.position]
+
+        if token.kind != END:
+            self.position += 1
+        return token
+
+    def parse(self) -> Node:
+        tree = self.expression(0)
+        token = self.peek()
+
+        if token.kind != END:
+            raise errors.SubstitutionError(
+                f"Unexpected token ({token.value}) at index {token.index}"
+            )
+        return tree
+
+    def expression(self, min_precedence: int) -> Node:
+        """
+        Parse an expression, stopping at the first operator which binds looser than ``min_precedence``.
+
+        Operators waiting for their right operand, unary operators, functions and brackets are kept on a stack
+        instead of recursing, so deeply nested expressions such as ``sin(sin(sin(...)))`` or ``x ** x ** x ...``
+        aren't limited by python's recursion limit.
+        """
+        pending = list()
+        # `(kind, value, left, min_precedence)`, the precedence is restored once the operand is complete
+        left = None
+
+        while True:
+            if left is None:
+                # The start of an operand
+                token = self.advance()
+                kind = token.kind
+
+                if kind == OPERATOR and token.value in ("+", "-"):
+                    pending.append((UnaryOp, token.value, None, min_precedence))
+                    min_precedence = UNARY_PRECEDENCE
+
+                elif kind == PLUS_MINUS:
+                    pending.append((PlusMinus, None, None, min_precedence))
+                    min_precedence = UNARY_PRECEDENCE
+
+                elif kind == OPEN:
+                    left = self.complex()
+
+                    if left is None:
+                        pending.append((GROUP, (token, self.brackets[self.position - 1], None), None, min_precedence))
+                        min_precedence = 0
+
+                elif kind == NAME and token.value in pABC.KEYWORDS:
+                    function = pABC.KEYWORDS[token.value]
+                    following = self.peek()
+
+                    if following.kind == END:
+                        raise errors.SubstitutionError(f"{token.value} Called with no parameters")
+
+                    if following.kind == OPEN:
+                        opened = self.advance()
+                        left = self.complex()
+
+                        if left is not None:
+                            left = Call(function, left)
+                        else:
+                            pending.append((GROUP, (opened, self.brackets[self.position - 1], function), None, min_precedence))
+                            min_precedence = 0
+                    else:
+                        pending.append((Call, function, None, min_precedence))
+                        min_precedence = CALL_PRECEDENCE
+
+                else:
+                    left = self.prefix(token)
+                continue
+
+            token = self.peek()
+            kind = token.kind
+
+            if kind == OPERATOR and BINARY_PRECEDENCE[token.value] >= min_precedence:
+                self.advance()
+                pending.append((BinaryOp, token.value, left, min_precedence))
+
+                min_precedence = BINARY_PRECEDENCE[token.value]
+                if token.value not in RIGHT_ASSOCIATIVE:
+                    min_precedence += 1
+                left = None
+
+            elif kind == PLUS_MINUS and BINARY_PRECEDENCE["+-"] >= min_precedence:
+                self.advance()
+                pending.append((PlusMinus, None, left, min_precedence))
+
+                min_precedence = BINARY_PRECEDENCE["+-"] + 1
+                left = None
+
+            elif kind == POSTFIX and POSTFIX_PRECEDENCE >= min_precedence:
+                self.advance()
+                left = Call(pABC.SYMBOL_KW[token.value], left)
+
+            elif kind in IMPLIED_MULTIPLICATION and BINARY_PRECEDENCE["*"] >= min_precedence:
+                # `4(a)(c)` or `x y`
+                pending.append((BinaryOp, "*", left, min_precedence))
+
+                min_precedence = BINARY_PRECEDENCE["*"] + 1
+                left = None
+
+            elif pending:
+                # The operand is complete, so it's given to whatever was waiting for it
+                kind, value, operand, min_precedence = pending.pop()
+                left = self.reduce(kind, value, operand, left)
+
+            else:
+                return left
+
+    def reduce(self, kind: typing.Any, value: typing.Any, operand: typing.Optional[Node], tree: Node) -> Node:
+        # Builds the node for an entry from `pending`, now that the tree it was waiting for is complete
+        if kind is BinaryOp:
+            return BinaryOp(value, operand, tree)
+
+        if kind is PlusMinus:
+            return PlusMinus(operand, tree)
+
+        if kind is UnaryOp:
+            return UnaryOp(value, tree)
+
+        if kind is Call:
+            return Call(value, tree)
+
+        # A bracket, `function` is set when the bracket holds a function's argument
+        token, closing, function = value
+
+        if self.position != closing:
+            unexpected = self.peek()
+            raise errors.SubstitutionError(
+                f"Unexpected token ({unexpected.value}) at index {unexpected.index}, "
+                f"expected `)` to close the bracket opened at index {token.index}"
+            )
+
+        self.advance()
+        return tree if function is None else Call(function, tree)
+
+    def prefix(self, token: Token) -> Node:
+        # Operands which don't contain another expression
+        kind = token.kind
+
+        if kind == NUMBER:
+            number = Literal(_number(token.value))
+
+            if self.peek().kind == NAME:
+                # A coefficient, `3x` is treated as `(3 * x)`
+                name = self.peek()
+
+                if name.value in pABC.KEYWORDS:
+                    raise errors.SubstitutionError(
+                        f'Invalid use of function "{pABC.KEYWORDS[name.value].__qualname__}" at index {name.index}. '
+                        f'Perhaps you ment "{token.value} * {name.value}"'
+                    )
+
+                return BinaryOp("*", number, self.name(self.advance()))
+            return number
+
+        if kind == IMAGINARY:
+            return Literal(convert_type(complex(token.value)))
+
+        if kind == NAME:
+            return self.name(token)
+
+        if kind == END:
+            raise errors.SubstitutionError("Unexpected end of expression")
+
+        if kind == POSTFIX:
+            raise errors.SubstitutionError(
+                f"{pABC.SYMBOL_KW[token.value].__qualname__} called without a value, at index {token.index}"
+            )
+
+        raise errors.SubstitutionError(f"Unexpected token ({token.value}) at index {token.index}")
+
+    def complex(self) -> typing.Optional[Node]:
+        # Complexes written as `(a + bj)`, called after reading the opening bracket
+        opened = self.position - 1
+        closing = self.brackets[opened]
+
+        if closing - opened == 4:
+            first, op, second = self.tokens[opened + 1 : closing]
+
+            if (
+                first.kind == NUMBER
+                and op.kind == OPERATOR
+                and op.value == "+"
+                and second.kind == IMAGINARY
+            ):
+                self.position = closing + 1
+                return Literal(Complex(raw=f"({first.value}+{second.value})"))
+
+        return None
+
+    def name(self, token: Token) -> Node:
+        # Constants and unknowns, functions are handled by `expression`
+        word = token.value
+
+        constant = pABC.CONSTANTS.get(word)
+        if constant is not None:
+            return Literal(Irrational(constant))
+
+        # `xy` -> `x * y`
+        tree = Variable(word[0])
+
+        for letter in word[1:]:
+            tree = BinaryOp("*", tree, Variable(letter))
+        return tree
+
+
+def parse(expression: str) -> Node:
+    """
+    Parse an expression into a tree
+
+    .. code-block:: py
+
+        >>> from cake.parsing.parser import parse
+        >>> parse("2x (+|-) sqrt(y)")
+        PlusMinus(2 * x (+|-) sqrt(y))
+
+    Parameters
+    ----------
+    expression: :class:`str`
+        The expression to parse
+    """
+    tokens = tokenize(expression.lower())
+
+    if len(tokens) == 1:
+        raise errors.SubstitutionError("Cannot parse an empty expression")
+
+    return Parser(tokens).parse()
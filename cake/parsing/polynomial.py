@@ -0,0 +1,248 @@
+"""
+Detecting polynomial expressions, and evaluating them using horner's scheme.
+
+A polynomial such as ``3 * x ** 3 + 2x - 5`` is stored as its raw coefficients,
+and evaluated as ``(3 * x ** 2 + 2) * x - 5`` which needs fewer multiplications than evaluating each power separately.
+Polynomials of several unknowns are nested, the coefficients of the first unknown are polynomials of the others.
+The generated code only uses ``+``, ``*`` and ``**``, so the same function works on plain numbers and numpy arrays.
+"""
+import typing
+
+from .tree import Node, Literal, Variable, UnaryOp, BinaryOp, transform, variables
+
+__all__ = ("Polynomial", "as_polynomial", "MAX_DEGREE")
+
+MAX_DEGREE = 64
+# Higher powers are evaluated as they are, expanding `(x + 1) ** 1000` would take longer than evaluating it
+
+Terms = typing.Dict[typing.Tuple[int, ...], typing.Union[int, float]]
+# Maps the exponent of each unknown to the coefficient of that term
+
+
+class _NotPolynomial(Exception):
+    pass
+
+
+class Polynomial(object):
+    """
+    A polynomial with raw coefficients, created using :func:`as_polynomial`
+
+    Parameters
+    ----------
+    variables: :class:`~typing.Tuple[str, ...]`
+        The unknowns, in order of appearance
+    terms: :class:`dict`
+        Maps a tuple with the exponent of each unknown to the coefficient of that term
+    """
+
+    __slots__ = ("variables", "terms", "_function")
+
+    def __init__(self, variables: typing.Tuple[str, ...], terms: Terms) -> None:
+        self.variables = tuple(variables)
+        self.terms = dict(terms)
+        self._function = None
+
+    @property
+    def degree(self) -> int:
+        """ The highest total degree of any term """
+        return max(sum(exponents) for exponents in self.terms)
+
+    def horner(self) -> str:
+        """
+        Returns the polynomial in horner form, as python code
+
+        .. code-block:: py
+
+            >>> from cake.parsing.parser import parse
+            >>> from cake.parsing.polynomial import as_polynomial
+            >>> as_polynomial(parse("3 * x ** 3 + 2x - 5")).horner()
+            '(3 * x ** 2 + 2) * x - 5'
+        """
+        return _horner(self.terms, self.variables)
+
+    def function(self) -> typing.Callable:
+        """ Returns a function which evaluates the polynomial, taking each unknown as an argument in order of appearance """
+        if self._function is None:
+            source = f"lambda {', '.join(self.variables)}: {self.horner()}"
+            self._function = eval(compile(source, "<cake>", "eval"), {"__builtins__": {}})
+        return self._function
+
+    def __call__(self, *values: typing.Any) -> typing.Any:
+        return self.function()(*values)
+
+    def __getstate__(self) -> tuple:
+        # The generated function can't be pickled
+        return self.variables, self.terms
+
+    def __setstate__(self, state: tuple) -> None:
+        self.__init__(*state)
+
+    def __repr__(self) -> str:
+        return f"Polynomial({self.horner()})"
+
+
+def _power(name: str, exponent: int) -> str:
+    return name if exponent == 1 else f"{name} ** {exponent}"
+
+
+def _horner(terms: Terms, names: typing.Sequence[str]) -> str:
+    # Horner's scheme for the first unknown, each coefficient is a polynomial of the rest
+    if not names:
+        (coefficient,) = terms.values()
+        return repr(coefficient)
+
+    name, rest = names[0], names[1:]
+    coefficients = dict()
+
+    for exponents, coefficient in terms.items():
+        coefficients.setdefault(exponents[0], dict())[exponents[1:]] = coefficient
+
+    degrees = sorted(coefficients, reverse=True)
+    source = None
+
+    for index, degree in enumerate(degrees):
+        coefficient = _horner(coefficients[degree], rest)
+
+        if source is None:
+            source = coefficient
+        elif coefficient.startswith("-") and _group(coefficient) == coefficient:
+            source = f"{source} - {coefficient[1:]}"
+        else:
+            source = f"{source} + {coefficient}"
+
+        # Multiply by the gap to the next lowest degree, skipping the powers without a term
+        gap = degree - (degrees[index + 1] if index + 1 < len(degrees) else 0)
+
+        if gap:
+            if source in ("1", "-1"):
+                source = source[:-1] + _power(name, gap)
+            else:
+                source = f"{_group(source)} * {_power(name, gap)}"
+
+    return source
+
+
+def _group(source: str) -> str:
+    # Sums are bracketed before being multiplied
+    if " + " in source or " - " in source:
+        return f"({source})"
+    return source
+
+
+def _number(node: Literal) -> typing.Union[int, float]:
+    value = getattr(node.value, "value", node.value)
+
+    if type(value) not in (int, float):
+        # Such as complex numbers
+        raise _NotPolynomial()
+
+    if isinstance(value, float) and value.is_integer():
+        # Integer inputs then stay exact
+        return int(value)
+    return value
+
+
+def _add(first: Terms, second: Terms, sign: int = 1) -> Terms:
+    result = dict(first)
+
+    for exponents, coefficient in second.items():
+        total = result.get(exponents, 0) + sign * coefficient
+
+        if total == 0:
+            result.pop(exponents, None)
+        else:
+            result[exponents] = total
+    return result
+
+
+def _multiply(first: Terms, second: Terms) -> Terms:
+    result = dict()
+
+    for left, a in first.items():
+        for right, b in second.items():
+            exponents = tuple(x + y for x, y in zip(left, right))
+
+            if sum(exponents) > MAX_DEGREE:
+                raise _NotPolynomial()
+            result = _add(result, {exponents: a * b})
+    return result
+
+
+def _constant(terms: Terms, size: int) -> typing.Union[int, float, None]:
+    if not terms:
+        return 0
+    if len(terms) == 1 and (0,) * size in terms:
+        return terms[(0,) * size]
+    return None
+
+
+def as_polynomial(tree: Node) -> typing.Optional[Polynomial]:
+    """
+    Returns a :class:`Polynomial` if the tree is a polynomial with real coefficients, otherwise ``None``.
+    Brackets are expanded, so ``(x + 1) ** 2`` is a polynomial, but ``x ** y``, ``x / y`` and functions such as ``sqrt(x)`` aren't.
+
+    Trees where every unknown cancels out, such as ``x - x``, aren't treated as polynomials,
+    so the result of evaluating one always has the shape of its inputs.
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The tree to check
+    """
+    names = variables(tree)
+
+    if not names:
+        return None
+
+    size = len(names)
+    positions = {name: index for index, name in enumerate(names)}
+    one = (0,) * size
+
+    def convert(node: Node, children: tuple) -> Terms:
+        if isinstance(node, Literal):
+            value = _number(node)
+            return {one: value} if value != 0 else dict()
+
+        if isinstance(node, Variable):
+            exponents = [0] * size
+            exponents[positions[node.name]] = 1
+            return {tuple(exponents): 1}
+
+        if isinstance(node, UnaryOp) and node.op in ("+", "-"):
+            (operand,) = children
+            return operand if node.op == "+" else _add(dict(), operand, -1)
+
+        if isinstance(node, BinaryOp) and node.op in ("+", "-", "*", "/", "**"):
+            left, right = children
+
+            if node.op == "+":
+                return _add(left, right)
+            if node.op == "-":
+                return _add(left, right, -1)
+            if node.op == "*":
+                return _multiply(left, right)
+
+            constant = _constant(right, size)
+
+            if node.op == "/" and constant:
+                return {exponents: coefficient / constant for exponents, coefficient in left.items()}
+
+            if node.op == "**" and constant is not None and constant == int(constant) and 0 <= constant <= MAX_DEGREE:
+                result = {one: 1}
+
+                for _ in range(int(constant)):
+                    result = _multiply(result, left)
+                return result
+
+        raise _NotPolynomial()
+
+    try:
+        terms = transform(tree, convert)
+    except _NotPolynomial:
+        return None
+
+    used = {index for exponents in terms for index, exponent in enumerate(exponents) if exponent}
+
+    if len(used) != size:
+        return None
+    return Polynomial(names, terms)
@@ -0,0 +1,225 @@
+"""
+Timings and call counts for each phase of evaluating an expression, such as tokenizing, generating code and the arithmetic itself.
+
+Profiling is off by default, and each instrumented phase only checks a flag until it's turned on.
+Phases can contain other phases, such as ``compile`` containing ``tokenize``, so their times overlap.
+
+========================= =================================================================================
+Phase                     What is timed
+========================= =================================================================================
+``tokenize``              :func:`~cake.parsing.lexer.tokenize`, when an expression isn't in the parse cache
+``parse``                 Building the tree from the tokens
+``_sub``                  :meth:`cake.Expression._sub`, converting the tree into markers
+``_glSubCode``            :meth:`cake.Expression._glSubCode`, building code from the markers
+``convertToCode``         :meth:`cake.Expression.convertToCode`
+``exec``                  Running the code from ``convertToCode`` using ``execCode``
+``compile``               :meth:`cake.Expression.compile`, including optimizing the tree
+``codegen``               Generating and compiling code for a compiled expression, the first time it's needed
+``evaluate``              :meth:`~cake.parsing.CompiledExpression.evaluate`, the arithmetic of a compiled expression
+``numeric``               :meth:`~cake.parsing.CompiledExpression.evaluate_numeric`, the arithmetic on plain numbers
+========================= =================================================================================
+"""
+import functools
+import threading
+import time
+import typing
+
+__all__ = ("PhaseStats", "Profiler", "PROFILER", "profile")
+
+
+class PhaseStats(typing.NamedTuple):
+    """
+    The statistics for one phase
+    """
+
+    calls: int
+    total: float
+    # In seconds
+
+    @property
+    def mean(self) -> float:
+        """ The average time of a call, in seconds """
+        return self.total / self.calls if self.calls else 0.0
+
+
+class _Disabled(object):
+    # Returned by `Profiler.phase` while profiling is off, so timing a phase costs almost nothing
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_DISABLED = _Disabled()
+
+
+class _Timer(object):
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+
+class Profiler(object):
+    """
+    Collects timings and call counts for each phase, use :data:`PROFILER` instead of creating one.
+
+    .. code-block:: py
+
+        >>> from cake import Expression
+        >>> from cake.parsing.profiling import profile
+        >>> with profile() as profiler:
+        ...     Expression("x ** 2 + sin(y)").substitute(x=2, y=30)
+        >>> profiler.stats()["exec"].calls
+        1
+        >>> print(profiler.report())
+        phase                calls    total (ms)     mean (us)
+        exec                     1         0.656        655.77
+        ...
+
+    Callbacks are called with the name of each phase and how long it took in seconds, as each one finishes.
+    They are called from whichever thread ran the phase.
+    """
+
+    __slots__ = ("enabled", "callbacks", "_stats", "_lock")
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.callbacks: typing.List[typing.Callable[[str, float], typing.Any]] = list()
+        self._stats: typing.Dict[str, typing.List] = dict()
+        self._lock = threading.Lock()
+
+    def phase(self, name: str) -> typing.ContextManager[None]:
+        """
+        Returns a context manager which times a phase, if profiling is enabled
+
+        Parameters
+        ----------
+        name: :class:`str`
+            The name of the phase
+        """
+        if not self.enabled:
+            return _DISABLED
+        return _Timer(self, name)
+
+    def timed(self, name: str) -> typing.Callable[[typing.Callable], typing.Callable]:
+        """
+        A decorator which times every call of a function as a phase
+
+        Parameters
+        ----------
+        name: :class:`str`
+            The name of the phase
+        """
+        def decorator(function: typing.Callable) -> typing.Callable:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+
+                with _Timer(self, name):
+                    return function(*args, **kwargs)
+
+            return wrapper
+        return decorator
+
+    def record(self, name: str, elapsed: float) -> None:
+        """
+        Add a call to a phase, this is called by :meth:`phase` and :meth:`timed`
+
+        Parameters
+        ----------
+        name: :class:`str`
+            The name of the phase
+        elapsed: :class:`float`
+            How long the call took, in seconds
+        """
+        with self._lock:
+            stats = self._stats.setdefault(name, [0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+
+        for callback in tuple(self.callbacks):
+            callback(name, elapsed)
+
+    def stats(self) -> typing.Dict[str, PhaseStats]:
+        """ Returns the statistics for every phase which has been called """
+        with self._lock:
+            return {name: PhaseStats(*stats) for name, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        """ Clears the statistics """
+        with self._lock:
+            self._stats.clear()
+
+    def report(self) -> str:
+        """ Returns the statistics as a table, slowest phases first """
+        stats = sorted(self.stats().items(), key=lambda item: item[1].total, reverse=True)
+        lines = [f"{'phase':<16}{'calls':>10}{'total (ms)':>14}{'mean (us)':>14}"]
+
+        for name, phase in stats:
+            lines.append(f"{name:<16}{phase.calls:>10}{phase.total * 1e3:>14.3f}{phase.mean * 1e6:>14.2f}")
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return f"Profiler(enabled={self.enabled}, phases={len(self._stats)})"
+
+
+PROFILER = Profiler()
+# Used by every instrumented phase
+
+
+class profile(object):
+    """
+    A context manager which enables :data:`PROFILER`, returning it.
+    Statistics are reset on entering unless ``reset`` is ``False``, and are kept after exiting so they can be read.
+
+    .. code-block:: py
+
+        >>> from cake.parsing.profiling import profile
+        >>> def export(phase, seconds):
+        ...     metrics.histogram(f"cake.{phase}", seconds)
+        >>> with profile(export):
+        ...     run_formulas()
+
+    Parameters
+    ----------
+    callback: :class:`~typing.Callable[[str, float], typing.Any]`
+        Called with the name and duration of each phase while profiling, see :class:`Profiler`
+    reset: :class:`bool`
+        Clear the statistics from before, defaults to ``True``
+    """
+
+    __slots__ = ("callback", "reset", "_enabled")
+
+    def __init__(self, callback: typing.Optional[typing.Callable[[str, float], typing.Any]] = None, reset: bool = True) -> None:
+        self.callback = callback
+        self.reset = reset
+
+    def __enter__(self) -> Profiler:
+        if self.reset:
+            PROFILER.reset()
+
+        if self.callback is not None:
+            PROFILER.callbacks.append(self.callback)
+
+        # Restored on exit, so nesting `profile` doesn't turn profiling off early
+        self._enabled = PROFILER.enabled
+        PROFILER.enabled = True
+        return PROFILER
+
+    def __exit__(self, *exc_info) -> None:
+        PROFILER.enabled = self._enabled
+
+        if self.callback is not None:
+            PROFILER.callbacks.remove(self.callback)
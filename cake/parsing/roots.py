@@ -0,0 +1,362 @@
+"""
+Numerically finding the roots of compiled expressions, used by :meth:`cake.Expression.solve`.
+
+Roots are found using newton's method, with the derivative from :func:`~cake.parsing.derivative.derivative`.
+If newton's method doesn't converge, the root is found using brent's method on a bracket where the expression changes sign.
+Both work on plain floats, using functions from :meth:`~cake.parsing.compiled.CompiledExpression.lambdify`,
+so each step costs a single function call.
+"""
+import math
+import typing
+
+from cake import errors
+
+__all__ = ("Solver", "newton", "secant", "brent", "find_bracket", "TOLERANCE", "MAX_ITERATIONS")
+
+TOLERANCE = 1e-12
+# Relative to the size of the root, a root of `1000` is found to within `1e-9`
+
+MAX_ITERATIONS = 100
+DEFAULT_GUESS = 1.0
+# Rather than `0`, which is often where the derivative is undefined, such as `sqrt(x)`
+
+BRACKET_STEPS = 64
+# The bracket doubles in width every step, so roots as far as `2 ** 64` from the guess are found
+
+EVALUATION_ERRORS = (ArithmeticError, ValueError, TypeError)
+# Raised when a function is evaluated outside of its domain, or the result is complex
+
+
+def newton(
+    function: typing.Callable,
+    derivative: typing.Callable,
+    x: float,
+    args: tuple = tuple(),
+    tol: float = TOLERANCE,
+    maxiter: int = MAX_ITERATIONS,
+) -> typing.Optional[float]:
+    """
+    Find a root using newton's method, returns ``None`` if it doesn't converge.
+
+    Parameters
+    ----------
+    function, derivative: :class:`~typing.Callable`
+        The function and its derivative, called as ``function(x, *args)``
+    x: :class:`float`
+        The initial guess
+    args: :class:`tuple`
+        The values of any other arguments
+    tol: :class:`float`
+        Stop once a step is smaller than this, relative to the size of the root
+    maxiter: :class:`int`
+        The maximum number of steps
+    """
+    try:
+        for _ in range(maxiter):
+            fx = function(x, *args)
+
+            if fx == 0:
+                return float(x)
+
+            step = fx / derivative(x, *args)
+            x -= step
+
+            if abs(step) <= tol * (1 + abs(x)):
+                return float(x) if math.isfinite(x) else None
+    except EVALUATION_ERRORS:
+        # Such as a flat derivative, or stepping outside of the domain of `sqrt`
+        pass
+
+    return None
+
+
+def secant(
+    function: typing.Callable,
+    x: float,
+    args: tuple = tuple(),
+    tol: float = TOLERANCE,
+    maxiter: int = MAX_ITERATIONS,
+) -> typing.Optional[float]:
+    """
+    Find a root using the secant method, for functions without a derivative.
+    Takes the same arguments as :func:`newton`, except for the derivative.
+    """
+    previous = x
+    x = x * (1 + 1e-4) + (1e-4 if x >= 0 else -1e-4)
+    small = False
+
+    try:
+        f_previous, fx = function(previous, *args), function(x, *args)
+
+        for _ in range(maxiter):
+            if fx == 0:
+                return float(x)
+
+            step = fx * (x - previous) / (fx - f_previous)
+            previous, f_previous = x, fx
+            x -= step
+
+            # A single small step can come from jumping back from a huge value, so two are needed
+            if abs(step) <= tol * (1 + abs(x)):
+                if small:
+                    return float(x) if math.isfinite(x) else None
+                small = True
+            else:
+                small = False
+
+            fx = function(x, *args)
+    except EVALUATION_ERRORS:
+        pass
+
+    return None
+
+
+def _sign(value: float) -> bool:
+    return value < 0
+
+
+def find_bracket(
+    function: typing.Callable, x: float, args: tuple = tuple()
+) -> typing.Optional[typing.Tuple[float, float]]:
+    """
+    Search outwards from ``x`` for an interval where ``function`` changes sign, returns ``None`` if there isn't one.
+    Points where the function can't be evaluated are skipped, so the search works for functions such as ``sqrt(x) - 2``.
+    """
+    try:
+        fx = function(x, *args)
+    except EVALUATION_ERRORS:
+        return None
+
+    if fx == 0:
+        return x, x
+
+    width = max(abs(x), 1) / 100
+
+    for _ in range(BRACKET_STEPS):
+        for end in (x + width, x - width):
+            try:
+                f_end = function(end, *args)
+
+                if f_end == 0 or _sign(f_end) != _sign(fx):
+                    return min(x, end), max(x, end)
+            except EVALUATION_ERRORS:
+                continue
+
+        width *= 2
+
+    return None
+
+
+def brent(
+    function: typing.Callable,
+    a: float,
+    b: float,
+    args: tuple = tuple(),
+    tol: float = TOLERANCE,
+    maxiter: int = MAX_ITERATIONS,
+) -> float:
+    """
+    Find a root between ``a`` and ``b`` using brent's method, ``function`` must change sign between them.
+    Combines bisection with the secant method and inverse quadratic interpolation,
+    so it always converges, and converges almost as quickly as newton's method for smooth functions.
+
+    Raises :class:`~cake.errors.SolveError` if ``function`` doesn't change sign, or no root is found within ``maxiter`` steps.
+    """
+    x_previous, x_current = float(a), float(b)
+    f_previous, f_current = function(x_previous, *args), function(x_current, *args)
+
+    if f_previous == 0:
+        return x_previous
+    if f_current == 0:
+        return x_current
+
+    if _sign(f_previous) == _sign(f_current):
+        raise errors.SolveError(f"The expression has the same sign at {a} and {b}")
+
+    x_block, f_block = x_previous, f_previous
+    step_previous = step_current = x_current - x_previous
+
+    for _ in range(maxiter):
+        if f_previous != 0 and f_current != 0 and _sign(f_previous) != _sign(f_current):
+            x_block, f_block = x_previous, f_previous
+            step_previous = step_current = x_current - x_previous
+
+        if abs(f_block) < abs(f_current):
+            # Keep the best guess in `x_current`
+            x_previous, x_current, x_block = x_current, x_block, x_current
+            f_previous, f_current, f_block = f_current, f_block, f_current
+
+        delta = tol * (1 + abs(x_current)) / 2
+        bisect = (x_block - x_current) / 2
+
+        if f_current == 0 or abs(bisect) < delta:
+            return x_current
+
+        if abs(step_previous) > delta and abs(f_current) < abs(f_previous):
+            if x_previous == x_block:
+                # Secant method
+                attempt = -f_current * (x_current - x_previous) / (f_current - f_previous)
+            else:
+                # Inverse quadratic interpolation
+                d_previous = (f_previous - f_current) / (x_previous - x_current)
+                d_block = (f_block - f_current) / (x_block - x_current)
+                attempt = -f_current * (f_block * d_block - f_previous * d_previous) / (
+                    d_block * d_previous * (f_block - f_previous)
+                )
+
+            if 2 * abs(attempt) < min(abs(step_previous), 3 * abs(bisect) - delta):
+                step_previous, step_current = step_current, attempt
+            else:
+                step_previous = step_current = bisect
+        else:
+            step_previous = step_current = bisect
+
+        x_previous, f_previous = x_current, f_current
+
+        if abs(step_current) > delta:
+            x_current += step_current
+        else:
+            x_current += delta if bisect > 0 else -delta
+
+        f_current = function(x_current, *args)
+
+    raise errors.SolveError(f"No root was found between {a} and {b} within {maxiter} steps")
+
+
+class Solver(object):
+    """
+    Finds the roots of a compiled expression for one unknown, given values for the other unknowns.
+    Solvers are created using :meth:`~cake.parsing.compiled.CompiledExpression.solver`, which caches them,
+    so the expression is only differentiated and converted into functions once.
+
+    Parameters
+    ----------
+    compiled: :class:`~cake.parsing.compiled.CompiledExpression`
+        The expression to solve
+    slope: :class:`~typing.Optional[~cake.parsing.compiled.CompiledExpression]`
+        Its derivative, ``None`` if it couldn't be differentiated, in which case the secant method is used instead of newton's method
+    variable: :class:`str`
+        The unknown to solve for
+    """
+
+    __slots__ = ("compiled", "slope", "variable", "parameters", "function", "derivative")
+
+    def __init__(self, compiled: typing.Any, slope: typing.Optional[typing.Any], variable: str) -> None:
+        self.compiled = compiled
+        self.slope = slope
+        self.variable = variable
+        self.parameters = tuple(name for name in compiled.variables if name != variable)
+        # The other unknowns, in order of appearance
+
+        argnames = (variable, *self.parameters)
+        self.function = compiled.lambdify(*argnames)
+        self.derivative = slope.lambdify(*argnames) if slope is not None else None
+
+    def solve(
+        self,
+        values: typing.Sequence[float],
+        x0: typing.Optional[float] = None,
+        bracket: typing.Optional[typing.Tuple[float, float]] = None,
+        tol: float = TOLERANCE,
+        maxiter: int = MAX_ITERATIONS,
+    ) -> float:
+        """
+        Returns a root, raises :class:`~cake.errors.SolveError` if none could be found.
+
+        Parameters
+        ----------
+        values: :class:`~typing.Sequence[float]`
+            The values of :attr:`parameters`
+        x0: :class:`float`
+            The initial guess, defaults to the middle of ``bracket``, or ``1``
+        bracket: :class:`~typing.Tuple[float, float]`
+            An interval the root must be in, the expression must change sign across it.
+            If it isn't provided and newton's method fails, one is searched for starting from ``x0``.
+        tol, maxiter:
+            See :func:`newton`
+        """
+        args = tuple(values)
+
+        if x0 is None:
+            x0 = (bracket[0] + bracket[1]) / 2 if bracket else DEFAULT_GUESS
+
+        if self.derivative is not None:
+            root = newton(self.function, self.derivative, x0, args, tol, maxiter)
+        else:
+            root = secant(self.function, x0, args, tol, maxiter)
+
+        if root is not None and (bracket is None or min(bracket) <= root <= max(bracket)):
+            return root
+
+        if bracket is None:
+            bracket = find_bracket(self.function, x0, args)
+
+            if bracket is None:
+                raise errors.SolveError(f"No root was found for {self.variable}, starting from {x0}")
+
+        return brent(self.function, *bracket, args, tol, maxiter)
+
+    def solve_array(
+        self,
+        values: typing.Sequence[typing.Any],
+        x0: typing.Optional[typing.Any] = None,
+        bracket: typing.Optional[typing.Tuple[float, float]] = None,
+        tol: float = TOLERANCE,
+        maxiter: int = MAX_ITERATIONS,
+    ) -> typing.Any:
+        """
+        Solves for every element of a set of numpy arrays at once, returning an array of roots.
+        Newton's method is run over the whole arrays together, elements where it fails are solved one at a time using :meth:`solve`.
+        Elements which have no root are ``nan``, instead of raising an error.
+
+        Parameters
+        ----------
+        values: :class:`~typing.Sequence`
+            The values of :attr:`parameters`, as arrays or single numbers which are broadcast together
+        x0: :class:`~typing.Any`
+            The initial guesses, as an array or a single number
+        bracket, tol, maxiter:
+            See :meth:`solve`
+        """
+        import numpy
+
+        if x0 is None:
+            x0 = (bracket[0] + bracket[1]) / 2 if bracket else DEFAULT_GUESS
+
+        x, *arrays = numpy.broadcast_arrays(numpy.asarray(x0, dtype=float), *map(numpy.asarray, values))
+        x = x.astype(float)
+        converged = numpy.zeros(x.shape, dtype=bool)
+
+        if self.slope is not None:
+            argnames = (self.variable, *self.parameters)
+            function = self.compiled.lambdify(*argnames, backend="numpy")
+            derivative = self.slope.lambdify(*argnames, backend="numpy")
+            active = numpy.ones(x.shape, dtype=bool)
+
+            with numpy.errstate(all="ignore"):
+                for _ in range(maxiter):
+                    step = numpy.where(active, function(x, *arrays) / derivative(x, *arrays), 0.0)
+                    x = x - step
+
+                    finite = numpy.isfinite(x)
+                    converged |= active & finite & (numpy.abs(step) <= tol * (1 + numpy.abs(x)))
+                    active &= ~converged & finite
+
+                    if not active.any():
+                        break
+
+            if bracket is not None:
+                converged &= (x >= min(bracket)) & (x <= max(bracket))
+
+        guesses = numpy.broadcast_to(numpy.asarray(x0, dtype=float), x.shape)
+
+        for index in map(tuple, numpy.argwhere(~converged)):
+            try:
+                x[index] = self.solve([array[index].item() for array in arrays], float(guesses[index]), bracket, tol, maxiter)
+            except errors.SolveError:
+                x[index] = numpy.nan
+
+        return x
+
+    def __repr__(self) -> str:
+        return f"Solver({self.compiled.tree}, variable={self.variable})"
@@ -0,0 +1,309 @@
+"""
+Algebraic simplification of parse trees, used by :meth:`cake.Expression.simplify`.
+
+Trees are rewritten into a canonical sum of products: like terms are collected, powers of the same factor are merged,
+and identities such as ``* 1``, ``+ 0`` and ``** 1`` are removed.
+Products of two sums and powers of sums are left factored, since expanding them would make the expression longer.
+
+Numbers are combined using python's arithmetic, so the result doesn't depend on how cake's objects round or format values.
+"""
+import typing
+
+from cake.helpers import convert_type
+from .optimize import node_count
+from .tree import Node, Literal, Variable, UnaryOp, BinaryOp, transform
+
+__all__ = ("SimplifiedTree", "simplify")
+
+Monomial = typing.Tuple[typing.Tuple[tuple, int], ...]
+# Pairs of a factor's key and its exponent, sorted by key
+Sum = typing.Dict[Monomial, typing.Any]
+# Maps each product of factors to its coefficient, the empty product is the constant term
+
+MAX_EXPONENT = 64
+# Larger integer powers are left as they are instead of being merged
+
+
+class SimplifiedTree(object):
+    """
+    The result of :func:`simplify`
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The simplified tree
+    original_nodes: :class:`int`
+        How many nodes were in the tree before it was simplified
+    """
+
+    __slots__ = ("tree", "original_nodes")
+
+    def __init__(self, tree: Node, original_nodes: int) -> None:
+        self.tree = tree
+        self.original_nodes = original_nodes
+
+    @property
+    def nodes(self) -> int:
+        """ The number of nodes left """
+        return node_count(self.tree)
+
+    def dump(self) -> str:
+        """
+        Returns the simplified tree as text, after a line comparing the number of nodes.
+
+        .. code-block:: py
+
+            >>> from cake.parsing.parser import parse
+            >>> from cake.parsing.simplify import simplify
+            >>> print(simplify(parse("(x * 1 + 0) * x + 2 * x ** 2 - x / 1")).dump())
+            # 17 nodes -> 7 nodes
+            3 * x ** 2 - x
+        """
+        return f"# {self.original_nodes} nodes -> {self.nodes} nodes\n{self.tree}"
+
+    def __repr__(self) -> str:
+        return f"SimplifiedTree({self.tree})"
+
+
+def _value(node: Node) -> typing.Any:
+    value = node.value
+    return getattr(value, "value", value)
+
+
+def _literal(value: typing.Any) -> Literal:
+    if isinstance(value, float) and value.is_integer():
+        # The same type the parser uses for `2`, so simplified trees compare equal to parsed ones
+        value = int(value)
+    return Literal(convert_type(value))
+
+
+def _constant(terms: Sum) -> typing.Optional[typing.Any]:
+    # The value of a sum without any factors
+    if not terms:
+        return 0
+    if len(terms) == 1 and () in terms:
+        return terms[()]
+    return None
+
+
+def _integer(value: typing.Any) -> typing.Optional[int]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value == int(value):
+        value = int(value)
+
+        if abs(value) <= MAX_EXPONENT:
+            return value
+    return None
+
+
+def _add(first: Sum, second: Sum, sign: int = 1) -> Sum:
+    result = dict(first)
+
+    for monomial, coefficient in second.items():
+        total = result.get(monomial, 0) + sign * coefficient
+
+        if total == 0:
+            result.pop(monomial, None)
+        else:
+            result[monomial] = total
+    return result
+
+
+def _scale(terms: Sum, factor: typing.Any) -> Sum:
+    if factor == 0:
+        return dict()
+    return {monomial: coefficient * factor for monomial, coefficient in terms.items()}
+
+
+def _merge(first: Monomial, second: Monomial, power: int = 1) -> Monomial:
+    # `first * second ** power`
+    exponents = dict(first)
+
+    for key, exponent in second:
+        exponents[key] = exponents.get(key, 0) + exponent * power
+
+    return tuple(sorted((key, exponent) for key, exponent in exponents.items() if exponent))
+
+
+class _Simplifier(object):
+    # Converts nodes into sums, and sums back into nodes
+
+    def __init__(self) -> None:
+        self.factors: typing.Dict[tuple, Node] = dict()
+
+    def factor(self, node: Node, exponent: int = 1) -> Sum:
+        if isinstance(node, Variable):
+            key = (0, node.name)
+        else:
+            key = (1, str(node))
+
+        self.factors.setdefault(key, node)
+        return {((key, exponent),): 1}
+
+    def multiply(self, first: Sum, second: Sum) -> Sum:
+        if len(first) > 1 and len(second) > 1:
+            # Expanding would multiply the number of terms
+            return self._product(first, second)
+
+        result = dict()
+
+        for left, a in first.items():
+            for right, b in second.items():
+                result = _add(result, {_merge(left, right): a * b})
+        return result
+
+    def _product(self, first: Sum, second: Sum) -> Sum:
+        # Both sides are kept as factors, so `(x + 1) * (x + 1)` still becomes `(x + 1) ** 2`
+        a, b = self.factor(self.build(first)), self.factor(self.build(second))
+        ((left, _),) = a.items()
+        ((right, _),) = b.items()
+        return {_merge(left, right): 1}
+
+    def power(self, base: Sum, exponent: Sum) -> Sum:
+        value = _constant(exponent)
+        integer = _integer(value) if value is not None else None
+        constant = _constant(base)
+
+        if constant is not None and value is not None:
+            try:
+                return {(): constant ** value} if constant ** value != 0 else dict()
+            except (ArithmeticError, ValueError, TypeError):
+                pass
+
+        if integer is not None:
+            if integer == 0:
+                return {(): 1}
+
+            if len(base) == 1:
+                ((monomial, coefficient),) = base.items()
+
+                try:
+                    return {_merge((), monomial, integer): coefficient ** integer}
+                except ArithmeticError:
+                    pass
+            elif base:
+                return self.factor(self.build(base), integer)
+
+        return self.factor(BinaryOp("**", self.build(base), self.build(exponent)))
+
+    def divide(self, numerator: Sum, denominator: Sum) -> Sum:
+        constant = _constant(denominator)
+
+        if constant:
+            return _scale(numerator, 1 / constant)
+
+        if len(denominator) == 1:
+            ((monomial, coefficient),) = denominator.items()
+            return self.multiply(numerator, {_merge((), monomial, -1): 1 / coefficient})
+
+        return self.multiply(numerator, self.factor(self.build(denominator), -1))
+
+    def convert(self, node: Node, children: typing.List[Sum]) -> Sum:
+        if isinstance(node, Literal):
+            value = _value(node)
+            return {(): value} if value != 0 else dict()
+
+        if isinstance(node, Variable):
+            return self.factor(node)
+
+        if isinstance(node, UnaryOp) and node.op in ("+", "-"):
+            (operand,) = children
+            return operand if node.op == "+" else _scale(operand, -1)
+
+        if isinstance(node, BinaryOp):
+            left, right = children
+            op = node.op
+
+            if op == "+":
+                return _add(left, right)
+            if op == "-":
+                return _add(left, right, -1)
+            if op == "*":
+                return self.multiply(left, right)
+            if op == "/":
+                return self.divide(left, right)
+            if op == "**":
+                return self.power(left, right)
+
+        # Anything else is kept as a single factor, with its children simplified
+        # Functions are left unevaluated, so `sqrt(2)` isn't replaced with a rounded value
+        return self.factor(node.with_children([self.build(child) for child in children]))
+
+    def term(self, monomial: Monomial, coefficient: typing.Any) -> Node:
+        numerator = list()
+        denominator = list()
+
+        for key, exponent in monomial:
+            node = self.factors[key]
+            target = numerator if exponent > 0 else denominator
+            exponent = abs(exponent)
+
+            target.append(node if exponent == 1 else BinaryOp("**", node, _literal(exponent)))
+
+        negative = isinstance(coefficient, (int, float)) and coefficient < 0
+        magnitude = -coefficient if negative else coefficient
+
+        if magnitude != 1 or not numerator:
+            numerator.insert(0, _literal(magnitude))
+        if negative:
+            numerator[0] = UnaryOp("-", numerator[0])
+
+        tree = numerator[0]
+        for factor in numerator[1:]:
+            tree = BinaryOp("*", tree, factor)
+
+        if denominator:
+            below = denominator[0]
+            for factor in denominator[1:]:
+                below = BinaryOp("*", below, factor)
+            tree = BinaryOp("/", tree, below)
+
+        return tree
+
+    def build(self, terms: Sum) -> Node:
+        if not terms:
+            return _literal(0)
+
+        def order(item: tuple) -> tuple:
+            monomial, _ = item
+            degree = sum(exponent for _, exponent in monomial)
+            # Highest degree first, and the constant term last
+            return (not monomial, -degree, monomial)
+
+        tree = None
+
+        for monomial, coefficient in sorted(terms.items(), key=order):
+            if tree is None:
+                tree = self.term(monomial, coefficient)
+            elif isinstance(coefficient, (int, float)) and coefficient < 0:
+                tree = BinaryOp("-", tree, self.term(monomial, -coefficient))
+            else:
+                tree = BinaryOp("+", tree, self.term(monomial, coefficient))
+
+        return tree
+
+
+def simplify(tree: Node) -> SimplifiedTree:
+    """
+    Rewrite a tree into a canonical sum of products, returning the new tree and how many nodes were removed.
+
+    .. code-block:: py
+
+        >>> from cake.parsing.parser import parse
+        >>> from cake.parsing.simplify import simplify
+        >>> simplify(parse("x * y + 2 * y * x - (x ** 2) ** 3 / x")).tree
+        BinaryOp(-x ** 5 + 3 * x * y)
+
+    Parameters
+    ----------
+    tree: :class:`~cake.parsing.tree.Node`
+        The tree to simplify, it isn't modified
+    """
+    simplifier = _Simplifier()
+    sums = dict()
+
+    def convert(node: Node, children: tuple) -> Node:
+        sums[id(node)] = simplifier.convert(node, [sums[id(child)] for child in node.children])
+        return node
+
+    transform(tree, convert)
+    return SimplifiedTree(simplifier.build(sums[id(tree)]), node_count(tree))
@@ -0,0 +1,118 @@
+"""
+Reading expressions from files with one expression per line, such as a file written by another program.
+
+Lines are read and parsed one at a time, so memory use doesn't grow with the size of the file,
+unlike passing the file to :class:`~cake.Expression` which reads all of it and creates every expression at once.
+"""
+import itertools
+import typing
+
+from .expression import Expression
+from .parallel import map_chunks
+
+__all__ = ("iter_expressions", "iter_results")
+
+_WORKER_STATE: typing.Optional[tuple] = None
+# The values to substitute, set once in every worker process
+
+
+def _lines(fp: typing.Iterable[typing.Union[str, bytes]]) -> typing.Iterator[str]:
+    # Non empty lines, decoded the same way as files passed to `Expression`
+    for line in fp:
+        if isinstance(line, bytes):
+            line = line.decode(encoding="ASCII", errors="ignore")
+
+        line = line.strip()
+
+        if line:
+            yield line
+
+
+def _evaluate(line: str, args: tuple, kwargs: dict) -> typing.Any:
+    expr = Expression(line)
+    # Each line is only evaluated once, so optimizing it would cost more than it saves
+    expr.compile(optimize=False)
+
+    return expr.substitute(False, tuple(), *args, **kwargs)
+
+
+def _initialise(args: tuple, kwargs: dict) -> None:
+    global _WORKER_STATE
+    _WORKER_STATE = (args, kwargs)
+
+
+def _evaluate_chunk(lines: list) -> list:
+    args, kwargs = _WORKER_STATE
+    return [_evaluate(line, args, kwargs) for line in lines]
+
+
+def iter_expressions(
+    fp: typing.Iterable[typing.Union[str, bytes]], *default_args, **default_kwargs
+) -> typing.Iterator[Expression]:
+    """
+    Lazily create an expression for every line of a file, blank lines are skipped.
+
+    .. code-block:: py
+
+        >>> from cake.parsing import iter_expressions
+        >>> with open("formulas.txt") as fp:
+        ...     for expr in iter_expressions(fp, y=2):
+        ...         print(expr.substitute(x=3))
+
+    Parameters
+    ----------
+    fp: :class:`~typing.Iterable[typing.Union[str, bytes]]`
+        A file opened in text or binary mode, or any other iterable of lines
+    *default_args, **default_kwargs:
+        Default values given to every expression, see :class:`~cake.Expression`
+    """
+    for line in _lines(fp):
+        expr = Expression(line)
+
+        if default_args or default_kwargs:
+            expr.update_variables(True, *default_args, **default_kwargs)
+        yield expr
+
+
+def iter_results(
+    fp: typing.Iterable[typing.Union[str, bytes]],
+    *args,
+    workers: typing.Optional[int] = None,
+    chunksize: int = 1000,
+    **kwargs,
+) -> typing.Iterator:
+    """
+    Substitute the same values into the expression on every line of a file, yielding the results in order.
+    Blank lines are skipped, and values for unknowns which a line doesn't use are ignored.
+
+    .. code-block:: py
+
+        >>> from cake.parsing import iter_results
+        >>> with open("formulas.txt", "rb") as fp:
+        ...     total = sum(iter_results(fp, x=3, y=2, workers=4))
+
+    When ``workers`` is provided, chunks of lines are parsed and evaluated across that many processes.
+    Only a few chunks are read ahead of the results being used, so memory use stays constant either way.
+
+    Parameters
+    ----------
+    fp: :class:`~typing.Iterable[typing.Union[str, bytes]]`
+        A file opened in text or binary mode, or any other iterable of lines
+    *args, **kwargs:
+        The values to substitute, see :meth:`~cake.Expression.substitute`.
+        Unknowns are a single letter, so they can't clash with ``workers`` or ``chunksize``
+    workers: :class:`int`
+        The number of processes to use, by default lines are evaluated in this process
+    chunksize: :class:`int`
+        The number of lines sent to a process at a time
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+
+    lines = _lines(fp)
+
+    if workers is None:
+        return (_evaluate(line, args, kwargs) for line in lines)
+
+    chunks = iter(lambda: list(itertools.islice(lines, chunksize)), [])
+    return map_chunks(_evaluate_chunk, chunks, workers=workers, initializer=_initialise, initargs=(args, kwargs))
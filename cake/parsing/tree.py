@@ -0,0 +1,553 @@
+"""
+Parse trees for expressions.
+
+An expression is parsed into a tree once, the tree can then be evaluated or
+converted into code as many times as needed without tokenizing the expression again.
+"""
+import typing
+
+from cake.helpers import convert_type
+from . import pABC
+
+from ..core.markers import Operator, Symbol, PlusOrMinus, FunctionMarker
+from ..core.unknown.unknown import Unknown
+from ..core.number import Number
+
+__all__ = (
+    "Node",
+    "Literal",
+    "Variable",
+    "UnaryOp",
+    "BinaryOp",
+    "PlusMinus",
+    "Call",
+    "Temporary",
+    "BINARY_PRECEDENCE",
+    "UNARY_PRECEDENCE",
+    "RIGHT_ASSOCIATIVE",
+    "flatten",
+    "transform",
+    "to_markers",
+    "variables",
+    "plus_minus_count",
+)
+
+BINARY_PRECEDENCE: typing.Mapping[str, int] = {
+    "|": 1,
+    "^": 2,
+    "&": 3,
+    "<<": 4,
+    ">>": 4,
+    "+": 5,
+    "-": 5,
+    "+-": 5,
+    "*": 6,
+    "/": 6,
+    "//": 6,
+    "%": 6,
+    "**": 8,
+}
+# Follows pythons operator precedence, as the tree is evaluated as python code
+
+UNARY_PRECEDENCE = 7
+RIGHT_ASSOCIATIVE = {"**"}
+
+FUNCTION_NAMES: typing.Mapping[typing.Callable, str] = {
+    function: name for name, function in pABC.KEYWORDS.items()
+}
+POSTFIX_NAMES: typing.Mapping[typing.Callable, str] = {
+    function: name for name, function in pABC.SYMBOL_KW.items()
+}
+
+
+def _format(value: typing.Any) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _wrap(child: "Node", precedence: int) -> list:
+    if child.precedence < precedence:
+        return ["(", child, ")"]
+    return [child]
+
+
+class Node(object):
+    """
+    Base class for every node in an expression tree.
+
+    Nodes are compared and hashed by their structure, so ``parse("x + 1") == parse("x+1")``
+    and nodes can be used as keys, e.g. to cache the value of a subtree.
+    """
+
+    __slots__ = ("_hash", "_interned", "__weakref__")
+    # `_interned` is set by `cake.parsing.intern.InternTable`
+
+    precedence = 10
+
+    @property
+    def children(self) -> tuple:
+        return tuple()
+
+    def with_children(self, children: typing.Sequence["Node"]) -> "Node":
+        """ Returns a copy of this node with new children, or the node itself if the children are the same """
+        return self
+
+    def walk(self) -> typing.Iterator["Node"]:
+        """ Yields this node, followed by every node below it """
+        stack = [self]
+
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def signature(self) -> typing.Hashable:
+        """
+        Everything about this node apart from its children.
+        Two trees are equal when their nodes have the same types and signatures, in the same places.
+        """
+        return None
+
+    def layout(self) -> list:
+        """
+        Returns the text and child nodes which make up this node, in order.
+        Children are wrapped in brackets where precedence requires it.
+        """
+        raise NotImplementedError
+
+    def __hash__(self) -> int:
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+
+        # Hash children before their parents, without recursing into subtrees which are already hashed
+        stack = [(self, False)]
+
+        while stack:
+            node, ready = stack.pop()
+
+            if ready:
+                node._hash = hash(
+                    (type(node), node.signature(), tuple(child._hash for child in node.children))
+                )
+            elif not hasattr(node, "_hash"):
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children)
+
+        return self._hash
+
+    def __eq__(self, other: typing.Any) -> bool:
+        if not isinstance(other, Node):
+            return NotImplemented
+
+        stack = [(self, other)]
+
+        while stack:
+            left, right = stack.pop()
+
+            if left is right:
+                # Always the case for interned trees
+                continue
+
+            if (
+                type(left) is not type(right)
+                or hash(left) != hash(right)
+                or left.signature() != right.signature()
+            ):
+                return False
+
+            stack.extend(zip(left.children, right.children))
+
+        return True
+
+    def __ne__(self, other: typing.Any) -> bool:
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __getstate__(self) -> tuple:
+        # The cached hash depends on the process's hash seed, and interning only applies to this process
+        slots = dict()
+
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if name not in ("_hash", "_interned", "__weakref__") and hasattr(self, name):
+                    slots[name] = getattr(self, name)
+
+        return None, slots
+
+    def __str__(self) -> str:
+        return "".join(flatten(self, lambda node: node.layout()))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self})"
+
+
+class Literal(Node):
+    """
+    A known value, such as ``2`` or ``pi``
+
+    Parameters
+    ----------
+    value: :class:`~cake.Number`
+        The value of the literal
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Number) -> None:
+        self.value = value
+
+    def signature(self) -> typing.Hashable:
+        return type(self.value), getattr(self.value, "value", self.value)
+
+    def layout(self) -> list:
+        value = self.value.value
+
+        if isinstance(value, complex):
+            return [f"({_format(value.real)} + {_format(value.imag)}j)"]
+        if value < 0:
+            return [f"({_format(value)})"]
+        return [_format(value)]
+
+
+class Variable(Node):
+    """
+    An unknown value, which is looked up when the tree is evaluated
+
+    Parameters
+    ----------
+    name: :class:`str`
+        The name of the unknown
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def signature(self) -> typing.Hashable:
+        return self.name
+
+    def layout(self) -> list:
+        return [self.name]
+
+
+class UnaryOp(Node):
+    """
+    An operator applied to a single operand, such as ``-x``
+    """
+
+    __slots__ = ("op", "operand")
+
+    precedence = UNARY_PRECEDENCE
+
+    def __init__(self, op: str, operand: Node) -> None:
+        self.op = op
+        self.operand = operand
+
+    @property
+    def children(self) -> tuple:
+        return (self.operand,)
+
+    def with_children(self, children: typing.Sequence[Node]) -> Node:
+        (operand,) = children
+
+        if operand is self.operand:
+            return self
+        return UnaryOp(self.op, operand)
+
+    def signature(self) -> typing.Hashable:
+        return self.op
+
+    def layout(self) -> list:
+        return [self.op, *_wrap(self.operand, UNARY_PRECEDENCE)]
+
+
+class BinaryOp(Node):
+    """
+    An operator applied to a left and right operand, such as ``x + 2``
+    """
+
+    __slots__ = ("op", "left", "right")
+
+    def __init__(self, op: str, left: Node, right: Node) -> None:
+        self.op = op
+        self.left = left
+        self.right = right
+
+    @property
+    def precedence(self) -> int:
+        return BINARY_PRECEDENCE[self.op]
+
+    @property
+    def children(self) -> tuple:
+        return (self.left, self.right)
+
+    def with_children(self, children: typing.Sequence[Node]) -> Node:
+        left, right = children
+
+        if left is self.left and right is self.right:
+            return self
+        return BinaryOp(self.op, left, right)
+
+    def signature(self) -> typing.Hashable:
+        return self.op
+
+    def layout(self) -> list:
+        precedence = self.precedence
+        right_associative = self.op in RIGHT_ASSOCIATIVE
+
+        return [
+            *_wrap(self.left, precedence + right_associative),
+            f" {self.op} ",
+            *_wrap(self.right, precedence + (not right_associative)),
+        ]
+
+
+class PlusMinus(Node):
+    """
+    The ``(+|-)`` operator, the tree evaluates to one result for each sign.
+
+    ``left`` is ``None`` when the operator is used as a prefix, e.g. ``(+|-) x``
+    """
+
+    __slots__ = ("left", "right")
+
+    precedence = BINARY_PRECEDENCE["+-"]
+
+    def __init__(self, left: typing.Optional[Node], right: Node) -> None:
+        self.left = left
+        self.right = right
+
+    @property
+    def children(self) -> tuple:
+        if self.left is None:
+            return (self.right,)
+        return (self.left, self.right)
+
+    def with_children(self, children: typing.Sequence[Node]) -> Node:
+        if self.left is None:
+            left, right = None, children[0]
+        else:
+            left, right = children
+
+        if left is self.left and right is self.right:
+            return self
+        return PlusMinus(left, right)
+
+    def signature(self) -> typing.Hashable:
+        return self.left is None
+
+    def layout(self) -> list:
+        right = _wrap(self.right, self.precedence + 1)
+
+        if self.left is None:
+            return ["(+|-) ", *right]
+        return [*_wrap(self.left, self.precedence), " (+|-) ", *right]
+
+
+class Call(Node):
+    """
+    A function applied to an argument, such as ``sin(x)`` or ``(x)!``
+
+    Parameters
+    ----------
+    function: :class:`~typing.Callable`
+        A function from ``pABC.KEYWORDS`` or ``pABC.SYMBOL_KW``
+    argument: :class:`Node`
+        The tree passed into the function
+    """
+
+    __slots__ = ("function", "argument")
+
+    def __init__(self, function: typing.Callable, argument: Node) -> None:
+        self.function = function
+        self.argument = argument
+
+    @property
+    def name(self) -> str:
+        return FUNCTION_NAMES.get(self.function) or POSTFIX_NAMES.get(
+            self.function, self.function.__qualname__.lower()
+        )
+
+    @property
+    def children(self) -> tuple:
+        return (self.argument,)
+
+    def with_children(self, children: typing.Sequence[Node]) -> Node:
+        (argument,) = children
+
+        if argument is self.argument:
+            return self
+        return Call(self.function, argument)
+
+    def signature(self) -> typing.Hashable:
+        return self.function
+
+    def layout(self) -> list:
+        if self.function in POSTFIX_NAMES:
+            return ["(", self.argument, ")", self.name]
+        return [self.name, "(", self.argument, ")"]
+
+
+class Temporary(Node):
+    """
+    Refers to a value which was evaluated beforehand, such as a repeated subexpression
+
+    Parameters
+    ----------
+    name: :class:`str`
+        The name the value is stored under
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def signature(self) -> typing.Hashable:
+        return self.name
+
+    def layout(self) -> list:
+        return [self.name]
+
+
+def variables(tree: Node) -> typing.Tuple[str, ...]:
+    """ Returns the names of the unknowns in a tree, in order of appearance """
+    found = dict()
+
+    for node in tree.walk():
+        if isinstance(node, Variable):
+            found[node.name] = None
+    return tuple(found)
+
+
+def plus_minus_count(tree: Node) -> int:
+    """ Returns the number of ``(+|-)`` operators in a tree """
+    return sum(1 for node in tree.walk() if isinstance(node, PlusMinus))
+
+
+def flatten(tree: Node, expand: typing.Callable[[Node], list]) -> typing.Iterator[typing.Any]:
+    """
+    Yields the parts of a tree in order, ``expand`` returns the parts of a single node.
+    Any nodes in those parts are expanded in turn, everything else is yielded as it is.
+
+    A stack is used instead of recursion, so long chains such as ``x + x + ... + x``
+    don't exceed the recursion limit.
+
+    Parameters
+    ----------
+    tree: :class:`Node`
+        The tree to flatten
+    expand: :class:`~typing.Callable[[Node], list]`
+        Returns the parts of a node, e.g. :meth:`Node.layout`
+    """
+    stack = [tree]
+
+    while stack:
+        part = stack.pop()
+
+        if isinstance(part, Node):
+            stack.extend(reversed(expand(part)))
+        else:
+            yield part
+
+
+def transform(tree: Node, function: typing.Callable[[Node, tuple], Node]) -> Node:
+    """
+    Rebuild a tree from the bottom up, without recursing.
+    ``function`` is called with each node and its already rebuilt children, and returns the node to use in its place,
+    ``node.with_children(children)`` keeps the node as it is.
+
+    Parameters
+    ----------
+    tree: :class:`Node`
+        The tree to rebuild
+    function: :class:`~typing.Callable[[Node, tuple], Node]`
+        Returns the replacement for a node
+    """
+    rebuilt = dict()
+    stack = [(tree, False)]
+
+    while stack:
+        node, ready = stack.pop()
+
+        if id(node) in rebuilt:
+            # Nodes can be shared between branches
+            continue
+
+        if ready:
+            children = tuple(rebuilt[id(child)] for child in node.children)
+            rebuilt[id(node)] = function(node, children)
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+
+    return rebuilt[id(tree)]
+
+
+def to_markers(tree: Node, mapping: typing.Mapping[str, typing.Any]) -> list:
+    """
+    Flatten a tree into the markers returned by ``Expression._sub``.
+    Brackets are only added where they are needed.
+
+    Parameters
+    ----------
+    tree: :class:`Node`
+        The tree to flatten
+    mapping: :class:`~typing.Mapping[str, typing.Any]`
+        Values to replace unknowns with, any unknowns which are missing are left as :class:`~cake.Unknown`
+    """
+
+    markers = list()
+    outputs = [markers]
+    # The list being added to, a function's argument goes into its own list
+    stack = [tree]
+
+    while stack:
+        part = stack.pop()
+
+        if part is _END_CALL:
+            outputs.pop()
+
+        elif isinstance(part, Literal):
+            outputs[-1].append(part.value)
+
+        elif isinstance(part, Variable):
+            if mapping.get(part.name) is not None:
+                outputs[-1].append(convert_type(mapping[part.name]))
+            else:
+                outputs[-1].append(Unknown(part.name))
+
+        elif isinstance(part, Call):
+            # Nested functions use a stack instead of recursing, so their depth isn't limited
+            argument = list()
+            outputs[-1].append(FunctionMarker(part.function, argument))
+            outputs.append(argument)
+
+            stack.append(_END_CALL)
+            stack.append(part.argument)
+
+        elif isinstance(part, Node):
+            stack.extend(reversed(part.layout()))
+
+        else:
+            outputs[-1].append(_marker(part))
+
+    return markers
+
+
+_END_CALL = object()
+# Marks the end of a function's argument, for `to_markers`
+
+
+def _marker(text: str) -> typing.Any:
+    text = text.strip()
+
+    if text in ("(", ")"):
+        return Symbol(text)
+    if text == "(+|-)":
+        return PlusOrMinus()
+    return Operator(text)
@@ -2,8 +2,12 @@
 # - No code from sympy has been used, just using method names
 # Link: https://github.com/sympy/sympy
 
+import typing
+import cake
 from cake import Unknown
 
+__all__ = ("symbol", "symbols", "lambdify")
+
 
 def symbol(*symbols: str) -> tuple:
     if not symbols:
@@ -31,3 +35,32 @@ def symbol(*symbols: str) -> tuple:
 
 # Some people may like the plural
 symbols = symbol
+
+
+def lambdify(args: typing.Union[str, typing.Iterable[str]], expr, backend: str = "math") -> typing.Callable:
+    """
+    Convert an expression into a plain python function, using the same argument order as sympy.
+
+    .. code-block:: py
+
+        >>> from cake import lambdify
+        >>> f = lambdify("x y", "x ** 2 + y")
+        >>> f(2, 1)
+        5.0
+
+    Parameters
+    ----------
+    args: :class:`~typing.Union[str, typing.Iterable[str]]`
+        Names of the functions arguments, a string is split the same way as :func:`symbol`
+    expr: :class:`~typing.Union[str, cake.Expression]`
+        The expression to convert
+    backend: :class:`str`
+        The backend which provides the functions used by the expression, defaults to ``"math"``
+    """
+    if isinstance(args, str):
+        args = args.split(", ") if ", " in args else args.split(" ")
+
+    if not isinstance(expr, cake.Expression):
+        expr = cake.Expression(expr)
+
+    return expr.lambdify(*args, backend=backend)
@@ -26,6 +26,20 @@ def testTermMultiplication():
 
     print(BS)
 
+
+def testNumberOperand():
+    # Numbers hand unknowns to the unknown's own operators
+    res = cake.Zero()
+    res += BASE
+    assert repr(res) == 'x', "In-place addition to a number failed"
+
+    assert repr(BASE * BASE) == 'x ** 2', "Multiplication failed"
+    assert repr(3 * BASE) == 'x * 3', "Multiplication by a number failed"
+    assert repr(cake.Integer(2) + BASE) == 'x + 2.0', "Number addition failed"
+
+    assert isinstance(cake.Expression('x * 2 + y').substitute(y=1), cake.Unknown), "Partial substitution failed"
+
 if __name__ == '__main__':
+    testNumberOperand()
     testBase()
     testTermMultiplication()
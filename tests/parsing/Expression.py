@@ -0,0 +1,695 @@
+# Basic testing for expressions
+import pickle
+import cake
+from cake import errors
+
+EXPRESSION = "x ** 2 + 3x + sin(y)"
+
+
+def testCompile():
+    expr = cake.Expression(EXPRESSION)
+    legacy = cake.Expression(EXPRESSION).substitute(x=2, y=30)
+
+    compiled = expr.compile()
+    assert compiled is expr.compile(), "Compiled twice"
+    assert compiled.variables == ('x', 'y'), "Incorrect unknowns"
+
+    assert expr.substitute(x=2, y=30) == legacy, "Compiled result differs from the uncompiled result"
+    assert expr.skipped_parses > 0, "Compiled substitution still parsed the expression"
+    print('Passed compile test')
+
+    expr.append(" + 1")
+    assert expr.compiled is None, "Appending didn't invalidate the compiled expression"
+    print('Passed compile invalidation test')
+
+
+def testPlusMinus():
+    expr = cake.Expression("x (+|-) 2")
+    legacy = cake.Expression("x (+|-) 2").substitute(x=2)
+
+    expr.compile()
+    assert expr.substitute(x=2) == legacy, "Compiled (+|-) results differ"
+    print('Passed compiled (+|-) test')
+
+    source = "sin(x) * 2 (+|-) x (+|-) (3 (+|-) sqrt(x))"
+    legacy = cake.Expression(source).substitute(False, ("math *",), x=4)
+    assert len(cake.getPlusMinusCombos(3)) == 8, "Sign combinations aren't 2 ** n"
+
+    expr = cake.Expression(source)
+    assert expr.substitute(x=4) == legacy, "Multiple (+|-) results differ"
+
+    branches = expr.branches(x=4)
+    assert next(branches) == ("+++", legacy[0]), "Branches weren't yielded in order"
+    assert len(list(branches)) == 7, "Incorrect number of branches"
+    print('Passed (+|-) branches test')
+
+
+def testOptimize():
+    source = "sin(x) ** 2 + 2 * pi * sin(x) + y"
+    expr = cake.Expression(source)
+
+    compiled = expr.compile()
+    assert compiled.optimized.folded == 1, "2 * pi wasn't folded"
+    assert [name for name, _ in compiled.temporaries] == ["_t0"], "sin(x) wasn't hoisted"
+    assert "_t0 = sin(x)" in compiled.dump(), "Dump doesn't show the temporary"
+
+    plain = cake.Expression(source).compile(optimize=False)
+    assert compiled.evaluate({"x": 2, "y": 30}) == plain.evaluate({"x": 2, "y": 30}), "Optimized result differs"
+    print('Passed optimize test')
+
+
+def testSpecialize():
+    expr = cake.Expression("x * y + sqrt(y) * z")
+    fixed = expr.specialize(y=4, z=5)
+
+    assert fixed.compiled.variables == ('x',), "Fixed unknowns weren't removed"
+    assert str(fixed.compiled.tree) == "x * 4 + 10", "Fixed terms weren't folded"
+    assert fixed.substitute(x=2) == expr.substitute(x=2, y=4, z=5), "Specialized result differs"
+    print('Passed specialize test')
+
+
+def testLambdify():
+    expr = cake.Expression(EXPRESSION)
+    function = expr.lambdify("x", "y")
+
+    assert function is expr.lambdify("x", "y"), "Lambdified function wasn't cached"
+    assert abs(function(2.0, 30.0) - expr.substitute(x=2, y=30).value) < 1e-9, "Lambdified result differs"
+
+    assert cake.lambdify("x y", "x ** 2 + y")(2, 1) == 5, "cake.lambdify failed"
+    print('Passed lambdify test')
+
+
+def testSubstituteMany():
+    expr = cake.Expression(EXPRESSION)
+    rows = iter([{'x': 1, 'y': 30}, (2, 30), {'x': '3', 'y': '30'}])
+
+    results = expr.substitute_many(rows)
+    assert not isinstance(results, list), "Results weren't streamed"
+
+    for x, result in enumerate(results, start=1):
+        assert result == cake.Expression(EXPRESSION).substitute(x=x, y=30), "Batch result differs"
+    print('Passed substitute many test')
+
+
+def testSubstituteParallel():
+    expr = cake.Expression(EXPRESSION)
+    rows = [(x, 30) for x in range(20)]
+
+    compiled = pickle.loads(pickle.dumps(expr.compile()))
+    assert str(compiled.tree) == str(expr.compiled.tree), "Compiled expression didn't survive pickling"
+
+    expected = list(expr.substitute_many(rows))
+    results = list(expr.substitute_parallel(rows, workers=2, chunksize=3))
+
+    assert results == expected, "Parallel results differ or are out of order"
+    print('Passed substitute parallel test')
+
+
+def testLongExpression():
+    expr = cake.Expression(" + ".join(["x"] * 1500))
+
+    assert str(expr.compile().tree).count("x") == 1500, "Long expression didn't round trip"
+    assert expr.substitute(x=1) == 1500, "Long expression evaluated incorrectly"
+    print('Passed long expression test')
+
+
+def testDeepExpression():
+    from cake.parsing.parser import parse
+    from cake.parsing.tree import BinaryOp, UnaryOp
+
+    # The parser keeps its own stack, so nesting isn't limited by the recursion limit
+    brackets = cake.Expression("(" * 400 + "x" + ")" * 400)
+    assert str(brackets.compile().tree) == "x", "Redundant brackets weren't removed"
+
+    power = parse(" ** ".join(["x"] * 1200))
+    negated = parse("-" * 1200 + "x")
+
+    for _ in range(1199):
+        assert isinstance(power, BinaryOp) and power.left == parse("x"), "Powers weren't right associative"
+        power = power.right
+
+    for _ in range(1200):
+        assert isinstance(negated, UnaryOp), "Unary operators were dropped"
+        negated = negated.operand
+
+    assert cake.Expression(" ** ".join(["x"] * 1200)).compile() and cake.Expression("-" * 1200 + "x").compile()
+    print('Passed deep expression test')
+
+
+def testNestedFunctions():
+    source = "sqrt(" * 400 + "x" + ")" * 400
+
+    # Python can't compile code nested this deeply, so the tree is walked instead
+    assert cake.Expression(source).substitute(x=1) == 1
+    assert cake.Expression(source).compile().nested(), "Nested expression was compiled"
+    assert not cake.Expression("sqrt(sqrt(x))").compile().nested()
+
+    code, _ = cake.Expression(source)._glSubCode(False, x=1)
+    assert code.count("Sqrt") == 400, "Nested functions weren't generated in a single pass"
+
+    mixed = "x"
+    for level in range(400):
+        mixed = f"{('sin', 'cos', 'sqrt')[level % 3]}(1 + {mixed})"
+
+    expr = cake.Expression(mixed)
+    expr.numeric = True
+    assert expr.substitute(x=1) == cake.Expression(mixed).substitute(x=1)
+
+    results = cake.Expression(f"sqrt(x) (+|-) {source}").substitute(x=16)
+    assert results == cake.Expression("sqrt(x) (+|-) 1").substitute(x=16), "Nested expression with (+|-) was wrong"
+    print('Passed nested functions test')
+
+
+def testBrackets():
+    assert cake.Expression("((x + 1)!)! + (2 + 3j)").compile(), "Nested brackets failed to parse"
+
+    for invalid in ("(x + 1", "x + 1)", "sin(x", "()"):
+        try:
+            cake.Expression(invalid).compile()
+        except errors.SubstitutionError:
+            continue
+        raise AssertionError(f"Invalid brackets in {invalid} were accepted")
+    print('Passed brackets test')
+
+
+def testParseCache():
+    cache = cake.parsing.PARSE_CACHE
+    cache.clear()
+
+    cake.Expression("X ** 2  +  y").substitute(x=1, y=2)
+    misses = cache.info().misses
+    cake.Expression("x ** 2 + y").substitute(x=1, y=2)
+
+    info = cache.info()
+    assert info.misses == misses == 1, "Normalized expression was parsed again"
+    assert info.hits > 0, "Cache wasn't used"
+
+    maxsize = cache.maxsize
+    cache.maxsize = 2
+
+    for n in range(4):
+        cake.Expression(f"x + {n}")
+    assert len(cache) == 2 and cache.info().evictions == 3, "Least recently used expressions weren't evicted"
+    assert "x + 3" in cache and "x + 0" not in cache, "Wrong expression was evicted"
+
+    cache.maxsize = maxsize
+    print('Passed parse cache test')
+
+
+def testIncremental():
+    from cake.parsing import incremental
+    from cake.parsing.parser import parse
+
+    edits = [
+        ("append", "3x", " ** 2"),
+        ("append", "x + 1", " - 2"),
+        ("append", "a + (b * c)", " ** 2"),
+        ("append", "-x", " ** 3"),
+        ("prepend", "x ** 2", "2 ** "),
+        ("prepend", "x + 1", "2 * "),
+        ("wrap_all", "x + 1", "2"),
+    ]
+
+    for method, source, fragment in edits:
+        expr = cake.Expression(source)
+
+        if method == "wrap_all":
+            expr.wrap_all("*", fragment)
+        else:
+            getattr(expr, method)(fragment)
+
+        assert str(expr._parsed().tree) == str(parse(expr.expression)), f"{method}({fragment!r}) on {source} built the wrong tree"
+
+    grafted = incremental.STATS["grafted"]
+    expr = cake.Expression("x")
+
+    for n in range(5):
+        expr.append(f" + {n}")
+    assert incremental.STATS["grafted"] - grafted == 5, "Appended terms were parsed again"
+
+    expr = cake.Expression("x + 2")
+    assert len(expr.terms) == 2
+
+    expr.append(" + y")
+    assert len(expr.terms) == 3, "Terms weren't updated after appending"
+
+    expr.update_variables(x=3)
+    assert expr.terms[0] == 3, "Terms weren't updated after changing variables"
+
+    print('Passed incremental parsing test')
+
+
+def testStructuralEquality():
+    from cake.parsing.parser import parse
+
+    assert cake.Expression("X ** 2 + 3x") == cake.Expression("x**2 + 3 * x")
+    assert cake.Expression("x + 1") != cake.Expression("1 + x")
+    assert len({cake.Expression("x+1"), cake.Expression("x + 1"), cake.Expression("sin(x)")}) == 2
+
+    assert parse("2 * (x + 1)") == parse("2*(x+1)") and hash(parse("sin(x)")) == hash(parse("sin( x )"))
+    assert parse("2") != parse("2.0"), "Integers and reals were treated as equal"
+
+    first = cake.Expression("sin(x) + 1")
+    second = cake.Expression("2 * sin(x)")
+    assert first._parsed().tree.left is second._parsed().tree.right, "Equal subtrees weren't shared"
+
+    first.append(" * 2")
+    assert first != cake.Expression("sin(x) + 1")
+
+    print('Passed structural equality test')
+
+
+def testDiskCache():
+    import tempfile
+    from cake.parsing import DISK_CACHE, PARSE_CACHE
+
+    source = "sin(x) ** 2 + 2 * pi * sin(x) (+|-) y"
+
+    with tempfile.TemporaryDirectory() as directory:
+        DISK_CACHE.directory = directory
+        expected = cake.Expression(source).compile().evaluate({"x": 30, "y": 2})
+
+        # A new process only has the files
+        PARSE_CACHE.clear()
+        hits = DISK_CACHE.info().hits
+
+        compiled = cake.Expression(source).compile()
+        assert DISK_CACHE.info().hits - hits == 2, "Tree and code weren't loaded from disk"
+        assert compiled._code, "Code wasn't loaded"
+        assert compiled.evaluate({"x": 30, "y": 2}) == expected
+
+        version = cake.__version__
+        cake.__version__ = version + "+changed"
+        PARSE_CACHE.clear()
+
+        try:
+            cake.Expression(source).compile()
+            assert DISK_CACHE.info().hits - hits == 2, "Files from another version were loaded"
+        finally:
+            cake.__version__ = version
+
+        # Only the shared code and first combination are generated before storing many `(+|-)` operators
+        compiled = cake.Expression(" (+|-) ".join(["x"] * 12)).compile()
+        assert len(compiled._code) == 1, "Every combination of signs was generated"
+
+    try:
+        # The directory no longer exists, so writes fail without breaking anything
+        failures = DISK_CACHE.info().failures
+        assert cake.Expression("q + 1").compile().evaluate({"q": 1}) == 2
+        assert DISK_CACHE.info().failures - failures == 2, "Failed writes weren't counted"
+
+        # A directory which can't be created, e.g. `CAKE_CACHE_DIR` is a file, disables the cache instead of raising
+        with tempfile.NamedTemporaryFile() as file:
+            DISK_CACHE.directory = file.name
+            assert not DISK_CACHE.enabled and DISK_CACHE.info().failures - failures == 3
+    finally:
+        DISK_CACHE.directory = None
+
+    print('Passed disk cache test')
+
+
+def testSolve():
+    from cake.parsing.derivative import derivative
+    from cake.parsing.parser import parse
+
+    assert str(derivative(parse("x ** 3 + 2x * y"), "x")) == "3 * x ** 2 + 2 * y"
+
+    expr = cake.Expression("x ** 2 - y")
+    assert abs(expr.solve(y=2).value - 2 ** 0.5) < 1e-12, "Wrong root"
+    assert abs(expr.solve(x=3, variable="y").value - 9) < 1e-12
+    assert abs(expr.solve(y=4, bracket=(-10, 0)).value + 2) < 1e-12, "Root outside of the bracket"
+
+    # Trigonometric functions take degrees, and `x ** x` can't be differentiated so the secant method is used
+    assert abs(cake.Expression("sin(x) - 0.5").solve(x0=10).value - 30) < 1e-9
+    assert abs(cake.Expression("x ** x - 27").solve().value - 3) < 1e-9
+
+    roots = [root.value for root in expr.solve_many([{"y": 4}, (None, 9)])]
+    assert all(abs(root - expected) < 1e-12 for root, expected in zip(roots, (2, 3))), "Wrong batch roots"
+
+    try:
+        cake.Expression("x ** 2 + 1").solve()
+    except errors.SolveError:
+        pass
+    else:
+        raise AssertionError("Solved an expression without a root")
+
+    try:
+        import numpy
+    except ImportError:
+        print('Passed solve test, without arrays as numpy is not installed')
+        return
+
+    result = expr.solve(y=numpy.array([4.0, -1.0, 9.0]))
+    assert abs(result[0] - 2) < 1e-12 and numpy.isnan(result[1]) and abs(result[2] - 3) < 1e-12, "Wrong array roots"
+
+    print('Passed solve test')
+
+
+def testGrad():
+    import math
+
+    f = cake.Expression("x ** 2 * y + 3y").grad()
+    assert f(2.0, 5.0) == (35.0, (20.0, 7.0)), "Wrong gradient"
+
+    # Derivatives of trigonometric functions are with respect to degrees
+    value, (dx,) = cake.Expression("sin(x) + sqrt(x)").grad("x")(30.0)
+    expected = math.cos(math.radians(30)) * math.pi / 180 + 0.5 / math.sqrt(30)
+    assert abs(value - (0.5 + math.sqrt(30))) < 1e-12 and abs(dx - expected) < 1e-12, "Wrong trigonometric gradient"
+
+    expr = cake.Expression("(x)! + tan(x) + x ** y")
+    function = expr.lambdify()
+    _, (dx, dy) = expr.grad()(2.5, 1.5)
+    step = 1e-6
+
+    assert abs(dx - (function(2.5 + step, 1.5) - function(2.5 - step, 1.5)) / (2 * step)) < 1e-6
+    assert abs(dy - (function(2.5, 1.5 + step) - function(2.5, 1.5 - step)) / (2 * step)) < 1e-6
+
+    assert cake.Expression("sqrt(x) (+|-) x").grad()(4.0) == ((6.0, (1.25,)), (-2.0, (-0.75,)))
+    assert cake.Expression("x + y").grad("y")(1.0, 2.0) == (3.0, (1.0,))
+
+    print('Passed grad test')
+
+
+def testDiff():
+    import math
+
+    expr = cake.Expression("x ** 3 + 2x * y")
+    assert str(expr.diff("x")) == "3 * x ** 2 + 2 * y", "Derivative wasn't simplified"
+    assert expr.diff("x") == cake.Expression("3 * x ** 2 + 2 * y")
+    assert str(expr.diff("y")) == "2 * x" and str(expr.diff("z")) == "0"
+
+    derived = cake.Expression("sin(x) * x + y / x").diff("x")
+    expected = math.cos(math.radians(30)) * math.pi / 180 * 30 + math.sin(math.radians(30)) - 2 / 30 ** 2
+    assert abs(derived.lambdify("x", "y")(30.0, 2.0) - expected) < 1e-12, "Wrong derivative"
+
+    # Defaults of the unknowns which are left are kept
+    expr = cake.Expression("x * y + y")
+    expr.update_variables(y=3)
+    assert expr.diff("x").substitute() == 3
+
+    print('Passed diff test')
+
+
+def testSimplify():
+    from cake.parsing.parser import parse
+    from cake.parsing.simplify import simplify
+
+    expr = cake.Expression("(x * 1 + 0) * x + 2 * x ** 2 - x / 1")
+    assert str(expr.simplify()) == "3 * x ** 2 - x", "Like terms weren't collected"
+    assert str(cake.Expression("x * y + 2 * y * x - (x ** 2) ** 3 / x").simplify()) == "-x ** 5 + 3 * x * y"
+    assert str(cake.Expression("(x + 1) * (x + 1) - (x + 1) ** 2").simplify()) == "0"
+    assert str(cake.Expression("(x + 1) * (x - 1)").simplify()) == "(x + 1) * (x - 1)", "Product of sums was expanded"
+    assert str(cake.Expression("sqrt(x * 1 + 0) ** 1").simplify()) == "sqrt(x)"
+
+    result = simplify(parse("(x * 1 + 0) * x + 2 * x ** 2 - x / 1"))
+    assert (result.original_nodes, result.nodes) == (17, 7)
+    assert result.dump().splitlines()[0] == "# 17 nodes -> 7 nodes"
+
+    source = "(x + y) * 2 / (x * 4) + x ** 2 * x ** -1 - sin(y) * sin(y) + 3 - 1"
+    before = cake.Expression(source).lambdify("x", "y")
+    after = cake.Expression(source).simplify().lambdify("x", "y")
+
+    for x, y in ((1.5, 2.0), (-3.0, 45.0), (7.0, -0.5)):
+        assert abs(before(x, y) - after(x, y)) < 1e-9, "Simplified expression gives a different result"
+
+    expr = cake.Expression("x * 1 + y * 0 + y")
+    expr.update_variables(y=3)
+    assert expr.simplify().substitute(x=2) == 5, "Defaults weren't kept"
+
+    print('Passed simplify test')
+
+
+def testPolynomial():
+    from cake.parsing.parser import parse
+    from cake.parsing.polynomial import as_polynomial
+
+    polynomial = as_polynomial(parse("3 * x ** 3 + 2x - 5"))
+    assert polynomial.horner() == "(3 * x ** 2 + 2) * x - 5", "Polynomial wasn't put in horner form"
+    assert polynomial.degree == 3 and polynomial(2) == 23
+
+    assert as_polynomial(parse("(x - y) ** 2 + x * y")).terms == {(2, 0): 1, (1, 1): -1, (0, 2): 1}
+    for source in ("sqrt(x)", "x / y", "x ** y", "x ** 0.5", "x - x", "x (+|-) 1"):
+        assert as_polynomial(parse(source)) is None, f"{source} isn't a polynomial"
+
+    source = "x ** 7 + (x - 1) * y ** 2 / 2"
+    expr = cake.Expression(source)
+    unoptimized = cake.Expression(source).compile(optimize=False)
+    assert expr.compile().polynomial is not None and unoptimized.polynomial is None
+
+    # Horner's scheme gives the same results as cake's objects, whether or not the expression was compiled
+    for values, expected in (({"x": 2, "y": 3}, 2 ** 7 + 4.5), ({"x": 1.5, "y": -2}, 1.5 ** 7 + 1)):
+        assert expr.substitute(**values) == expected
+        assert cake.Expression(source).substitute(**values) == expected, "Result changed once compiled"
+        assert unoptimized.evaluate(values) == expected
+
+    # Including the type of the result, integer inputs still give a `Real` as they do with cake's objects
+    for source in ("x ** 2 + 3x", "x * y", "x (+|-) y"):
+        results = [
+            cake.Expression(source).substitute(x=2, y=3),
+            cake.Expression(source).compile().evaluate({"x": 2, "y": 3}),
+            cake.Expression(source).compile(optimize=False).evaluate({"x": 2, "y": 3}),
+            cake.Expression(source).substitute(x=2, y=3, numeric=True),
+        ]
+        assert all(repr(result) == repr(results[0]) for result in results), f"{source} gave {results}"
+
+    try:
+        import numpy
+    except ImportError:
+        print('Passed polynomial test, skipped arrays as numpy is not installed')
+        return
+
+    x = numpy.linspace(-2, 2, 9)
+    result = expr.substitute(x=x, y=3)
+    assert numpy.allclose(result, x ** 7 + (x - 1) * 4.5), "Polynomial array result differs"
+
+    print('Passed polynomial test')
+
+
+def testPrecision():
+    import mpmath
+
+    expr = cake.Expression("x / 3 + 0.1")
+    result = expr.substitute(x=1, precision=200)
+    assert isinstance(result, mpmath.ctx_mp_python._mpf), "Precise substitution didn't return an mpmath number"
+
+    with mpmath.workprec(200):
+        assert abs(result - (mpmath.mpf(1) / 3 + mpmath.mpf("0.1"))) < mpmath.mpf(2) ** -195, "Not evaluated to 200 bits"
+
+    # Identities hold well past a float's precision
+    expr = cake.Expression("sin(x) ** 2 + cos(x) ** 2 - 1 + pi * y")
+    result = expr.substitute(x=30, y="1e-40", precision=300)
+
+    with mpmath.workprec(300):
+        assert abs(result - mpmath.pi * mpmath.mpf("1e-40")) < mpmath.mpf("1e-120")
+
+    # Code is generated once for each precision
+    expr = cake.Expression("x ** 2 (+|-) 1")
+    assert expr.substitute(x=3, precision=80) == (10, 8)
+    first = expr.compile().lambdify(backend="mpmath-80")
+    expr.substitute(x=4, precision=80)
+    assert expr.compile().lambdify(backend="mpmath-80") is first
+    assert expr.compile().lambdify(backend="mpmath-90") is not first
+
+    # Domain errors are raised the same as without a precision, complex values still work
+    for precision in (None, 100):
+        try:
+            cake.Expression("sqrt(x) + 1").substitute(x=-4, precision=precision)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"sqrt of a negative didn't raise, with a precision of {precision}")
+
+    assert cake.Expression("sqrt(x)").substitute(x=-4 + 0j, precision=100) == 2j
+
+    try:
+        cake.Expression("x + y").substitute(x=1, precision=100)
+    except errors.MissingValue:
+        pass
+    else:
+        raise AssertionError("Missing values weren't reported")
+
+    print('Passed precision test')
+
+
+def testStream():
+    import io
+    from cake.parsing import iter_expressions, iter_results
+
+    text = "x ** 2 + y\n\n2x - sin(y)\r\nX * 3\n"
+    expressions = list(iter_expressions(io.StringIO(text), y=30))
+
+    assert [str(expr) for expr in expressions] == ["x ** 2 + y", "2x - sin(y)", "x * 3"], "Lines weren't read correctly"
+    assert expressions[1].kwargs == {"y": 30}, "Default values weren't given to every line"
+
+    expected = [expr.substitute(x=4) for expr in expressions]
+    assert list(iter_results(io.BytesIO(text.encode()), x=4, y=30)) == expected
+    assert list(iter_results(io.StringIO(text), 4, 30)) == expected
+    assert list(iter_results(io.StringIO(text * 5), x=4, y=30, workers=2, chunksize=2)) == expected * 5, "Parallel results are out of order"
+
+    # Only the lines which have been used are read
+    lines = iter(["x + 1\n", "x + 2\n", "x +\n"])
+    results = iter_results(lines, x=1)
+    assert next(results) == 2 and next(lines) == "x + 2\n"
+
+    print('Passed stream test')
+
+
+def testTreeEvaluator():
+    from cake.parsing.parser import parse
+    from cake.parsing.evaluator import evaluate_tree
+
+    for source in (EXPRESSION, "sin(x) * 2 (+|-) x (+|-) (3 (+|-) sqrt(x))", "sin(x) ** 2 + 2 * pi * sin(x) + y", "(+|-) x + 2"):
+        expr = cake.Expression(source)
+        walked = cake.Expression(source)
+        walked.evaluator = "tree"
+
+        assert walked.substitute(x=4, y=30) == expr.substitute(x=4, y=30), f"Walking {source} gave a different result"
+        assert list(walked.branches(x=4, y=30)) == list(expr.branches(x=4, y=30))
+        assert list(walked.substitute_many([(4, 30)])) == [expr.substitute(x=4, y=30)]
+
+    assert evaluate_tree(parse("2 * x (+|-) 1"), {"x": cake.Integer(3)}, "+") == 7
+
+    expr = cake.Expression("x + 1")
+    expr.evaluator = "tree"
+    for invalid in (lambda: setattr(expr, "evaluator", "exec"), lambda: expr.substitute(False, ("math *",), x=1)):
+        try:
+            invalid()
+        except (ValueError, errors.SubstitutionError):
+            continue
+        raise AssertionError("Invalid use of the tree evaluator was accepted")
+
+    print('Passed tree evaluator test')
+
+
+def testProfiling():
+    from cake.parsing import PROFILER, profile
+
+    events = list()
+
+    with profile(lambda phase, seconds: events.append(phase)) as profiler:
+        assert profiler is PROFILER and PROFILER.enabled
+        cake.Expression("x ** 2 + sin(y) + 4").substitute(x=2, y=30)
+
+        expr = cake.Expression("x * 3 (+|-) y + 4")
+        expr.substitute(x=2, y=3)
+        expr.substitute(x=2, y=3)
+
+    assert not PROFILER.enabled and not PROFILER.callbacks, "Profiling wasn't turned off"
+
+    stats = profiler.stats()
+    for phase in ("tokenize", "parse", "_sub", "_glSubCode", "convertToCode", "exec", "compile", "codegen"):
+        assert stats[phase].calls > 0 and stats[phase].total > 0, f"{phase} wasn't timed"
+
+    assert stats["evaluate"].calls == 2 and stats["compile"].calls == 1
+    assert events.count("evaluate") == 2 and len(events) == sum(phase.calls for phase in stats.values())
+    assert profiler.report().splitlines()[0].split() == ["phase", "calls", "total", "(ms)", "mean", "(us)"]
+
+    cake.Expression("x + 5").substitute(x=1)
+    assert profiler.stats() == stats, "Phases were timed while profiling was off"
+
+    print('Passed profiling test')
+
+
+def testNumeric():
+    import math
+
+    expr = cake.Expression("sin(x) * cos(y) + sqrt(x * y) / (x + y)")
+    expr.numeric = True
+
+    result = expr.substitute(x=30, y=60)
+    assert isinstance(result, cake.Number) and abs(result.value - (0.25 + math.sqrt(1800) / 90)) < 1e-9
+
+    compiled = cake.Expression("sqrt(x) (+|-) y").compile()
+    assert compiled.evaluate_numeric({"x": -4 + 0j, "y": 1}) == (cake.Complex(1 + 2j), cake.Complex(-1 + 2j))
+    assert [r.value for r in compiled.evaluate_numeric({"x": cake.Integer(9), "y": 1})] == [4.0, 2.0]
+
+    assert cake.Expression("x * 2 + 3").substitute(x=2, numeric=True) == cake.Real(7)
+    assert [r.value for r in expr.substitute_many([(30, 60), {"x": 90, "y": 0}])] == [result.value, 1.0]
+
+    # Plain numbers and cake's objects give the same results
+    for source, values in (
+        ("x ** 2 + sin(y)", {"x": 3, "y": 30}),
+        ("2 ** x - y / 4", {"x": 7, "y": 2}),
+        ("x ** 3 - 2x + 1 (+|-) y", {"x": 1.5, "y": 3}),
+        (EXPRESSION, {"x": 2, "y": 45}),
+    ):
+        default = cake.Expression(source).substitute(**values)
+        numeric = cake.Expression(source).substitute(**values, numeric=True)
+
+        if not isinstance(default, tuple):
+            default, numeric = (default,), (numeric,)
+        assert all(abs(d.value - n.value) < 1e-9 for d, n in zip(default, numeric)), f"{source} differs in numeric mode"
+
+    assert cake.Expression("x ** 2 + sin(y)").substitute(x=3, y=30, numeric=True).value == 9.5
+
+    # Anything which fails on plain numbers is evaluated with cake's objects, so errors are the same
+    try:
+        cake.Expression("sqrt(x * y)").substitute(x=4, y=-4, numeric=True)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Domain errors weren't raised")
+
+    # Backends compute factorials with gamma, so they're left to cake's `Factorial`
+    factorial = cake.Expression("x! + y")
+    assert factorial.substitute(x=5, y=1) == factorial.substitute(x=5, y=1, numeric=True) == 121
+
+    try:
+        factorial.substitute(x=2.5, y=1, numeric=True)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("Factorials of non-integers were evaluated in numeric mode")
+
+    try:
+        expr.evaluator = "tree"
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Numeric mode was used with the tree evaluator")
+
+    print('Passed numeric test')
+
+
+def testArrays():
+    try:
+        import numpy
+    except ImportError:
+        print('Skipped array test, numpy is not installed')
+        return
+
+    expr = cake.Expression(EXPRESSION)
+    result = expr.substitute(x=numpy.array([1.0, 2.0]), y=30)
+
+    assert isinstance(result, numpy.ndarray), "Array substitution didn't return an array"
+    assert abs(result[1] - expr.lambdify()(2.0, 30.0)) < 1e-9, "Array result differs"
+    print('Passed array test')
+
+
+if __name__ == '__main__':
+    testCompile()
+    testPlusMinus()
+    testOptimize()
+    testSpecialize()
+    testLambdify()
+    testSubstituteMany()
+    testSubstituteParallel()
+    testLongExpression()
+    testDeepExpression()
+    testNestedFunctions()
+    testBrackets()
+    testParseCache()
+    testIncremental()
+    testStructuralEquality()
+    testDiskCache()
+    testArrays()
+    testSolve()
+    testGrad()
+    testDiff()
+    testSimplify()
+    testPolynomial()
+    testPrecision()
+    testStream()
+    testTreeEvaluator()
+    testProfiling()
+    testNumeric()